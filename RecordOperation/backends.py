@@ -0,0 +1,275 @@
+import ctypes
+import ctypes.util
+import os
+from functools import partial
+
+from pynput import keyboard, mouse
+
+# 复现后端：把按键、按钮名称解析为可直接注入的对象，并提供注入操作的可调用对象
+# 编译后的复现程序只保存这些可调用对象及其参数（见 player.compile_program）
+#
+# 支持批量注入的后端额外提供：
+#   encoders    {注入操作: 编码函数}，编码函数把参数预先转换为底层输入记录，无法编码时返回 None
+#   pack        把若干条编码结果打包为 send_batch 的参数
+#   send_batch  一次系统调用注入整批输入
+# 同一毫秒内的连续操作在编译时合并为一个批量步骤（见 player.batch_steps）
+
+
+def deserialize_key(kind, value):
+    if kind == "char":
+        return keyboard.KeyCode.from_char(value)
+    return keyboard.Key[value]
+
+
+def _key_vk(key):
+    code = key.value if isinstance(key, keyboard.Key) else key
+    return getattr(code, "vk", None)
+
+
+class PynputBackend:
+    encoders = None
+
+    def __init__(self):
+        self.keyboard = keyboard.Controller()
+        self.mouse = mouse.Controller()
+        controller = self.mouse
+
+        self.press_key = self.keyboard.press
+        self.release_key = self.keyboard.release
+        # 直接绑定 position 属性的 setter，省去每次属性赋值的查找
+        self.move_to = partial(type(controller).position.fset, controller)
+        self.move_by = controller.move
+        self.press_button = controller.press
+        self.release_button = controller.release
+        self.scroll = controller.scroll
+
+    def key(self, kind, value):
+        return deserialize_key(kind, value)
+
+    def button(self, name):
+        return mouse.Button[name]
+
+
+if hasattr(ctypes, "windll"):
+    from ctypes import wintypes
+
+    INPUT_MOUSE = 0
+    INPUT_KEYBOARD = 1
+    KEYEVENTF_EXTENDEDKEY = 0x0001
+    KEYEVENTF_KEYUP = 0x0002
+    KEYEVENTF_UNICODE = 0x0004
+    MOUSEEVENTF_MOVE = 0x0001
+    MOUSEEVENTF_WHEEL = 0x0800
+    MOUSEEVENTF_HWHEEL = 0x1000
+    MOUSEEVENTF_VIRTUALDESK = 0x4000
+    MOUSEEVENTF_ABSOLUTE = 0x8000
+    WHEEL_DELTA = 120
+    BUTTON_FLAGS = {
+        "left": (0x0002, 0x0004),
+        "right": (0x0008, 0x0010),
+        "middle": (0x0020, 0x0040),
+    }
+    # 方向键、Insert/Delete、Home/End、翻页、右侧 Ctrl/Alt、Win 等需要扩展键标志
+    EXTENDED_VKS = {
+        0x21, 0x22, 0x23, 0x24, 0x25, 0x26, 0x27, 0x28,
+        0x2C, 0x2D, 0x2E, 0x5B, 0x5C, 0x5D, 0x6F, 0x90, 0xA3, 0xA5,
+    }
+
+    class MOUSEINPUT(ctypes.Structure):
+        _fields_ = [
+            ("dx", wintypes.LONG),
+            ("dy", wintypes.LONG),
+            ("mouseData", wintypes.DWORD),
+            ("dwFlags", wintypes.DWORD),
+            ("time", wintypes.DWORD),
+            ("dwExtraInfo", ctypes.c_size_t),
+        ]
+
+    class KEYBDINPUT(ctypes.Structure):
+        _fields_ = [
+            ("wVk", wintypes.WORD),
+            ("wScan", wintypes.WORD),
+            ("dwFlags", wintypes.DWORD),
+            ("time", wintypes.DWORD),
+            ("dwExtraInfo", ctypes.c_size_t),
+        ]
+
+    class HARDWAREINPUT(ctypes.Structure):
+        _fields_ = [
+            ("uMsg", wintypes.DWORD),
+            ("wParamL", wintypes.WORD),
+            ("wParamH", wintypes.WORD),
+        ]
+
+    class _INPUTUNION(ctypes.Union):
+        _fields_ = [("mi", MOUSEINPUT), ("ki", KEYBDINPUT), ("hi", HARDWAREINPUT)]
+
+    class INPUT(ctypes.Structure):
+        _fields_ = [("type", wintypes.DWORD), ("u", _INPUTUNION)]
+
+    class SendInputBackend(PynputBackend):
+        # 单个操作仍由 pynput 注入；同一批的操作预先编码为 INPUT 数组，一次 SendInput 提交
+        def __init__(self):
+            super().__init__()
+            user32 = ctypes.WinDLL("user32", use_last_error=True)
+            self._send_input = user32.SendInput
+            self._send_input.argtypes = (wintypes.UINT, ctypes.POINTER(INPUT), ctypes.c_int)
+            self._send_input.restype = wintypes.UINT
+            self._vk_key_scan = user32.VkKeyScanW
+            self._vk_key_scan.argtypes = (wintypes.WCHAR,)
+            self._vk_key_scan.restype = ctypes.c_short
+            self._screen = tuple(user32.GetSystemMetrics(index) for index in (76, 77, 78, 79))
+            self.encoders = {
+                self.press_key: partial(self._encode_key, up=False),
+                self.release_key: partial(self._encode_key, up=True),
+                self.press_button: partial(self._encode_button, up=False),
+                self.release_button: partial(self._encode_button, up=True),
+                self.move_to: self._encode_move,
+                self.scroll: self._encode_scroll,
+            }
+
+        def _encode_key(self, key, up):
+            flags = KEYEVENTF_KEYUP if up else 0
+            vk = _key_vk(key)
+            char = getattr(key, "char", None)
+            if not vk and char and len(char) == 1:
+                # 与 pynput 逐个注入时相同：字符在当前键盘布局中有对应按键时注入虚拟键，
+                # 快捷键（Ctrl+C、Alt+F 等）才能被目标程序识别；修饰键在录制中单独记录
+                scan = self._vk_key_scan(char)
+                if scan != -1:
+                    vk = scan & 0xFF
+            if vk:
+                if vk in EXTENDED_VKS:
+                    flags |= KEYEVENTF_EXTENDEDKEY
+                return [INPUT(INPUT_KEYBOARD, _INPUTUNION(ki=KEYBDINPUT(vk, 0, flags, 0, 0)))]
+            if not char:
+                return None
+            # 没有对应按键的字符按 UTF-16 编码单元注入
+            data = char.encode("utf-16-le")
+            units = [int.from_bytes(data[i:i + 2], "little") for i in range(0, len(data), 2)]
+            flags |= KEYEVENTF_UNICODE
+            return [INPUT(INPUT_KEYBOARD, _INPUTUNION(ki=KEYBDINPUT(0, unit, flags, 0, 0))) for unit in units]
+
+        def _encode_button(self, button, up):
+            flags = BUTTON_FLAGS.get(button.name)
+            if flags is None:
+                return None
+            return [INPUT(INPUT_MOUSE, _INPUTUNION(mi=MOUSEINPUT(0, 0, 0, flags[up], 0, 0)))]
+
+        def _encode_move(self, position):
+            left, top, width, height = self._screen
+            if width <= 1 or height <= 1:
+                return None
+            dx = round((position[0] - left) * 65535 / (width - 1))
+            dy = round((position[1] - top) * 65535 / (height - 1))
+            flags = MOUSEEVENTF_MOVE | MOUSEEVENTF_ABSOLUTE | MOUSEEVENTF_VIRTUALDESK
+            return [INPUT(INPUT_MOUSE, _INPUTUNION(mi=MOUSEINPUT(dx, dy, 0, flags, 0, 0)))]
+
+        def _encode_scroll(self, dx, dy):
+            inputs = []
+            if dy:
+                data = (dy * WHEEL_DELTA) & 0xFFFFFFFF
+                inputs.append(INPUT(INPUT_MOUSE, _INPUTUNION(mi=MOUSEINPUT(0, 0, data, MOUSEEVENTF_WHEEL, 0, 0))))
+            if dx:
+                data = (dx * WHEEL_DELTA) & 0xFFFFFFFF
+                inputs.append(INPUT(INPUT_MOUSE, _INPUTUNION(mi=MOUSEINPUT(0, 0, data, MOUSEEVENTF_HWHEEL, 0, 0))))
+            return inputs or None
+
+        def pack(self, encoded):
+            inputs = [item for items in encoded for item in items]
+            return (INPUT * len(inputs))(*inputs)
+
+        def send_batch(self, inputs):
+            self._send_input(len(inputs), inputs, ctypes.sizeof(INPUT))
+
+
+class XTestBackend(PynputBackend):
+    # X11：同一批的操作依次调用 XTest，最后只 XFlush 一次，整批只有一次与 X 服务器的往返
+    BUTTONS = {"left": 1, "middle": 2, "right": 3}
+
+    def __init__(self):
+        super().__init__()
+        xlib = ctypes.util.find_library("X11")
+        xtst = ctypes.util.find_library("Xtst")
+        if not xlib or not xtst:
+            raise OSError("未找到 libX11 或 libXtst")
+        self._xlib = ctypes.CDLL(xlib)
+        self._xtst = ctypes.CDLL(xtst)
+        self._xlib.XOpenDisplay.argtypes = (ctypes.c_char_p,)
+        self._xlib.XOpenDisplay.restype = ctypes.c_void_p
+        self._xlib.XFlush.argtypes = (ctypes.c_void_p,)
+        self._xlib.XKeysymToKeycode.argtypes = (ctypes.c_void_p, ctypes.c_ulong)
+        self._xlib.XKeysymToKeycode.restype = ctypes.c_ubyte
+        self._xtst.XTestFakeKeyEvent.argtypes = (ctypes.c_void_p, ctypes.c_uint, ctypes.c_int, ctypes.c_ulong)
+        self._xtst.XTestFakeButtonEvent.argtypes = (ctypes.c_void_p, ctypes.c_uint, ctypes.c_int, ctypes.c_ulong)
+        self._xtst.XTestFakeMotionEvent.argtypes = (
+            ctypes.c_void_p,
+            ctypes.c_int,
+            ctypes.c_int,
+            ctypes.c_int,
+            ctypes.c_ulong,
+        )
+        self._display = self._xlib.XOpenDisplay(None)
+        if not self._display:
+            raise OSError("无法连接 X 服务器")
+        self.encoders = {
+            self.press_key: partial(self._encode_key, down=True),
+            self.release_key: partial(self._encode_key, down=False),
+            self.press_button: partial(self._encode_button, down=True),
+            self.release_button: partial(self._encode_button, down=False),
+            self.move_to: self._encode_move,
+            self.scroll: self._encode_scroll,
+        }
+
+    def _encode_key(self, key, down):
+        keysym = _key_vk(key)
+        if not keysym:
+            char = getattr(key, "char", None)
+            if not char or len(char) != 1:
+                return None
+            code = ord(char)
+            keysym = code if code < 0x100 else 0x01000000 | code
+        keycode = self._xlib.XKeysymToKeycode(self._display, keysym)
+        if not keycode:
+            return None
+        return [(self._xtst.XTestFakeKeyEvent, (keycode, down, 0))]
+
+    def _encode_button(self, button, down):
+        number = self.BUTTONS.get(button.name)
+        if number is None:
+            return None
+        return [(self._xtst.XTestFakeButtonEvent, (number, down, 0))]
+
+    def _encode_move(self, position):
+        return [(self._xtst.XTestFakeMotionEvent, (-1, position[0], position[1], 0))]
+
+    def _encode_scroll(self, dx, dy):
+        press = self._xtst.XTestFakeButtonEvent
+        calls = []
+        for amount, positive, negative in ((dy, 4, 5), (dx, 7, 6)):
+            number = positive if amount > 0 else negative
+            for _ in range(abs(amount)):
+                calls.append((press, (number, True, 0)))
+                calls.append((press, (number, False, 0)))
+        return calls or None
+
+    def pack(self, encoded):
+        return tuple(call for calls in encoded for call in calls)
+
+    def send_batch(self, calls):
+        display = self._display
+        for func, args in calls:
+            func(display, *args)
+        self._xlib.XFlush(display)
+
+
+def create_backend():
+    # 优先使用支持批量注入的后端，不可用时退回 pynput
+    if hasattr(ctypes, "windll"):
+        return SendInputBackend()
+    if os.environ.get("DISPLAY"):
+        try:
+            return XTestBackend()
+        except OSError:
+            pass
+    return PynputBackend()
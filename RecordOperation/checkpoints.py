@@ -0,0 +1,147 @@
+import threading
+import time
+from collections import deque
+
+try:
+    from PIL import Image, ImageGrab
+except ImportError:  # 未安装 Pillow 时不记录、不使用检查点
+    Image = None
+    ImageGrab = None
+
+# 画面检查点：录制点击时截取点击位置周围的小区域，计算 64 位差值哈希（dHash）。
+# 复现时在点击前等待该区域的哈希重新匹配，匹配后立即点击，超时则照常继续。
+# 录制时的截图由 FingerprintSampler 在按下之前截取：钩子不再阻塞输入，
+# 等消费线程处理到按下事件时目标程序可能已显示按下或悬停后的画面。
+
+REGION_RADIUS = 12
+MATCH_DISTANCE = 8
+POLL_INTERVAL = 0.02
+SAMPLE_INTERVAL = 0.02
+SAMPLE_REFRESH = 0.1
+SAMPLE_HISTORY = 4
+
+
+def available():
+    return ImageGrab is not None
+
+
+def dhash(image):
+    pixels = list(image.convert("L").resize((9, 8), Image.Resampling.BILINEAR).getdata())
+    value = 0
+    for row in range(8):
+        offset = row * 9
+        for col in range(8):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def grab_fingerprint(x, y):
+    if ImageGrab is None:
+        return None
+    bbox = (x - REGION_RADIUS, y - REGION_RADIUS, x + REGION_RADIUS, y + REGION_RADIUS)
+    try:
+        image = ImageGrab.grab(bbox=bbox, all_screens=True)
+    except Exception:
+        return None
+    return dhash(image)
+
+
+def distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+class FingerprintSampler:
+    # 录制时在后台线程截取鼠标所在位置周围的区域：鼠标移动后下一轮截取，停留时每 SAMPLE_REFRESH 秒刷新。
+    # 点击时取按下之前截取完成、以点击位置为中心的最近一次截图；鼠标刚移动到点击位置就按下时没有可用截图，
+    # 这次点击不记录检查点（错误的检查点会让复现等满超时）
+    def __init__(self, interval=SAMPLE_INTERVAL, refresh=SAMPLE_REFRESH, grab=grab_fingerprint):
+        self.interval = interval
+        self.refresh = refresh
+        self.grab = grab
+        # 由消费线程更新的鼠标屏幕坐标
+        self.position = None
+        self.missed = 0
+        self._samples = deque(maxlen=SAMPLE_HISTORY)
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="checkpoint-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def track(self, x, y):
+        self.position = (x, y)
+
+    def _run(self):
+        last_position = None
+        last_grab = 0
+        refresh_ns = int(self.refresh * 1e9)
+        while not self._stop_event.wait(self.interval):
+            position = self.position
+            now = time.perf_counter_ns()
+            if position is None or (position == last_position and now - last_grab < refresh_ns):
+                continue
+            fingerprint = self.grab(*position)
+            last_position = position
+            last_grab = now
+            if fingerprint is not None:
+                # 记录截图完成的时刻，只有完成时刻早于按下的截图才可用
+                with self._lock:
+                    self._samples.append((time.perf_counter_ns(), position, fingerprint))
+
+    def before(self, stamp, x, y):
+        # stamp 为按下时钩子取的 perf_counter_ns 时间戳；没有可用截图时返回 None
+        with self._lock:
+            samples = list(self._samples)
+        for finished, position, fingerprint in reversed(samples):
+            if finished <= stamp:
+                if position == (x, y):
+                    return fingerprint
+                break
+        self.missed += 1
+        return None
+
+
+class CheckpointWaiter:
+    def __init__(self, timeout=10.0, max_distance=MATCH_DISTANCE, grab=grab_fingerprint):
+        self.timeout = timeout
+        self.max_distance = max_distance
+        self.grab = grab
+        # 窗口锚定的录制由 player.compile_program 设置，用于把相对坐标换算为屏幕坐标
+        self.anchors = None
+        self.checked = 0
+        self.immediate = 0
+        self.timeouts = 0
+
+    def wait(self, x, y, expected, window, should_stop):
+        # 返回 False 表示等待期间被停止
+        if window >= 0:
+            ox, oy = self.anchors.origins[window]
+            x += ox
+            y += oy
+        self.checked += 1
+        deadline = time.perf_counter() + self.timeout
+        first = True
+        while True:
+            current = self.grab(x, y)
+            if current is not None and distance(current, expected) <= self.max_distance:
+                if first:
+                    self.immediate += 1
+                return True
+            if should_stop():
+                return False
+            if time.perf_counter() >= deadline:
+                self.timeouts += 1
+                return True
+            first = False
+            time.sleep(POLL_INTERVAL)
+
+    def summary(self):
+        if not self.checked:
+            return ""
+        return f"检查点 {self.checked} 个，直接匹配 {self.immediate} 个，超时 {self.timeouts} 个"
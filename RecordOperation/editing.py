@@ -0,0 +1,230 @@
+from bisect import bisect_left, bisect_right
+
+from events import WINDOW
+
+# 录制的可编辑视图（piece table）：不复制事件，只维护底层录制上的若干区间
+#   spans  [(起始序号, 结束序号, 时间偏移)]，按视图顺序排列
+# 删除一段事件只需拆分、移除区间并调整其后区间的时间偏移，代价与区间数有关，与事件总数无关。
+# 视图提供与 EventStore / MappedRecording 相同的读取接口，可直接复现和导出。
+# 删除的事件中有窗口锚点、而其后保留的鼠标坐标仍相对该窗口时，把最后一个锚点作为单事件区间
+# 移到保留部分之前（时间与其第一个事件相同），保证其后的坐标仍按原窗口换算。
+
+
+class _ViewTimes:
+    def __init__(self, view):
+        self._view = view
+
+    def __len__(self):
+        return len(self._view)
+
+    def __getitem__(self, index):
+        view = self._view
+        if index < 0:
+            index += len(view)
+        if not 0 <= index < len(view):
+            raise IndexError(index)
+        k = bisect_right(view._starts, index) - 1
+        start, _, shift = view._spans[k]
+        return view.base.times[start + index - view._starts[k]] + shift
+
+
+class RecordingView:
+    def __init__(self, base):
+        self.base = base
+        self._spans = [(0, len(base), 0.0)] if len(base) else []
+        self._history = []
+        self._anchors = None
+        self._rebuild()
+        self.times = _ViewTimes(self)
+
+    def _rebuild(self):
+        starts = []
+        count = 0
+        for start, stop, _ in self._spans:
+            starts.append(count)
+            count += stop - start
+        self._starts = starts
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __bool__(self):
+        return self._count > 0
+
+    @property
+    def edited(self):
+        return bool(self._history)
+
+    @property
+    def keys(self):
+        return self.base.keys
+
+    @property
+    def buttons(self):
+        return self.base.buttons
+
+    @property
+    def windows(self):
+        return self.base.windows
+
+    def key(self, key_id):
+        return self.base.key(key_id)
+
+    def button(self, button_id):
+        return self.base.button(button_id)
+
+    @property
+    def duration(self):
+        return self.times[-1] if self._count else 0.0
+
+    @property
+    def nbytes(self):
+        return self.base.nbytes
+
+    def index_at(self, t):
+        return bisect_left(self.times, t)
+
+    def row(self, index):
+        if index < 0:
+            index += self._count
+        k = bisect_right(self._starts, index) - 1
+        start, _, shift = self._spans[k]
+        t, op, x, y, a, b = self.base.row(start + index - self._starts[k])
+        return t + shift, op, x, y, a, b
+
+    def iter_rows(self, start=0, stop=None):
+        stop = self._count if stop is None else min(stop, self._count)
+        if start >= stop:
+            return
+        k = bisect_right(self._starts, start) - 1
+        while start < stop:
+            span_start, span_stop, shift = self._spans[k]
+            first = span_start + start - self._starts[k]
+            last = min(span_stop, first + stop - start)
+            rows = self.base.iter_rows(first, last)
+            if shift:
+                for t, op, x, y, a, b in rows:
+                    yield t + shift, op, x, y, a, b
+            else:
+                yield from rows
+            start += last - first
+            k += 1
+
+    def count_between(self, t0, t1):
+        times = self.times
+        return bisect_right(times, t1) - bisect_left(times, t0)
+
+    def _anchor_rows(self):
+        # 底层录制中窗口锚点事件的序号，首次需要时扫描一次
+        if self._anchors is None:
+            self._anchors = []
+            if self.base.windows:
+                self._anchors = [
+                    index for index, row in enumerate(self.base.iter_rows()) if row[1] == WINDOW
+                ]
+        return self._anchors
+
+    def _last_anchor(self, start, stop):
+        # 视图 [start, stop) 中最后一个窗口锚点在底层录制中的序号，没有时为 None；
+        # 按区间二分查找，代价与区间数有关
+        anchors = self._anchor_rows()
+        if not anchors:
+            return None
+        k = bisect_right(self._starts, stop - 1) - 1
+        while k >= 0:
+            span_start, span_stop, _ = self._spans[k]
+            offset = self._starts[k]
+            if offset + span_stop - span_start <= start:
+                break
+            first = span_start + max(0, start - offset)
+            last = span_start + min(stop - offset, span_stop - span_start)
+            i = bisect_left(anchors, last) - 1
+            if i >= 0 and anchors[i] >= first:
+                return anchors[i]
+            k -= 1
+        return None
+
+    def delete(self, start, stop):
+        # 删除视图中 [start, stop) 的事件，之后的事件整体提前，使第 stop 个事件落在原第 start 个事件的时间
+        start = max(0, start)
+        stop = min(stop, self._count)
+        if start >= stop:
+            return False
+        gap = self.times[stop] - self.times[start] if stop < self._count else 0.0
+        carry = None
+        if stop < self._count and self.row(stop)[1] != WINDOW:
+            anchor = self._last_anchor(start, stop)
+            if anchor is not None:
+                carry = (anchor, anchor + 1, self.times[start] - self.base.times[anchor])
+
+        spans = []
+        for (span_start, span_stop, shift), offset in zip(self._spans, self._starts):
+            length = span_stop - span_start
+            if offset + length <= start:
+                spans.append((span_start, span_stop, shift))
+                continue
+            if offset >= stop:
+                if carry is not None:
+                    spans.append(carry)
+                    carry = None
+                spans.append((span_start, span_stop, shift - gap))
+                continue
+            if offset < start:
+                spans.append((span_start, span_start + start - offset, shift))
+            if offset + length > stop:
+                if carry is not None:
+                    spans.append(carry)
+                    carry = None
+                spans.append((span_start + stop - offset, span_stop, shift - gap))
+
+        self._history.append(self._spans)
+        self._spans = spans
+        self._rebuild()
+        return True
+
+    def keep(self, start, stop):
+        # 只保留 [start, stop) 的事件，保留部分整体移到录制开头
+        if start >= stop or (start <= 0 and stop >= self._count):
+            return False
+        saved = self._spans
+        depth = len(self._history)
+        self.delete(stop, self._count)
+        self.delete(0, start)
+        # 两次删除合并为一步撤销
+        del self._history[depth:]
+        self._history.append(saved)
+        return True
+
+    def undo(self):
+        if not self._history:
+            return False
+        self._spans = self._history.pop()
+        self._rebuild()
+        return True
+
+    def close(self):
+        close = getattr(self.base, "close", None)
+        if close is not None:
+            close()
+
+
+def density(times, t0, t1, width, subdivisions=4):
+    # 把 [t0, t1) 分成 width 个像素，返回每个像素的事件密度 (最小值, 最大值)（单位：事件/像素）：
+    # 每个像素再细分为若干小段，分别统计事件数后取极值，缩小后仍能看出突发和停顿。
+    # 每个边界只做一次二分查找，代价与可见像素数有关，与事件总数无关。
+    if width <= 0 or t1 <= t0:
+        return []
+    steps = width * subdivisions
+    scale = (t1 - t0) / steps
+    bounds = []
+    index = 0
+    for k in range(steps + 1):
+        index = bisect_left(times, t0 + k * scale, index)
+        bounds.append(index)
+    result = []
+    for pixel in range(width):
+        base = pixel * subdivisions
+        counts = [bounds[base + k + 1] - bounds[base + k] for k in range(subdivisions)]
+        result.append((min(counts) * subdivisions, max(counts) * subdivisions))
+    return result
@@ -0,0 +1,261 @@
+import struct
+import threading
+from array import array
+
+KEY_PRESS = 0
+KEY_RELEASE = 1
+MOUSE_MOVE = 2
+MOUSE_CLICK = 3
+MOUSE_SCROLL = 4
+CHECKPOINT = 5
+WINDOW = 6
+
+NO_WINDOW = -1
+
+_FINGERPRINT = struct.Struct("<Q")
+_FINGERPRINT_HALVES = struct.Struct("<ii")
+
+EVENT_TYPES = (
+    "key_press",
+    "key_release",
+    "mouse_move",
+    "mouse_click",
+    "mouse_scroll",
+    "checkpoint",
+    "window",
+)
+
+
+class EventStore:
+    # 录制事件按列存放在定长类型数组中，每个事件只占约 25 字节：
+    #   times  事件时间（秒）       ops   事件类型
+    #   xs/ys  鼠标坐标             a/b   附加参数
+    # 按键：a = 按键 id；点击：a = 按钮 id，b = 是否按下；滚轮：a/b = dx/dy
+    # 检查点：x/y = 点击位置，a/b = 画面哈希的低/高 32 位（见 checkpoints.py）
+    # 窗口锚点：x/y = 窗口左上角，a = 窗口 id（-1 表示屏幕），之后的鼠标坐标相对该窗口
+    # 按键和鼠标按钮名称只保存一次，事件中记录其 id
+    # sink 不为空时事件和名称定义同时写入录制文件（见 recfile.RecordingWriter）
+
+    def __init__(self, sink=None):
+        self.times = array("d")
+        self.ops = array("B")
+        self.xs = array("i")
+        self.ys = array("i")
+        self.a = array("i")
+        self.b = array("i")
+        self.keys = []
+        self.buttons = []
+        self.windows = []
+        self._key_ids = {}
+        self._button_ids = {}
+        self._window_ids = {}
+        self.sink = sink
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.times)
+
+    def __bool__(self):
+        return len(self.times) > 0
+
+    def append(self, t, op, x=0, y=0, a=0, b=0):
+        with self._lock:
+            # 键盘与鼠标监听在不同线程，保证时间列单调不减
+            if self.times and t < self.times[-1]:
+                t = self.times[-1]
+            self.ops.append(op)
+            self.xs.append(x)
+            self.ys.append(y)
+            self.a.append(a)
+            self.b.append(b)
+            self.times.append(t)
+            if self.sink is not None:
+                self.sink.append(t, op, x, y, a, b)
+
+    def intern_key(self, kind, value):
+        payload = (kind, value)
+        key_id = self._key_ids.get(payload)
+        if key_id is None:
+            with self._lock:
+                key_id = self._key_ids.get(payload)
+                if key_id is None:
+                    key_id = len(self.keys)
+                    self.keys.append(payload)
+                    self._key_ids[payload] = key_id
+                    if self.sink is not None:
+                        self.sink.define_key(key_id, kind, value)
+        return key_id
+
+    def intern_button(self, name):
+        button_id = self._button_ids.get(name)
+        if button_id is None:
+            with self._lock:
+                button_id = self._button_ids.get(name)
+                if button_id is None:
+                    button_id = len(self.buttons)
+                    self.buttons.append(name)
+                    self._button_ids[name] = button_id
+                    if self.sink is not None:
+                        self.sink.define_button(button_id, name)
+        return button_id
+
+    def intern_window(self, class_name, title):
+        payload = (class_name, title)
+        window_id = self._window_ids.get(payload)
+        if window_id is None:
+            with self._lock:
+                window_id = self._window_ids.get(payload)
+                if window_id is None:
+                    window_id = len(self.windows)
+                    self.windows.append(payload)
+                    self._window_ids[payload] = window_id
+                    if self.sink is not None:
+                        self.sink.define_window(window_id, class_name, title)
+        return window_id
+
+    def key(self, key_id):
+        return self.keys[key_id]
+
+    def button(self, button_id):
+        return self.buttons[button_id]
+
+    @property
+    def duration(self):
+        return self.times[-1] if self.times else 0.0
+
+    @property
+    def nbytes(self):
+        return sum(
+            column.itemsize * len(column)
+            for column in (self.times, self.ops, self.xs, self.ys, self.a, self.b)
+        )
+
+    def row(self, index):
+        return (
+            self.times[index],
+            self.ops[index],
+            self.xs[index],
+            self.ys[index],
+            self.a[index],
+            self.b[index],
+        )
+
+    def iter_rows(self, start=0, stop=None):
+        stop = len(self) if stop is None else stop
+        return zip(
+            self.times[start:stop],
+            self.ops[start:stop],
+            self.xs[start:stop],
+            self.ys[start:stop],
+            self.a[start:stop],
+            self.b[start:stop],
+        )
+
+    def event(self, index):
+        # 以旧版字典形式查看单个事件，便于调试和展示
+        t, op, x, y, a, b = self.row(index)
+        event = {"type": EVENT_TYPES[op], "time": t}
+        if op in (KEY_PRESS, KEY_RELEASE):
+            kind, value = self.keys[a]
+            event["key"] = {"kind": kind, "value": value}
+        elif op == MOUSE_MOVE:
+            event.update(x=x, y=y)
+        elif op == MOUSE_CLICK:
+            event.update(x=x, y=y, button=self.buttons[a], pressed=bool(b))
+        elif op == MOUSE_SCROLL:
+            event.update(x=x, y=y, dx=a, dy=b)
+        elif op == CHECKPOINT:
+            event.update(x=x, y=y, fingerprint=unpack_fingerprint(a, b))
+        elif op == WINDOW:
+            event.update(x=x, y=y, window=self.windows[a] if a >= 0 else None)
+        return event
+
+
+def pack_fingerprint(value):
+    # 64 位画面哈希拆成两个有符号 32 位整数，存入事件的 a/b 列
+    return _FINGERPRINT_HALVES.unpack(_FINGERPRINT.pack(value))
+
+
+def unpack_fingerprint(a, b):
+    return _FINGERPRINT.unpack(_FINGERPRINT_HALVES.pack(a, b))[0]
+
+
+def _distance_to_segment(px, py, ax, ay, bx, by):
+    dx = bx - ax
+    dy = by - ay
+    length_sq = dx * dx + dy * dy
+    if length_sq == 0:
+        return ((px - ax) ** 2 + (py - ay) ** 2) ** 0.5
+    t = ((px - ax) * dx + (py - ay) * dy) / length_sq
+    t = max(0.0, min(1.0, t))
+    cx = ax + t * dx - px
+    cy = ay + t * dy - py
+    return (cx * cx + cy * cy) ** 0.5
+
+
+class MoveSimplifier:
+    # 录制时的在线轨迹简化（开窗法）：
+    # 从上一个保留点出发不断延长线段，只要中间被跳过的点都在容差范围内就继续丢弃，
+    # 否则保留上一个候选点。停顿超过 max_gap 的点、拖拽中的点以及其他事件之前的
+    # 最后一个移动点总是保留，保证时间和落点不变。
+
+    def __init__(self, store, tolerance=2.0, max_gap=0.25, max_window=64):
+        self.store = store
+        self.tolerance = tolerance
+        self.max_gap = max_gap
+        self.max_window = max_window
+        self.raw = 0
+        self.kept = 0
+        self._anchor = None
+        self._pending = None
+        self._skipped = []
+        self._lock = threading.Lock()
+
+    @property
+    def ratio(self):
+        return self.kept / self.raw if self.raw else 1.0
+
+    def move(self, t, x, y, dragging=False):
+        with self._lock:
+            self.raw += 1
+            if dragging or self.tolerance <= 0 or self._anchor is None:
+                self._flush()
+                self._emit(t, x, y)
+                return
+
+            pending = self._pending
+            if pending is not None:
+                skipped = self._skipped
+                skipped.append((pending[1], pending[2]))
+                if t - pending[0] <= self.max_gap and len(skipped) <= self.max_window:
+                    _, ax, ay = self._anchor
+                    tolerance = self.tolerance
+                    if all(
+                        _distance_to_segment(px, py, ax, ay, x, y) <= tolerance
+                        for px, py in skipped
+                    ):
+                        self._pending = (t, x, y)
+                        return
+                self._emit(*pending)
+            self._pending = (t, x, y)
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def restart(self):
+        # 坐标参照改变（如切换锚点窗口）时提交候选点，之后的点不再与之前的点比较
+        with self._lock:
+            self._flush()
+            self._anchor = None
+
+    def _flush(self):
+        if self._pending is not None:
+            self._emit(*self._pending)
+
+    def _emit(self, t, x, y):
+        self.store.append(t, MOUSE_MOVE, x, y)
+        self.kept += 1
+        self._anchor = (t, x, y)
+        self._pending = None
+        self._skipped = []
@@ -0,0 +1,105 @@
+import threading
+import time
+from heapq import merge
+from time import perf_counter_ns
+
+# 输入钩子回调运行在系统钩子线程里，回调越慢整个桌面的输入越卡，积压严重时钩子还可能被系统移除。
+# 因此钩子线程只把定长元组 (时间戳 ns, 类型, x, y, a, b) 放入预分配的环形缓冲区，
+# 序列化、轨迹简化和写入都由单独的消费线程完成。
+
+
+class SpscRing:
+    # 单生产者单消费者环形缓冲区：每个监听线程独占一个。
+    # head 只由生产者写，tail 只由消费者写，先写槽位再推进 head，依靠 GIL 保证可见顺序。
+    def __init__(self, capacity=1 << 16):
+        if capacity & (capacity - 1):
+            raise ValueError("capacity 必须是 2 的幂")
+        self._slots = [None] * capacity
+        self._mask = capacity - 1
+        self._head = 0
+        self._tail = 0
+        self.dropped = 0
+        # 钩子回调耗时统计，由生产者线程独自更新
+        self.hook_calls = 0
+        self.hook_ns = 0
+        self.hook_max_ns = 0
+
+    def __len__(self):
+        return self._head - self._tail
+
+    def push(self, item):
+        # item[0] 是回调开始时取的时间戳，同时用来统计回调耗时
+        head = self._head
+        if head - self._tail > self._mask:
+            self.dropped += 1
+        else:
+            self._slots[head & self._mask] = item
+            self._head = head + 1
+        elapsed = perf_counter_ns() - item[0]
+        self.hook_calls += 1
+        self.hook_ns += elapsed
+        if elapsed > self.hook_max_ns:
+            self.hook_max_ns = elapsed
+
+    def drain(self):
+        tail = self._tail
+        head = self._head
+        if tail == head:
+            return []
+        slots = self._slots
+        mask = self._mask
+        items = []
+        for index in range(tail, head):
+            slot = index & mask
+            items.append(slots[slot])
+            slots[slot] = None
+        self._tail = head
+        return items
+
+
+def hook_stats(rings):
+    calls = sum(ring.hook_calls for ring in rings)
+    total_ns = sum(ring.hook_ns for ring in rings)
+    max_ns = max((ring.hook_max_ns for ring in rings), default=0)
+    dropped = sum(ring.dropped for ring in rings)
+    mean_us = total_ns / calls / 1000 if calls else 0.0
+    return calls, mean_us, max_ns / 1000, dropped
+
+
+class Ingestor:
+    # 消费线程：定期取出各个缓冲区的事件，按时间戳归并后交给 handler
+    def __init__(self, rings, handler, interval=0.002):
+        self.rings = rings
+        self.handler = handler
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="record-ingest", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        # 停止后把缓冲区里剩余的事件全部处理完再返回
+        self._stop_event.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            if not self._drain():
+                time.sleep(self.interval)
+        self._drain()
+
+    def _drain(self):
+        batches = [batch for batch in (ring.drain() for ring in self.rings) if batch]
+        if not batches:
+            return False
+        handler = self.handler
+        items = batches[0] if len(batches) == 1 else merge(*batches, key=_stamp)
+        for item in items:
+            handler(item)
+        return True
+
+
+def _stamp(item):
+    return item[0]
@@ -1,11 +1,51 @@
 import ctypes
+import os
+import shutil
 import threading
 import time
 import tkinter as tk
-from tkinter import messagebox
+from bisect import bisect_left, bisect_right
+from time import perf_counter_ns
+from tkinter import filedialog, messagebox
 
 from pynput import keyboard, mouse
 
+from events import (
+    CHECKPOINT,
+    KEY_PRESS,
+    KEY_RELEASE,
+    MOUSE_CLICK,
+    MOUSE_MOVE,
+    MOUSE_SCROLL,
+    NO_WINDOW,
+    WINDOW,
+    EventStore,
+    MoveSimplifier,
+    pack_fingerprint,
+)
+import checkpoints
+import windows
+from backends import create_backend
+from editing import RecordingView
+from ingest import Ingestor, SpscRing, hook_stats
+from player import PlaybackTrace, compile_program, play, release_held
+from recfile import (
+    FILE_SUFFIX,
+    TRACE_MAGIC,
+    TRACE_SUFFIX,
+    MappedRecording,
+    RecordingFormatError,
+    RecordingWriter,
+    write_recording,
+)
+from timeline import TimelineWindow
+
+RECORDINGS_DIR = os.path.join(os.path.expanduser("~"), ".record_operation", "recordings")
+TRACES_DIR = os.path.join(os.path.expanduser("~"), ".record_operation", "traces")
+MIN_SPEED = 0.25
+MAX_SPEED = 20.0
+CHECKPOINT_TIMEOUT = 10.0
+
 
 def _enable_dpi_awareness():
     if hasattr(ctypes, "windll"):
@@ -20,16 +60,20 @@ def _enable_dpi_awareness():
             pass
 
 
-def _serialize_key(key):
-    if isinstance(key, keyboard.KeyCode):
-        return {"kind": "char", "value": key.char}
-    return {"kind": "key", "value": key.name}
+def _format_duration(seconds):
+    if seconds < 60:
+        return f"{seconds:.1f} 秒"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{int(minutes)} 分 {seconds:.0f} 秒"
+    hours, minutes = divmod(minutes, 60)
+    return f"{int(hours)} 小时 {int(minutes)} 分"
 
 
-def _deserialize_key(payload):
-    if payload["kind"] == "char":
-        return keyboard.KeyCode.from_char(payload["value"])
-    return keyboard.Key[payload["value"]]
+def _serialize_key(key):
+    if isinstance(key, keyboard.KeyCode):
+        return "char", key.char
+    return "key", key.name
 
 
 class RecorderApp:
@@ -39,8 +83,28 @@ class RecorderApp:
 
         self.status_var = tk.StringVar(value="状态：未录制")
         self.loop_var = tk.StringVar(value="1")
-
-        self.events = []
+        self.tolerance_var = tk.StringVar(value="2")
+        self.speed_var = tk.StringVar(value="1")
+        self.max_gap_var = tk.StringVar(value="")
+        self.keep_click_gaps_var = tk.BooleanVar(value=True)
+        self.checkpoints_var = tk.BooleanVar(value=checkpoints.available())
+        self.anchor_windows_var = tk.BooleanVar(value=windows.available())
+        self.trace_var = tk.BooleanVar(value=False)
+        self.range_start_var = tk.StringVar(value="")
+        self.range_stop_var = tk.StringVar(value="")
+
+        self.events = EventStore()
+        self.writer = None
+        self.recording_path = None
+        self.timeline = None
+        self.simplifier = None
+        self.held_buttons = set()
+        self.record_checkpoints = False
+        self.sampler = None
+        self.anchor_windows = False
+        self.anchor_hwnd = None
+        self.anchor_origin = (0, 0)
+        self.anchor_rect = None
         self.recording = False
         self.playing = False
         self.ctrl_pressed = False
@@ -48,16 +112,22 @@ class RecorderApp:
         self.stop_requested = False
         self.playback_stop_requested = False
         self.playback_stopped = False
+        self.playback_summary = ""
+        self.playback_timing = ""
         self.click_settle_delay = 0.01
         self.release_settle_delay = 0.02
 
         self.keyboard_listener = None
         self.mouse_listener = None
+        self.keyboard_ring = None
+        self.mouse_ring = None
+        self.ingestor = None
         self.hotkey = None
         self.playback_listener = None
         self.playback_hotkey = None
 
         self._build_ui()
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
 
     def _build_ui(self):
         frame = tk.Frame(self.root, padx=12, pady=12)
@@ -82,24 +152,194 @@ class RecorderApp:
         )
         self.play_button.grid(row=1, column=1, padx=(0, 8), pady=8, sticky="w")
 
-        tk.Label(frame, text="循环次数：").grid(row=2, column=0, sticky="e")
+        self.open_button = tk.Button(
+            frame,
+            text="打开录制",
+            width=14,
+            command=self.open_recording,
+        )
+        self.open_button.grid(row=2, column=0, padx=(0, 8), pady=(0, 8), sticky="w")
+
+        self.save_button = tk.Button(
+            frame,
+            text="另存录制",
+            width=14,
+            command=self.save_recording,
+            state=tk.DISABLED,
+        )
+        self.save_button.grid(row=2, column=1, padx=(0, 8), pady=(0, 8), sticky="w")
+
+        self.timeline_button = tk.Button(
+            frame,
+            text="时间轴",
+            width=14,
+            command=self.open_timeline,
+            state=tk.DISABLED,
+        )
+        self.timeline_button.grid(row=2, column=2, padx=(0, 8), pady=(0, 8), sticky="w")
+
+        tk.Label(frame, text="循环次数：").grid(row=3, column=0, sticky="e")
         self.loop_entry = tk.Entry(frame, textvariable=self.loop_var, width=6)
-        self.loop_entry.grid(row=2, column=1, sticky="w")
+        self.loop_entry.grid(row=3, column=1, sticky="w")
+
+        tk.Label(frame, text="轨迹简化容差(像素)：").grid(row=4, column=0, sticky="e")
+        self.tolerance_entry = tk.Entry(frame, textvariable=self.tolerance_var, width=6)
+        self.tolerance_entry.grid(row=4, column=1, sticky="w")
 
-        hint = "提示：录制中按 Ctrl + T 结束"
-        tk.Label(frame, text=hint, fg="#555555").grid(row=3, column=0, columnspan=3, sticky="w")
+        tk.Label(frame, text="复现速度倍率：").grid(row=5, column=0, sticky="e")
+        self.speed_entry = tk.Entry(frame, textvariable=self.speed_var, width=6)
+        self.speed_entry.grid(row=5, column=1, sticky="w")
+
+        tk.Label(frame, text="最长间隔(秒)：").grid(row=6, column=0, sticky="e")
+        self.max_gap_entry = tk.Entry(frame, textvariable=self.max_gap_var, width=6)
+        self.max_gap_entry.grid(row=6, column=1, sticky="w")
+        self.keep_click_gaps_check = tk.Checkbutton(
+            frame,
+            text="点击后的间隔不压缩",
+            variable=self.keep_click_gaps_var,
+        )
+        self.keep_click_gaps_check.grid(row=6, column=2, sticky="w")
+
+        tk.Label(frame, text="复现范围：").grid(row=7, column=0, sticky="e")
+        range_frame = tk.Frame(frame)
+        range_frame.grid(row=7, column=1, columnspan=2, sticky="w")
+        self.range_start_entry = tk.Entry(range_frame, textvariable=self.range_start_var, width=8)
+        self.range_start_entry.pack(side=tk.LEFT)
+        tk.Label(range_frame, text=" 至 ").pack(side=tk.LEFT)
+        self.range_stop_entry = tk.Entry(range_frame, textvariable=self.range_stop_var, width=8)
+        self.range_stop_entry.pack(side=tk.LEFT)
+
+        self.checkpoints_check = tk.Checkbutton(
+            frame,
+            text="画面检查点（录制点击处画面，复现时等待画面一致再点击）",
+            variable=self.checkpoints_var,
+            state=tk.NORMAL if checkpoints.available() else tk.DISABLED,
+        )
+        self.checkpoints_check.grid(row=8, column=0, columnspan=3, sticky="w")
+
+        self.anchor_windows_check = tk.Checkbutton(
+            frame,
+            text="按窗口记录鼠标坐标（复现时窗口移动后仍能点到原处）",
+            variable=self.anchor_windows_var,
+            state=tk.NORMAL if windows.available() else tk.DISABLED,
+        )
+        self.anchor_windows_check.grid(row=9, column=0, columnspan=3, sticky="w")
+
+        self.trace_check = tk.Checkbutton(
+            frame,
+            text="记录复现时序（可用 timing_report.py 生成延迟和漂移报告）",
+            variable=self.trace_var,
+        )
+        self.trace_check.grid(row=10, column=0, columnspan=3, sticky="w")
+
+        hint = "提示：录制中按 Ctrl + T 结束；容差为 0 时保留全部鼠标移动；最长间隔留空表示不限制"
+        if not checkpoints.available():
+            hint += "；安装 Pillow 后可使用画面检查点"
+        tk.Label(frame, text=hint, fg="#555555").grid(row=11, column=0, columnspan=3, sticky="w")
+        range_hint = "复现范围：填秒数或 #事件序号，留空表示开头/结尾；停止后自动填入停止位置"
+        tk.Label(frame, text=range_hint, fg="#555555").grid(row=12, column=0, columnspan=3, sticky="w")
+
+    def _set_idle_buttons(self):
+        has_events = tk.NORMAL if self.events else tk.DISABLED
+        self.record_button.config(state=tk.NORMAL)
+        self.open_button.config(state=tk.NORMAL)
+        self.play_button.config(state=has_events)
+        self.save_button.config(state=has_events if self.recording_path else tk.DISABLED)
+        self.timeline_button.config(state=has_events)
+
+    def _set_busy_buttons(self):
+        for button in (
+            self.record_button,
+            self.play_button,
+            self.open_button,
+            self.save_button,
+            self.timeline_button,
+        ):
+            button.config(state=tk.DISABLED)
+
+    def _is_busy(self):
+        return self.recording or self.playing
+
+    def _replace_events(self, events, path):
+        if self.timeline is not None:
+            self.timeline.close()
+            self.timeline = None
+        # 内存映射的录制文件需要显式关闭
+        close = getattr(self.events, "close", None)
+        if close is not None:
+            close()
+        self.events = events
+        self.recording_path = path
+
+    def open_timeline(self):
+        if self._is_busy() or not self.events:
+            return
+        if self.timeline is not None and self.timeline.exists():
+            self.timeline.lift()
+            return
+        # 在编辑视图上操作，底层录制和文件保持不变，直到另存
+        if not isinstance(self.events, RecordingView):
+            self.events = RecordingView(self.events)
+        self.timeline = TimelineWindow(self.root, self.events, self._on_timeline_changed, self._is_busy)
+
+    def _on_timeline_changed(self):
+        events = self.events
+        self.status_var.set(
+            f"状态：已编辑，剩余 {len(events)} 个事件，时长 {_format_duration(events.duration)}，另存录制可保存修改"
+        )
+        self._set_idle_buttons()
+
+    def _parse_tolerance(self):
+        try:
+            tolerance = float(self.tolerance_var.get().strip())
+        except ValueError:
+            return None
+        return tolerance if tolerance >= 0 else None
 
     def start_recording(self):
         if self.recording or self.playing:
             return
-        self.events = []
-        self.recording = True
+        tolerance = self._parse_tolerance()
+        if tolerance is None:
+            messagebox.showerror("输入错误", "轨迹简化容差需要为非负数")
+            return
+        # 录制过程中持续写入文件，程序异常退出时已录制的内容仍可打开
+        path = os.path.join(RECORDINGS_DIR, time.strftime("%Y%m%d_%H%M%S") + FILE_SUFFIX)
+        try:
+            os.makedirs(RECORDINGS_DIR, exist_ok=True)
+            self.writer = RecordingWriter(
+                path,
+                (self.root.winfo_screenwidth(), self.root.winfo_screenheight()),
+            )
+        except OSError as exc:
+            messagebox.showerror("录制失败", f"无法创建录制文件：{exc}")
+            return
+        self._replace_events(EventStore(sink=self.writer), path)
+        self.simplifier = MoveSimplifier(self.events, tolerance)
+        self.held_buttons = set()
+        self.record_checkpoints = checkpoints.available() and self.checkpoints_var.get()
+        self.anchor_windows = windows.available() and self.anchor_windows_var.get()
+        self.anchor_hwnd = None
+        self.anchor_origin = (0, 0)
+        self.anchor_rect = None
+        self.keyboard_ring = SpscRing()
+        self.mouse_ring = SpscRing()
+        self.ingestor = Ingestor((self.keyboard_ring, self.mouse_ring), self._consume_event)
+        self.sampler = checkpoints.FingerprintSampler() if self.record_checkpoints else None
         self.ctrl_pressed = False
         self.stop_requested = False
-        self.recording_start = time.monotonic()
+        self.recording_start = perf_counter_ns()
+        self.recording = True
+        self.ingestor.start()
+        if self.sampler:
+            self.sampler.start()
         self.status_var.set("状态：录制中")
-        self.record_button.config(state=tk.DISABLED)
-        self.play_button.config(state=tk.DISABLED)
+        self._set_busy_buttons()
+        self.tolerance_entry.config(state=tk.DISABLED)
+        if checkpoints.available():
+            self.checkpoints_check.config(state=tk.DISABLED)
+        if windows.available():
+            self.anchor_windows_check.config(state=tk.DISABLED)
 
         self.keyboard_listener = keyboard.Listener(
             on_press=self._on_key_press,
@@ -116,6 +356,26 @@ class RecorderApp:
         )
         self.keyboard_listener.start()
         self.mouse_listener.start()
+        self.root.after(500, self._update_recording_status)
+
+    def _update_recording_status(self):
+        if not self.recording:
+            return
+        self.writer.flush()
+        simplifier = self.simplifier
+        self.status_var.set(
+            f"状态：录制中，{len(self.events)} 个事件"
+            f"（鼠标移动保留 {simplifier.kept}/{simplifier.raw}，{simplifier.ratio:.0%}；"
+            f"{self._hook_summary()}）"
+        )
+        self.root.after(500, self._update_recording_status)
+
+    def _hook_summary(self):
+        calls, mean_us, max_us, dropped = hook_stats((self.keyboard_ring, self.mouse_ring))
+        summary = f"钩子回调平均 {mean_us:.1f} µs，最大 {max_us:.0f} µs"
+        if dropped:
+            summary += f"，丢弃 {dropped} 个事件"
+        return summary
 
     def stop_recording(self):
         if not self.recording:
@@ -126,16 +386,133 @@ class RecorderApp:
             self.keyboard_listener.stop()
         if self.mouse_listener:
             self.mouse_listener.stop()
+        # 处理完缓冲区中剩余的事件后再结束写入
+        self.ingestor.stop()
+        self.ingestor = None
+        if self.sampler:
+            self.sampler.stop()
+        self.simplifier.flush()
+        self.events.sink = None
+        self.writer.close()
+        self.writer = None
+
+        simplifier = self.simplifier
+        missed = ""
+        if self.sampler and self.sampler.missed:
+            missed = f"；{self.sampler.missed} 次点击前没有画面截图，未记录检查点"
+        self.status_var.set(
+            f"状态：已录制 {len(self.events)} 个事件（{self.events.nbytes / 1024:.0f} KB，"
+            f"鼠标移动保留 {simplifier.kept}/{simplifier.raw}；{self._hook_summary()}{missed}）"
+        )
+        self.tolerance_entry.config(state=tk.NORMAL)
+        if checkpoints.available():
+            self.checkpoints_check.config(state=tk.NORMAL)
+        if windows.available():
+            self.anchor_windows_check.config(state=tk.NORMAL)
+        self._set_idle_buttons()
+
+    def open_recording(self):
+        if self.recording or self.playing:
+            return
+        path = filedialog.askopenfilename(
+            title="打开录制",
+            initialdir=RECORDINGS_DIR if os.path.isdir(RECORDINGS_DIR) else None,
+            filetypes=[("录制文件", "*" + FILE_SUFFIX), ("所有文件", "*")],
+        )
+        if not path:
+            return
+        try:
+            recording = MappedRecording(path)
+        except (OSError, RecordingFormatError) as exc:
+            messagebox.showerror("打开失败", f"无法打开录制文件：{exc}")
+            return
+        self._replace_events(recording, path)
+        self.status_var.set(
+            f"状态：已加载 {len(recording)} 个事件（{os.path.basename(path)}，"
+            f"时长 {recording.duration:.1f} 秒）"
+        )
+        self._set_idle_buttons()
 
-        self.status_var.set(f"状态：已录制 {len(self.events)} 个事件")
-        self.record_button.config(state=tk.NORMAL)
-        self.play_button.config(state=tk.NORMAL if self.events else tk.DISABLED)
-
-    def _record_event(self, payload):
-        if not self.recording:
+    def save_recording(self):
+        if self.recording or self.playing or not self.recording_path:
+            return
+        path = filedialog.asksaveasfilename(
+            title="另存录制",
+            defaultextension=FILE_SUFFIX,
+            initialfile=os.path.basename(self.recording_path),
+            filetypes=[("录制文件", "*" + FILE_SUFFIX)],
+        )
+        if not path or os.path.abspath(path) == os.path.abspath(self.recording_path):
+            return
+        try:
+            if isinstance(self.events, RecordingView) and self.events.edited:
+                screen_size = getattr(self.events.base, "screen_size", None) or (
+                    self.root.winfo_screenwidth(),
+                    self.root.winfo_screenheight(),
+                )
+                write_recording(path, self.events, screen_size)
+            else:
+                shutil.copyfile(self.recording_path, path)
+        except OSError as exc:
+            messagebox.showerror("保存失败", f"无法保存录制文件：{exc}")
             return
-        payload["time"] = time.monotonic() - self.recording_start
-        self.events.append(payload)
+        self.status_var.set(f"状态：录制已保存到 {path}")
+
+    def _consume_event(self, item):
+        # 在消费线程中执行：解析按键和按钮、简化轨迹并写入录制
+        stamp, op, x, y, a, b = item
+        t = (stamp - self.recording_start) / 1e9
+        x, y = int(x), int(y)
+        # 鼠标事件保存相对锚点窗口的坐标，检查点仍按屏幕坐标截图
+        screen_x, screen_y = x, y
+        if op != KEY_PRESS and op != KEY_RELEASE:
+            if self.sampler:
+                self.sampler.track(x, y)
+            if self.anchor_windows:
+                x, y = self._to_window(t, op, x, y)
+        if op == MOUSE_MOVE:
+            self.simplifier.move(t, x, y, dragging=bool(self.held_buttons))
+            return
+        if op == KEY_PRESS or op == KEY_RELEASE:
+            a = self.events.intern_key(*_serialize_key(a))
+        elif op == MOUSE_CLICK:
+            a = self.events.intern_button(a.name)
+            if b:
+                self.held_buttons.add(a)
+            else:
+                self.held_buttons.discard(a)
+        # 先写入尚未提交的移动点，保证事件顺序和点击前的落点
+        self.simplifier.flush()
+        if op == MOUSE_CLICK and b and self.sampler:
+            # 使用按下之前截取的画面
+            fingerprint = self.sampler.before(stamp, screen_x, screen_y)
+            if fingerprint is not None:
+                self.events.append(t, CHECKPOINT, x, y, *pack_fingerprint(fingerprint))
+        self.events.append(t, op, x, y, a, int(b))
+
+    def _to_window(self, t, op, x, y):
+        # 只在没有按住鼠标按钮时切换锚点窗口，拖拽全程使用同一参照；
+        # 窗口或其位置变化时写入一个窗口锚点事件。
+        # 移动只在离开缓存的窗口矩形时重新查询，点击和滚动前总是重新查询
+        rect = self.anchor_rect
+        if not self.held_buttons and (
+            op != MOUSE_MOVE or rect is None or not (rect[0] <= x < rect[2] and rect[1] <= y < rect[3])
+        ):
+            hwnd = windows.root_window_at(x, y)
+            rect = windows.window_rect(hwnd) if hwnd else None
+            self.anchor_rect = rect
+            if rect is None:
+                hwnd, origin = None, (0, 0)
+            else:
+                origin = rect[:2]
+            if hwnd != self.anchor_hwnd or origin != self.anchor_origin:
+                self.simplifier.restart()
+                window = self.events.intern_window(*windows.describe(hwnd)) if hwnd else NO_WINDOW
+                self.events.append(t, WINDOW, origin[0], origin[1], window, 0)
+                self.anchor_hwnd = hwnd
+                self.anchor_origin = origin
+        ox, oy = self.anchor_origin
+        return x - ox, y - oy
 
     def _canonical(self, key):
         if self.keyboard_listener:
@@ -149,47 +526,39 @@ class RecorderApp:
         self.root.after(0, self.stop_recording)
 
     def _on_key_press(self, key):
+        stamp = perf_counter_ns()
         if key in (keyboard.Key.ctrl_l, keyboard.Key.ctrl_r):
             self.ctrl_pressed = True
         if self.hotkey:
             self.hotkey.press(self._canonical(key))
         if self.stop_requested:
             return False
-        self._record_event({"type": "key_press", "key": _serialize_key(key)})
+        if self.recording:
+            self.keyboard_ring.push((stamp, KEY_PRESS, 0, 0, key, 0))
 
     def _on_key_release(self, key):
+        stamp = perf_counter_ns()
         if key in (keyboard.Key.ctrl_l, keyboard.Key.ctrl_r):
             self.ctrl_pressed = False
         if self.hotkey:
             self.hotkey.release(self._canonical(key))
         if self.stop_requested:
             return False
-        self._record_event({"type": "key_release", "key": _serialize_key(key)})
+        if self.recording:
+            self.keyboard_ring.push((stamp, KEY_RELEASE, 0, 0, key, 0))
 
+    # 鼠标钩子回调只取时间戳并放入缓冲区，其余处理都在消费线程中完成
     def _on_move(self, x, y):
-        self._record_event({"type": "mouse_move", "x": x, "y": y})
+        if self.recording:
+            self.mouse_ring.push((perf_counter_ns(), MOUSE_MOVE, x, y, 0, 0))
 
     def _on_click(self, x, y, button, pressed):
-        self._record_event(
-            {
-                "type": "mouse_click",
-                "x": x,
-                "y": y,
-                "button": button.name,
-                "pressed": pressed,
-            }
-        )
+        if self.recording:
+            self.mouse_ring.push((perf_counter_ns(), MOUSE_CLICK, x, y, button, pressed))
 
     def _on_scroll(self, x, y, dx, dy):
-        self._record_event(
-            {
-                "type": "mouse_scroll",
-                "x": x,
-                "y": y,
-                "dx": dx,
-                "dy": dy,
-            }
-        )
+        if self.recording:
+            self.mouse_ring.push((perf_counter_ns(), MOUSE_SCROLL, x, y, dx, dy))
 
     def _parse_loops(self):
         raw = self.loop_var.get().strip()
@@ -199,6 +568,58 @@ class RecorderApp:
             return None
         return loops if loops > 0 else None
 
+    def _parse_speed(self):
+        try:
+            speed = float(self.speed_var.get().strip())
+        except ValueError:
+            return None
+        return speed if MIN_SPEED <= speed <= MAX_SPEED else None
+
+    def _parse_max_gap(self):
+        # 返回 (是否有效, 最长间隔)，留空表示不限制
+        raw = self.max_gap_var.get().strip()
+        if not raw:
+            return True, None
+        try:
+            max_gap = float(raw)
+        except ValueError:
+            return False, None
+        return (True, max_gap) if max_gap > 0 else (False, None)
+
+    def _parse_position(self, raw, is_end):
+        # 秒数按时间二分查找事件序号；#N 表示第 N 个事件（从 0 开始），作为结束位置时包含该事件
+        raw = raw.strip()
+        count = len(self.events)
+        if not raw:
+            return count if is_end else 0
+        try:
+            if raw.startswith("#"):
+                index = int(raw[1:])
+                if not 0 <= index < count:
+                    return None
+                return index + 1 if is_end else index
+            seconds = float(raw)
+        except ValueError:
+            return None
+        if seconds < 0:
+            return None
+        times = self.events.times
+        return bisect_right(times, seconds) if is_end else bisect_left(times, seconds)
+
+    def _set_playback_inputs(self, state):
+        for widget in (
+            self.loop_entry,
+            self.speed_entry,
+            self.max_gap_entry,
+            self.keep_click_gaps_check,
+            self.range_start_entry,
+            self.range_stop_entry,
+            self.trace_check,
+        ):
+            widget.config(state=state)
+        if checkpoints.available():
+            self.checkpoints_check.config(state=state)
+
     def start_playback(self):
         if self.recording or self.playing or not self.events:
             return
@@ -206,14 +627,51 @@ class RecorderApp:
         if loops is None:
             messagebox.showerror("输入错误", "循环次数需要为正整数")
             return
+        speed = self._parse_speed()
+        if speed is None:
+            messagebox.showerror("输入错误", f"复现速度倍率需要在 {MIN_SPEED:g} 到 {MAX_SPEED:g} 之间")
+            return
+        valid, max_gap = self._parse_max_gap()
+        if not valid:
+            messagebox.showerror("输入错误", "最长间隔需要为正数，或留空表示不限制")
+            return
+        start = self._parse_position(self.range_start_var.get(), is_end=False)
+        stop = self._parse_position(self.range_stop_var.get(), is_end=True)
+        if start is None or stop is None:
+            messagebox.showerror("输入错误", "复现范围需要为非负秒数或有效的 #事件序号")
+            return
+        if start >= stop:
+            messagebox.showerror("输入错误", "复现范围内没有事件")
+            return
+        options = {
+            "speed": speed,
+            "max_gap": max_gap,
+            "keep_click_gaps": self.keep_click_gaps_var.get(),
+            "start": start,
+            "stop": stop,
+        }
+        trace_writer = None
+        if self.trace_var.get():
+            path = os.path.join(TRACES_DIR, time.strftime("%Y%m%d_%H%M%S") + TRACE_SUFFIX)
+            try:
+                os.makedirs(TRACES_DIR, exist_ok=True)
+                trace_writer = RecordingWriter(
+                    path,
+                    (self.root.winfo_screenwidth(), self.root.winfo_screenheight()),
+                    magic=TRACE_MAGIC,
+                )
+            except OSError as exc:
+                messagebox.showerror("复现失败", f"无法创建时序文件：{exc}")
+                return
 
         self.playing = True
         self.playback_stop_requested = False
         self.playback_stopped = False
+        self.playback_summary = ""
+        self.playback_timing = ""
         self.status_var.set("状态：复现中")
-        self.record_button.config(state=tk.DISABLED)
-        self.play_button.config(state=tk.DISABLED)
-        self.loop_entry.config(state=tk.DISABLED)
+        self._set_busy_buttons()
+        self._set_playback_inputs(tk.DISABLED)
 
         self.playback_hotkey = keyboard.HotKey(
             keyboard.HotKey.parse("<ctrl>+y"),
@@ -225,7 +683,11 @@ class RecorderApp:
         )
         self.playback_listener.start()
 
-        thread = threading.Thread(target=self._playback_worker, args=(loops,), daemon=True)
+        thread = threading.Thread(
+            target=self._playback_worker,
+            args=(loops, options, self.checkpoints_var.get(), trace_writer),
+            daemon=True,
+        )
         thread.start()
 
     def _on_stop_playback_hotkey(self):
@@ -246,83 +708,86 @@ class RecorderApp:
         if self.playback_stop_requested:
             return False
 
-    def _sleep_with_cancel(self, duration):
-        end_time = time.monotonic() + duration
-        while time.monotonic() < end_time:
-            if self.playback_stop_requested:
-                return False
-            remaining = end_time - time.monotonic()
-            time.sleep(min(0.05, max(0.0, remaining)))
-        return True
-
-    def _settle_mouse(self):
-        if self.click_settle_delay > 0:
-            self._sleep_with_cancel(self.click_settle_delay)
-
-    def _settle_after_release(self):
-        if self.release_settle_delay > 0:
-            self._sleep_with_cancel(self.release_settle_delay)
+    def _should_stop_playback(self):
+        return self.playback_stop_requested
 
-    def _playback_worker(self, loops):
+    def _playback_worker(self, loops, options, use_checkpoints, trace_writer):
         try:
-            key_controller = keyboard.Controller()
-            mouse_controller = mouse.Controller()
-            pressed_buttons = set()
-            last_mouse_pos = None
-
-            for _ in range(loops):
-                last_time = 0.0
-                for event in self.events:
-                    if self.playback_stop_requested:
-                        return
-                    delay = event["time"] - last_time
-                    if delay > 0:
-                        if not self._sleep_with_cancel(delay):
-                            return
-                    last_time = event["time"]
-
-                    etype = event["type"]
-                    if etype == "key_press":
-                        key_controller.press(_deserialize_key(event["key"]))
-                    elif etype == "key_release":
-                        key_controller.release(_deserialize_key(event["key"]))
-                    elif etype == "mouse_move":
-                        target_pos = (event["x"], event["y"])
-                        if pressed_buttons and last_mouse_pos is not None:
-                            dx = target_pos[0] - last_mouse_pos[0]
-                            dy = target_pos[1] - last_mouse_pos[1]
-                            mouse_controller.move(dx, dy)
-                        else:
-                            mouse_controller.position = target_pos
-                        last_mouse_pos = target_pos
-                    elif etype == "mouse_click":
-                        mouse_controller.position = (event["x"], event["y"])
-                        last_mouse_pos = (event["x"], event["y"])
-                        self._settle_mouse()
-                        button = mouse.Button[event["button"]]
-                        if event["pressed"]:
-                            pressed_buttons.add(button)
-                            mouse_controller.press(button)
-                        else:
-                            mouse_controller.release(button)
-                            pressed_buttons.discard(button)
-                            self._settle_after_release()
-                    elif etype == "mouse_scroll":
-                        mouse_controller.position = (event["x"], event["y"])
-                        last_mouse_pos = (event["x"], event["y"])
-                        mouse_controller.scroll(event["dx"], event["dy"])
+            waiter = None
+            if use_checkpoints and checkpoints.available():
+                waiter = checkpoints.CheckpointWaiter(CHECKPOINT_TIMEOUT)
+            backend = create_backend()
+            anchors = windows.WindowAnchors(self.events.windows, backend.move_to) if windows.available() else None
+            # 录制只编译一次：按键、按钮对象和拖拽偏移都提前算好，各轮直接复用
+            program = compile_program(
+                self.events,
+                backend,
+                click_settle=self.click_settle_delay,
+                release_settle=self.release_settle_delay,
+                checkpoint=waiter,
+                anchors=anchors,
+                **options,
+            )
+            expected = program.length * loops
+            original = program.original_length * loops
+            self.root.after(0, self._report_plan, expected, original)
+            trace = PlaybackTrace(trace_writer, program, backend, anchors) if trace_writer else None
+            start = time.perf_counter()
+            if not play(program, loops, self._should_stop_playback, self._on_loop_finished, trace):
+                release_held(self.events, program, backend)
+                self.root.after(0, self._remember_stop_position, program.stopped_event())
+            self.playback_timing = (
+                f"实际用时 {_format_duration(time.perf_counter() - start)}，"
+                f"预计 {_format_duration(expected)}，原速 {_format_duration(original)}"
+            )
+            if waiter is not None and waiter.checked:
+                self.playback_timing += f"，{waiter.summary()}"
+            if anchors is not None and anchors.missing:
+                self.playback_timing += f"，{len(anchors.missing)} 个窗口未找到，按录制时的位置复现"
+            if program.batches:
+                self.playback_timing += f"，{program.batched_steps} 个操作合并为 {program.batches} 次批量注入"
+            if trace_writer is not None:
+                self.playback_timing += f"，时序记录已保存到 {trace_writer.path}"
         finally:
+            if trace_writer is not None:
+                trace_writer.close()
             self.root.after(0, self._playback_finished)
 
+    def _remember_stop_position(self, index):
+        # 把停止位置填入复现范围起点，修复问题后可直接从这里继续
+        if index is None or index >= len(self.events):
+            return
+        self.range_start_var.set(f"#{index}")
+        self.playback_summary = (
+            f"停止于第 {index} 个事件（{self.events.times[index]:.2f} 秒）"
+            + (f"，{self.playback_summary}" if self.playback_summary else "")
+        )
+
+    def _report_plan(self, expected, original):
+        if self.playing:
+            self.status_var.set(
+                f"状态：复现中，预计用时 {_format_duration(expected)}"
+                f"（原速 {_format_duration(original)}，节省 {_format_duration(max(0.0, original - expected))}）"
+            )
+
+    def _on_loop_finished(self, loop, loops, stats):
+        self.root.after(0, self._report_loop, loop, loops, stats.summary())
+
+    def _report_loop(self, loop, loops, summary):
+        self.playback_summary = f"第 {loop}/{loops} 轮，{summary}"
+        if self.playing:
+            self.status_var.set(f"状态：复现中，{self.playback_summary}")
+
     def _playback_finished(self):
         self.playing = False
+        details = "；".join(part for part in (self.playback_timing, self.playback_summary) if part)
+        summary = f"（{details}）" if details else ""
         if self.playback_stopped:
-            self.status_var.set("状态：复现已停止，可修改次数继续复现")
+            self.status_var.set(f"状态：复现已停止{summary}，可修改次数继续复现")
         else:
-            self.status_var.set("状态：复现完成，可修改次数继续复现")
-        self.record_button.config(state=tk.NORMAL)
-        self.play_button.config(state=tk.NORMAL if self.events else tk.DISABLED)
-        self.loop_entry.config(state=tk.NORMAL)
+            self.status_var.set(f"状态：复现完成{summary}，可修改次数继续复现")
+        self._set_idle_buttons()
+        self._set_playback_inputs(tk.NORMAL)
         if self.playback_listener:
             self.playback_listener.stop()
         self.playback_listener = None
@@ -330,6 +795,12 @@ class RecorderApp:
         self.playback_stop_requested = False
         self.playback_stopped = False
 
+    def _on_close(self):
+        if self.recording:
+            self.stop_recording()
+        self.playback_stop_requested = True
+        self.root.destroy()
+
 
 if __name__ == "__main__":
     _enable_dpi_awareness()
@@ -0,0 +1,422 @@
+import ctypes
+import time
+from array import array
+from contextlib import contextmanager
+
+from events import (
+    CHECKPOINT,
+    KEY_PRESS,
+    KEY_RELEASE,
+    MOUSE_CLICK,
+    MOUSE_MOVE,
+    MOUSE_SCROLL,
+    NO_WINDOW,
+    WINDOW,
+    unpack_fingerprint,
+)
+
+# 距离截止时间不足 SPIN_THRESHOLD 秒时改为忙等，避免 sleep 的唤醒误差
+SPIN_THRESHOLD = 0.002
+# 单次 sleep 的上限，保证停止请求能及时响应
+MAX_SLEEP = 0.05
+# 相对时间相差不超过 BATCH_WINDOW 秒的连续操作合并为一次批量注入
+BATCH_WINDOW = 0.001
+# 时序记录中批量注入步骤的类型，其余步骤使用对应的事件类型
+TRACE_BATCH = 0x80
+
+clock = time.perf_counter
+
+
+def wait_until(deadline, should_stop):
+    while True:
+        remaining = deadline - clock()
+        if remaining <= 0:
+            return True
+        if should_stop():
+            return False
+        if remaining > SPIN_THRESHOLD:
+            time.sleep(min(MAX_SLEEP, remaining - SPIN_THRESHOLD))
+
+
+@contextmanager
+def high_resolution_timer():
+    # Windows 默认定时器精度约 15.6 ms，复现期间临时提高到 1 ms
+    winmm = getattr(ctypes, "windll", None) and ctypes.windll.winmm
+    if winmm:
+        winmm.timeBeginPeriod(1)
+    try:
+        yield
+    finally:
+        if winmm:
+            winmm.timeEndPeriod(1)
+
+
+class LatenessStats:
+    # 记录每个事件实际注入完成时间相对计划时间的延迟（秒），包含注入调用本身的耗时
+    def __init__(self):
+        self.samples = []
+
+    def __len__(self):
+        return len(self.samples)
+
+    def add(self, lateness):
+        self.samples.append(lateness)
+
+    def summary(self):
+        if not self.samples:
+            return "无事件"
+        ordered = sorted(self.samples)
+        last = len(ordered) - 1
+
+        def pick(fraction):
+            return ordered[min(last, int(fraction * len(ordered)))] * 1000
+
+        return f"延迟 p50 {pick(0.5):.2f} ms，p95 {pick(0.95):.2f} ms，最大 {ordered[-1] * 1000:.2f} ms"
+
+
+class Program:
+    # 编译后的复现程序：steps 为 (相对时间, 可调用对象, 参数) 的扁平列表，
+    # 播放时内层循环只需等待截止时间并调用一次。
+    # 可调用对象为 sync 的步骤是画面检查点：参数首项为最早开始检查的相对时间，
+    # 不等截止时间，画面匹配后以当前时间重新对齐日程。
+    # origins 记录每个步骤来自哪个事件，停止时 stopped_at 为尚未执行的第一个步骤
+    def __init__(self, steps, length, original_length, sync=None, origins=None):
+        self.steps = steps
+        self.length = length
+        self.original_length = original_length
+        self.sync = sync
+        self.origins = origins
+        self.stopped_at = None
+        self.batches = 0
+        self.batched_steps = 0
+
+    def stopped_event(self):
+        if self.stopped_at is None or not self.origins:
+            return None
+        return self.origins[min(self.stopped_at, len(self.origins) - 1)]
+
+    def __len__(self):
+        return len(self.steps)
+
+
+class PlaybackTrace:
+    # 复现时序记录：播放时每个步骤只追加计划时间和实际时间，每轮结束后统一写入 writer
+    # （recfile.RecordingWriter，magic 为 TRACE_MAGIC）。每条记录：
+    #   t  注入完成时间（相对复现开始，秒）  op  步骤类型
+    #   x  轮次                              y   来源事件序号
+    #   a  相对截止时间的延迟（微秒）        b   相对理想日程的累计漂移（微秒）
+    # 理想日程为复现开始时间 + 轮次 × 每轮时长 + 相对时间，画面检查点的等待也计入漂移。
+    def __init__(self, writer, program, backend, anchors=None):
+        self.writer = writer
+        self.program = program
+        self.origin = None
+        self.deadlines = array("d")
+        self.actual = array("d")
+        self.positions = array("i")
+        kinds = {
+            backend.move_to: MOUSE_MOVE,
+            backend.move_by: MOUSE_MOVE,
+            backend.press_key: KEY_PRESS,
+            backend.release_key: KEY_RELEASE,
+            backend.press_button: MOUSE_CLICK,
+            backend.release_button: MOUSE_CLICK,
+            backend.scroll: MOUSE_SCROLL,
+        }
+        if backend.encoders:
+            kinds[backend.send_batch] = TRACE_BATCH
+        if anchors is not None:
+            kinds[anchors.move_to] = MOUSE_MOVE
+            kinds[anchors.refresh] = WINDOW
+        self._kinds = kinds
+
+    def begin(self, origin):
+        self.origin = origin
+
+    def add(self, position, deadline, actual):
+        self.positions.append(position)
+        self.deadlines.append(deadline)
+        self.actual.append(actual)
+
+    def end_loop(self, loop):
+        program = self.program
+        steps = program.steps
+        origins = program.origins
+        kinds = self._kinds
+        append = self.writer.append
+        ideal_base = self.origin + loop * program.length
+        for position, deadline, actual in zip(self.positions, self.deadlines, self.actual):
+            offset, func, _ = steps[position]
+            append(
+                actual - self.origin,
+                kinds.get(func, MOUSE_MOVE),
+                loop,
+                origins[position],
+                round((actual - deadline) * 1e6),
+                round((actual - ideal_base - offset) * 1e6),
+            )
+        del self.positions[:], self.deadlines[:], self.actual[:]
+        self.writer.flush(force=True)
+
+
+def held_state(events, index):
+    # 重放第 index 个事件之前的所有事件，得到此刻仍按住的按键、鼠标按钮、鼠标位置和窗口锚点
+    keys = {}
+    buttons = {}
+    position = None
+    anchor = (NO_WINDOW, 0, 0)
+    for _, op, x, y, a, b in events.iter_rows(0, index):
+        if op == KEY_PRESS:
+            keys[a] = True
+        elif op == KEY_RELEASE:
+            keys.pop(a, None)
+        elif op == MOUSE_CLICK:
+            if b:
+                buttons[a] = True
+            else:
+                buttons.pop(a, None)
+            position = (x, y)
+        elif op == MOUSE_MOVE or op == MOUSE_SCROLL:
+            position = (x, y)
+        elif op == WINDOW:
+            anchor = (a, x, y)
+    return list(keys), list(buttons), position, anchor
+
+
+def release_held(events, program, backend):
+    # 复现被停止时松开此刻仍按住的鼠标按钮和按键：compile_program 只在程序结尾安排松开，
+    # 中途停止时不会执行到那里
+    index = program.stopped_event()
+    if index is None:
+        return
+    held_keys, held_buttons, _, _ = held_state(events, index)
+    for button_id in held_buttons:
+        backend.release_button(backend.button(events.button(button_id)))
+    for key_id in held_keys:
+        backend.release_key(backend.key(*events.key(key_id)))
+
+
+def compile_program(
+    events,
+    backend,
+    click_settle=0.0,
+    release_settle=0.0,
+    speed=1.0,
+    max_gap=None,
+    keep_click_gaps=False,
+    checkpoint=None,
+    start=0,
+    stop=None,
+    anchors=None,
+):
+    # speed 缩放事件间隔；max_gap 限制任意两个事件之间的最长等待，
+    # keep_click_gaps 为 True 时点击之后的间隔不压缩，给目标程序留出响应时间。
+    # 稳定等待是物理时间，不随倍率缩放。
+    # checkpoint 为 checkpoints.CheckpointWaiter 时在点击前按画面检查点同步，为 None 时忽略检查点。
+    # start/stop 为事件序号，只复现 [start, stop) 的事件：开头先恢复此刻应按住的按键和按钮，
+    # 结尾松开仍按住的按键和按钮，每轮都从一致的状态开始。
+    # 窗口锚定的录制中，anchors 为 windows.WindowAnchors 时按窗口当前位置换算坐标，
+    # 为 None 时使用录制时的窗口位置。
+    sync = checkpoint.wait if checkpoint is not None else None
+    if checkpoint is not None:
+        checkpoint.anchors = anchors
+    stop = len(events) if stop is None else min(stop, len(events))
+    start = max(0, min(start, stop))
+    keys = {}
+    buttons = {}
+    steps = []
+    origins = array("i")
+    index = start
+
+    def append(step):
+        steps.append(step)
+        origins.append(index)
+
+    def resolve_key(key_id):
+        key = keys.get(key_id)
+        if key is None:
+            key = keys[key_id] = backend.key(*events.key(key_id))
+        return key
+
+    def resolve_button(button_id):
+        button = buttons.get(button_id)
+        if button is None:
+            button = buttons[button_id] = backend.button(events.button(button_id))
+        return button
+
+    def move_step(offset, x, y):
+        if window >= 0 and anchors is not None:
+            return offset, anchors.move_to, (window, x, y)
+        return offset, backend.move_to, ((x + origin_x, y + origin_y),)
+
+    if start:
+        held_keys, held_buttons, last_pos, (window, origin_x, origin_y) = held_state(events, start)
+    else:
+        held_keys, held_buttons, last_pos, (window, origin_x, origin_y) = [], [], None, (NO_WINDOW, 0, 0)
+    keys_down = set(held_keys)
+    pressed = set(held_buttons)
+    if window >= 0 and anchors is not None:
+        append((0.0, anchors.refresh, (window, origin_x, origin_y)))
+    if last_pos is not None:
+        append(move_step(0.0, *last_pos))
+    for key_id in held_keys:
+        append((0.0, backend.press_key, (resolve_key(key_id),)))
+    for button_id in held_buttons:
+        append((0.0, backend.press_button, (resolve_button(button_id),)))
+
+    first_t = events.times[start] if start < stop else 0.0
+    not_before = click_settle if held_buttons else 0.0
+    last_t = first_t if start else 0.0
+    last_op = None
+    scaled = 0.0
+
+    for index, (t, op, x, y, a, b) in enumerate(events.iter_rows(start, stop), start):
+        gap = t - last_t
+        if max_gap is not None and gap > max_gap and not (keep_click_gaps and last_op == MOUSE_CLICK):
+            gap = max_gap
+        scaled += gap / speed
+        last_t = t
+        last_op = op
+        offset = scaled if scaled >= not_before else not_before
+        if op == KEY_PRESS:
+            keys_down.add(a)
+            append((offset, backend.press_key, (resolve_key(a),)))
+        elif op == KEY_RELEASE:
+            keys_down.discard(a)
+            append((offset, backend.release_key, (resolve_key(a),)))
+        elif op == MOUSE_MOVE:
+            # 拖拽中使用相对移动，偏移量在编译时算好
+            if pressed and last_pos is not None:
+                append((offset, backend.move_by, (x - last_pos[0], y - last_pos[1])))
+            else:
+                append(move_step(offset, x, y))
+            last_pos = (x, y)
+        elif op == MOUSE_CLICK:
+            button = resolve_button(a)
+            if b and window >= 0 and anchors is not None:
+                # 每次按下前重新检查窗口位置，锚点之后窗口被移动时点击仍落在窗口内的同一位置
+                append((max(0.0, offset - click_settle), anchors.refresh, (window, origin_x, origin_y)))
+            # 点击前的稳定等待计入日程：提前移动到点击位置，按下仍在录制时间触发
+            append(move_step(max(0.0, offset - click_settle), x, y))
+            last_pos = (x, y)
+            if b:
+                pressed.add(a)
+                append((offset, backend.press_button, (button,)))
+            else:
+                pressed.discard(a)
+                append((offset, backend.release_button, (button,)))
+                # 松开后的稳定时间同样计入日程，之后的事件最早在此之后触发
+                not_before = offset + release_settle
+        elif op == MOUSE_SCROLL:
+            append(move_step(offset, x, y))
+            last_pos = (x, y)
+            append((offset, backend.scroll, (a, b)))
+        elif op == CHECKPOINT and sync is not None:
+            # 检查点与随后的点击同时记录，对齐到点击前移动鼠标的时刻；
+            # 最早从上一次松开的稳定时间结束后开始检查
+            earliest = not_before if not_before < offset else offset
+            if window >= 0 and anchors is not None:
+                args = (earliest, x, y, unpack_fingerprint(a, b), window)
+            else:
+                args = (earliest, x + origin_x, y + origin_y, unpack_fingerprint(a, b), NO_WINDOW)
+            append((max(0.0, offset - click_settle), sync, args))
+        elif op == WINDOW:
+            # 锚点处检查窗口位置，之后的鼠标坐标相对该窗口
+            window, origin_x, origin_y = a, x, y
+            if window >= 0 and anchors is not None:
+                append((offset, anchors.refresh, (window, x, y)))
+
+    end = scaled if scaled >= not_before else not_before
+    index = stop
+    for button_id in pressed:
+        append((end, backend.release_button, (resolve_button(button_id),)))
+    for key_id in keys_down:
+        append((end, backend.release_key, (resolve_key(key_id),)))
+
+    last_recorded = events.times[stop - 1] if start < stop else first_t
+    original_length = last_recorded - (first_t if start else 0.0) + release_settle
+    program = Program(steps, end + release_settle, original_length, sync, origins)
+    if backend.encoders:
+        batch_steps(program, backend)
+    return program
+
+
+def batch_steps(program, backend, window=BATCH_WINDOW):
+    # 把同一时间窗口内、后端能够编码的连续操作合并为一个 send_batch 步骤，
+    # 编码在这里一次完成，复现时整批只需一次系统调用
+    encoders = backend.encoders
+    steps = program.steps
+    origins = program.origins
+    merged = []
+    merged_origins = array("i")
+    count = len(steps)
+    i = 0
+    while i < count:
+        offset = steps[i][0]
+        encoded = []
+        j = i
+        while j < count:
+            step_offset, func, args = steps[j]
+            if step_offset - offset > window:
+                break
+            encoder = encoders.get(func)
+            item = encoder(*args) if encoder is not None else None
+            if item is None:
+                break
+            encoded.append(item)
+            j += 1
+        if j - i >= 2:
+            merged.append((offset, backend.send_batch, (backend.pack(encoded),)))
+            merged_origins.append(origins[i])
+            program.batches += 1
+            program.batched_steps += j - i
+            i = j
+        else:
+            merged.append(steps[i])
+            merged_origins.append(origins[i])
+            i += 1
+    program.steps = merged
+    program.origins = merged_origins
+
+
+def play(program, loops, should_stop, on_loop=None, trace=None):
+    # 所有步骤按“本轮起点 + 相对时间”的绝对截止时间触发，注入耗时不会累积成漂移
+    # trace 为 PlaybackTrace 时记录每个步骤的实际注入完成时间
+    # 返回 False 表示被停止
+    steps = program.steps
+    sync = program.sync
+    program.stopped_at = None
+    base = clock()
+    if trace is not None:
+        trace.begin(base)
+    with high_resolution_timer():
+        for loop in range(loops):
+            stats = LatenessStats()
+            add = stats.add
+            for position, (offset, func, args) in enumerate(steps):
+                if func is sync:
+                    if not wait_until(base + args[0], should_stop) or not func(*args[1:], should_stop):
+                        program.stopped_at = position
+                        if trace is not None:
+                            trace.end_loop(loop)
+                        return False
+                    base = clock() - offset
+                    continue
+                deadline = base + offset
+                if not wait_until(deadline, should_stop):
+                    program.stopped_at = position
+                    if trace is not None:
+                        trace.end_loop(loop)
+                    return False
+                func(*args)
+                # 在注入返回后取时间，延迟包含 SendInput 等调用的耗时，反映输入真正送达的时刻
+                done = clock()
+                add(done - deadline)
+                if trace is not None:
+                    trace.add(position, deadline, done)
+            if trace is not None:
+                trace.end_loop(loop)
+            if on_loop is not None:
+                on_loop(loop + 1, loops, stats)
+            # 下一轮紧接本轮日程开始；本轮意外卡顿时从当前时间重新对齐，避免集中补发
+            base = max(base + program.length, clock())
+    return True
@@ -0,0 +1,253 @@
+import mmap
+import struct
+import threading
+import time
+from bisect import bisect_right
+
+# 录制文件格式（小端）：
+#   文件头 32 字节：magic、版本、记录长度、屏幕宽高、创建时间
+#   之后是定长 28 字节的记录：time(f64) op(u8) flags(u8) ref(u16) x y a b(i32)
+# 按键、鼠标按钮和窗口（类名与标题以 \x1f 分隔）名称在首次使用时以定义记录写入：
+#   DEFINE 记录 flags=表，ref=id，a=按键类别，b=名称字节数（-1 表示无名称）
+#   随后是若干 TEXT 记录，每条携带 16 字节名称
+# 文件只追加写入，被强制结束时最多丢失最后一次刷新后的记录，末尾不完整的记录在加载时忽略。
+# 复现时序记录使用相同格式，文件头 magic 为 TRACE_MAGIC（记录含义见 player.PlaybackTrace）。
+
+MAGIC = b"ROPR"
+TRACE_MAGIC = b"ROPT"
+VERSION = 1
+HEADER = struct.Struct("<4sHHiid8x")
+RECORD = struct.Struct("<dBBHiiii")
+TEXT = struct.Struct("<dBBH16s")
+OP_OFFSET = 8
+
+OP_DEFINE = 0xF0
+OP_TEXT = 0xF1
+
+TABLE_KEY = 0
+TABLE_BUTTON = 1
+TABLE_WINDOW = 2
+WINDOW_SEPARATOR = "\x1f"
+
+KEY_KINDS = ("char", "key")
+
+FILE_SUFFIX = ".rop"
+TRACE_SUFFIX = ".ropt"
+
+
+class RecordingFormatError(Exception):
+    pass
+
+
+class RecordingWriter:
+    def __init__(self, path, screen_size, flush_interval=0.5, flush_bytes=64 * 1024, magic=MAGIC):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flush_bytes = flush_bytes
+        self._file = open(path, "wb")
+        self._file.write(
+            HEADER.pack(magic, VERSION, RECORD.size, screen_size[0], screen_size[1], time.time())
+        )
+        self._file.flush()
+        self._buffer = bytearray()
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self.records = 0
+
+    def append(self, t, op, x=0, y=0, a=0, b=0):
+        with self._lock:
+            self._buffer += RECORD.pack(t, op, 0, 0, x, y, a, b)
+            self.records += 1
+            if len(self._buffer) >= self.flush_bytes:
+                self._flush()
+
+    def define_key(self, key_id, kind, value):
+        self._define(TABLE_KEY, key_id, KEY_KINDS.index(kind), value)
+
+    def define_button(self, button_id, name):
+        self._define(TABLE_BUTTON, button_id, 0, name)
+
+    def define_window(self, window_id, class_name, title):
+        self._define(TABLE_WINDOW, window_id, 0, class_name + WINDOW_SEPARATOR + title)
+
+    def _define(self, table, ref, kind, text):
+        data = b"" if text is None else text.encode("utf-8")
+        with self._lock:
+            self._buffer += RECORD.pack(
+                0.0, OP_DEFINE, table, ref, 0, 0, kind, -1 if text is None else len(data)
+            )
+            for start in range(0, len(data), 16):
+                self._buffer += TEXT.pack(0.0, OP_TEXT, table, ref, data[start:start + 16])
+            # 定义记录立即落盘，保证之后的事件可以被解析
+            self._flush()
+
+    def flush(self, force=False):
+        with self._lock:
+            if force or time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush()
+
+    def _flush(self):
+        if self._buffer:
+            self._file.write(self._buffer)
+            self._buffer = bytearray()
+        self._file.flush()
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            if self._file.closed:
+                return
+            self._flush()
+            self._file.close()
+
+
+def write_recording(path, recording, screen_size):
+    # 把任意录制（EventStore、MappedRecording 或编辑后的视图）写成新的录制文件
+    writer = RecordingWriter(path, screen_size)
+    try:
+        for key_id, (kind, value) in enumerate(recording.keys):
+            writer.define_key(key_id, kind, value)
+        for button_id, name in enumerate(recording.buttons):
+            writer.define_button(button_id, name)
+        for window_id, (class_name, title) in enumerate(recording.windows):
+            writer.define_window(window_id, class_name, title)
+        for row in recording.iter_rows():
+            writer.append(*row)
+    finally:
+        writer.close()
+
+
+class _MappedTimes:
+    # 按需从映射文件中读取事件时间，可直接用于 bisect
+    def __init__(self, recording):
+        self._recording = recording
+
+    def __len__(self):
+        return len(self._recording)
+
+    def __getitem__(self, index):
+        recording = self._recording
+        if index < 0:
+            index += len(recording)
+        if not 0 <= index < len(recording):
+            raise IndexError(index)
+        return struct.unpack_from("<d", recording.view, recording._offset(index))[0]
+
+
+class MappedRecording:
+    # 以内存映射方式打开录制文件，只扫描类型列找出定义记录，事件记录在播放时才解析
+    def __init__(self, path, magic=MAGIC):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise RecordingFormatError("录制文件为空")
+        self.view = memoryview(self._map)
+
+        if len(self._map) < HEADER.size:
+            self.close()
+            raise RecordingFormatError("录制文件头不完整")
+        file_magic, version, record_size, width, height, created = HEADER.unpack_from(self._map, 0)
+        if file_magic != magic or record_size != RECORD.size:
+            self.close()
+            raise RecordingFormatError("不是有效的录制文件")
+        if version > VERSION:
+            self.close()
+            raise RecordingFormatError(f"不支持的录制文件版本：{version}")
+        self.version = version
+        self.screen_size = (width, height)
+        self.created = created
+
+        total = (len(self._map) - HEADER.size) // RECORD.size
+        self._total = total
+        self.keys = []
+        self.buttons = []
+        self.windows = []
+        self._def_positions = []
+        self._load_definitions()
+        self._count = total - len(self._def_positions)
+        # 第 k 个定义记录之前有 _def_events[k] 个事件，用于把事件序号换算为记录序号
+        self._def_events = [pos - k for k, pos in enumerate(self._def_positions)]
+        self.times = _MappedTimes(self)
+
+    def _load_definitions(self):
+        start = HEADER.size + OP_OFFSET
+        ops = self._map[start:start + self._total * RECORD.size:RECORD.size]
+        texts = {}
+        defines = []
+        for op in (OP_DEFINE, OP_TEXT):
+            marker = bytes([op])
+            pos = ops.find(marker)
+            while pos != -1:
+                self._def_positions.append(pos)
+                offset = HEADER.size + pos * RECORD.size
+                if op == OP_DEFINE:
+                    defines.append(RECORD.unpack_from(self._map, offset))
+                else:
+                    _, _, table, ref, chunk = TEXT.unpack_from(self._map, offset)
+                    texts.setdefault((table, ref), []).append(chunk)
+                pos = ops.find(marker, pos + 1)
+        self._def_positions.sort()
+
+        for _, _, table, ref, _, _, kind, length in defines:
+            data = b"".join(texts.get((table, ref), ()))
+            # 文件在写入名称时被中断则视为无名称
+            text = None if length < 0 or len(data) < length else data[:length].decode("utf-8")
+            if table == TABLE_KEY:
+                values, value = self.keys, (KEY_KINDS[kind], text)
+            elif table == TABLE_WINDOW:
+                class_name, _, title = (text or "").partition(WINDOW_SEPARATOR)
+                values, value = self.windows, (class_name, title)
+            else:
+                values, value = self.buttons, text
+            while len(values) <= ref:
+                values.append(None)
+            values[ref] = value
+
+    def __len__(self):
+        return self._count
+
+    def __bool__(self):
+        return self._count > 0
+
+    def _offset(self, index):
+        return HEADER.size + (index + bisect_right(self._def_events, index)) * RECORD.size
+
+    def key(self, key_id):
+        return self.keys[key_id]
+
+    def button(self, button_id):
+        return self.buttons[button_id]
+
+    @property
+    def duration(self):
+        return self.times[-1] if self._count else 0.0
+
+    @property
+    def nbytes(self):
+        return len(self._map)
+
+    def row(self, index):
+        t, op, _, _, x, y, a, b = RECORD.unpack_from(self.view, self._offset(index))
+        return t, op, x, y, a, b
+
+    def iter_rows(self, start=0, stop=None):
+        stop = self._count if stop is None else min(stop, self._count)
+        if start >= stop:
+            return
+        first = start + bisect_right(self._def_events, start)
+        last = stop + bisect_right(self._def_events, stop - 1)
+        view = self.view[HEADER.size + first * RECORD.size:HEADER.size + last * RECORD.size]
+        for t, op, _, _, x, y, a, b in RECORD.iter_unpack(view):
+            if op < OP_DEFINE:
+                yield t, op, x, y, a, b
+
+    def close(self):
+        if getattr(self, "view", None) is not None:
+            self.view.release()
+            self.view = None
+        if not self._map.closed:
+            self._map.close()
+        self._file.close()
@@ -0,0 +1,272 @@
+import math
+import tkinter as tk
+from bisect import bisect_left, bisect_right
+
+from editing import density
+from events import CHECKPOINT, KEY_PRESS, MOUSE_CLICK, MOUSE_SCROLL
+
+# 时间轴只绘制可见时间窗口：密度按像素聚合（见 editing.density），
+# 可见事件不超过 DETAIL_LIMIT 个时才逐个绘制点击、按键等标记。
+
+DETAIL_LIMIT = 20000
+MIN_SPAN = 0.01
+AXIS_HEIGHT = 20
+DENSITY_BOTTOM = 110
+MARKERS = {
+    MOUSE_CLICK: ("#d04a4a", 116, 132),
+    MOUSE_SCROLL: ("#e08a2a", 116, 132),
+    CHECKPOINT: ("#8a5ad0", 116, 122),
+    KEY_PRESS: ("#3a9a3a", 136, 152),
+}
+
+
+def _nice_step(raw):
+    if raw <= 0:
+        return 1.0
+    magnitude = 10 ** math.floor(math.log10(raw))
+    for factor in (1, 2, 5, 10):
+        if raw <= factor * magnitude:
+            return factor * magnitude
+    return 10 * magnitude
+
+
+def _format_time(t):
+    if t >= 60:
+        minutes, seconds = divmod(t, 60)
+        return f"{int(minutes)}:{seconds:06.3f}"
+    return f"{t:.3f}s"
+
+
+class TimelineWindow:
+    def __init__(self, root, view, on_change, is_busy):
+        self.view = view
+        self.on_change = on_change
+        self.is_busy = is_busy
+        self.start = 0.0
+        self.span = self._total()
+        self.selection = None
+        self._drag_from = None
+        self._redraw_id = None
+
+        self.window = tk.Toplevel(root)
+        self.window.title("时间轴")
+        self.window.geometry("900x260")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        self.info_var = tk.StringVar()
+        self._build_ui()
+
+    def _build_ui(self):
+        tk.Label(self.window, textvariable=self.info_var, anchor="w").pack(fill=tk.X, padx=8, pady=(8, 0))
+
+        self.canvas = tk.Canvas(self.window, height=160, bg="white", highlightthickness=0)
+        self.canvas.pack(fill=tk.BOTH, expand=True, padx=8, pady=(4, 0))
+        self.scrollbar = tk.Scrollbar(self.window, orient=tk.HORIZONTAL, command=self._on_scrollbar)
+        self.scrollbar.pack(fill=tk.X, padx=8)
+
+        buttons = tk.Frame(self.window)
+        buttons.pack(fill=tk.X, padx=8, pady=8)
+        tk.Button(buttons, text="删除选中", width=10, command=self.delete_selection).pack(side=tk.LEFT)
+        tk.Button(buttons, text="只保留选中", width=10, command=self.keep_selection).pack(side=tk.LEFT, padx=(8, 0))
+        tk.Button(buttons, text="撤销", width=10, command=self.undo).pack(side=tk.LEFT, padx=(8, 0))
+        tk.Button(buttons, text="全部显示", width=10, command=self.show_all).pack(side=tk.LEFT, padx=(8, 0))
+        hint = "拖动选择范围，滚轮缩放，Shift + 滚轮平移"
+        tk.Label(buttons, text=hint, fg="#555555").pack(side=tk.RIGHT)
+
+        canvas = self.canvas
+        canvas.bind("<Configure>", lambda _: self._schedule_redraw())
+        canvas.bind("<ButtonPress-1>", self._on_press)
+        canvas.bind("<B1-Motion>", self._on_drag)
+        canvas.bind("<ButtonRelease-1>", self._on_release)
+        canvas.bind("<MouseWheel>", self._on_wheel)
+        canvas.bind("<Shift-MouseWheel>", self._on_shift_wheel)
+        canvas.bind("<Button-4>", lambda event: self._zoom(event.x, 0.8))
+        canvas.bind("<Button-5>", lambda event: self._zoom(event.x, 1.25))
+        canvas.bind("<Shift-Button-4>", lambda event: self._pan(-0.1))
+        canvas.bind("<Shift-Button-5>", lambda event: self._pan(0.1))
+
+    def exists(self):
+        return bool(self.window.winfo_exists())
+
+    def lift(self):
+        self.window.deiconify()
+        self.window.lift()
+
+    def close(self):
+        if self._redraw_id is not None:
+            self.window.after_cancel(self._redraw_id)
+            self._redraw_id = None
+        if self.exists():
+            self.window.destroy()
+
+    def _total(self):
+        return max(self.view.duration, MIN_SPAN)
+
+    def _clamp(self):
+        total = self._total()
+        self.span = min(max(self.span, MIN_SPAN), total)
+        self.start = min(max(self.start, 0.0), total - self.span)
+
+    def _time_at(self, x):
+        width = max(1, self.canvas.winfo_width())
+        return self.start + x / width * self.span
+
+    def _schedule_redraw(self):
+        if self._redraw_id is None:
+            self._redraw_id = self.window.after(15, self._redraw)
+
+    def _redraw(self):
+        self._redraw_id = None
+        canvas = self.canvas
+        canvas.delete("all")
+        width = max(1, canvas.winfo_width())
+        height = canvas.winfo_height()
+        view = self.view
+        times = view.times
+        t0 = self.start
+        t1 = self.start + self.span
+        scale = width / self.span
+
+        step = _nice_step(self.span / 8)
+        tick = math.ceil(t0 / step) * step
+        while tick <= t1:
+            x = (tick - t0) * scale
+            canvas.create_line(x, AXIS_HEIGHT, x, height, fill="#eeeeee")
+            canvas.create_text(x + 2, 2, text=_format_time(tick), anchor="nw", fill="#666666")
+            tick += step
+
+        columns = density(times, t0, t1, width)
+        peak = max((high for _, high in columns), default=0)
+        if peak:
+            norm = math.log1p(peak)
+            area = DENSITY_BOTTOM - AXIS_HEIGHT
+            for x, (low, high) in enumerate(columns):
+                if not high:
+                    continue
+                y_high = DENSITY_BOTTOM - area * math.log1p(high) / norm
+                y_low = DENSITY_BOTTOM - area * math.log1p(low) / norm
+                canvas.create_line(x, y_low, x, y_high, fill="#a8c0ea")
+                if low:
+                    canvas.create_line(x, DENSITY_BOTTOM, x, y_low, fill="#4a7bd0")
+
+        first = bisect_left(times, t0)
+        last = bisect_right(times, t1)
+        if last - first <= DETAIL_LIMIT:
+            drawn = set()
+            for t, op, _, _, _, b in view.iter_rows(first, last):
+                marker = MARKERS.get(op)
+                if marker is None or (op == MOUSE_CLICK and not b):
+                    continue
+                x = int((t - t0) * scale)
+                if (x, op) in drawn:
+                    continue
+                drawn.add((x, op))
+                color, y0, y1 = marker
+                canvas.create_line(x, y0, x, y1, fill=color, width=2)
+        else:
+            canvas.create_text(width / 2, 134, text="放大后显示点击和按键", fill="#888888")
+
+        if self.selection:
+            a, b = self.selection
+            canvas.create_rectangle(
+                (a - t0) * scale,
+                AXIS_HEIGHT,
+                (b - t0) * scale,
+                height,
+                fill="#ffd24a",
+                outline="#c09020",
+                stipple="gray25",
+            )
+
+        total = self._total()
+        self.scrollbar.set(t0 / total, t1 / total)
+        self._update_info(first, last)
+
+    def _update_info(self, first, last):
+        info = (
+            f"显示 {_format_time(self.start)} – {_format_time(self.start + self.span)}，"
+            f"可见 {last - first} 个事件，共 {len(self.view)} 个"
+        )
+        if self.selection:
+            a, b = self.selection
+            info += f"；选中 {_format_time(a)} – {_format_time(b)}，{self.view.count_between(a, b)} 个事件"
+        self.info_var.set(info)
+
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == "moveto":
+            self.start = float(value) * self._total()
+        elif action == "scroll":
+            self._pan(int(value) * (0.1 if unit == "units" else 0.9))
+            return
+        self._clamp()
+        self._schedule_redraw()
+
+    def _pan(self, fraction):
+        self.start += fraction * self.span
+        self._clamp()
+        self._schedule_redraw()
+
+    def _zoom(self, x, factor):
+        anchor = self._time_at(x)
+        width = max(1, self.canvas.winfo_width())
+        self.span *= factor
+        self._clamp()
+        self.start = anchor - x / width * self.span
+        self._clamp()
+        self._schedule_redraw()
+
+    def _on_wheel(self, event):
+        self._zoom(event.x, 0.8 if event.delta > 0 else 1.25)
+
+    def _on_shift_wheel(self, event):
+        self._pan(-0.1 if event.delta > 0 else 0.1)
+
+    def _on_press(self, event):
+        self._drag_from = self._time_at(event.x)
+        self.selection = None
+        self._schedule_redraw()
+
+    def _on_drag(self, event):
+        if self._drag_from is None:
+            return
+        t = min(max(self._time_at(event.x), 0.0), self._total())
+        self.selection = (min(self._drag_from, t), max(self._drag_from, t))
+        self._schedule_redraw()
+
+    def _on_release(self, event):
+        self._on_drag(event)
+        self._drag_from = None
+
+    def _selected_range(self):
+        if not self.selection:
+            return None
+        a, b = self.selection
+        times = self.view.times
+        start = bisect_left(times, a)
+        stop = bisect_right(times, b)
+        return (start, stop) if start < stop else None
+
+    def delete_selection(self):
+        selected = self._selected_range()
+        if selected and not self.is_busy() and self.view.delete(*selected):
+            self._changed()
+
+    def keep_selection(self):
+        selected = self._selected_range()
+        if selected and not self.is_busy() and self.view.keep(*selected):
+            self.start = 0.0
+            self._changed()
+
+    def undo(self):
+        if not self.is_busy() and self.view.undo():
+            self._changed()
+
+    def show_all(self):
+        self.start = 0.0
+        self.span = self._total()
+        self._schedule_redraw()
+
+    def _changed(self):
+        self.selection = None
+        self._clamp()
+        self._schedule_redraw()
+        self.on_change()
@@ -0,0 +1,190 @@
+import argparse
+import os
+import sys
+import time
+
+from events import EVENT_TYPES
+from player import TRACE_BATCH, PlaybackTrace, compile_program, play
+from recfile import (
+    TRACE_MAGIC,
+    TRACE_SUFFIX,
+    MappedRecording,
+    RecordingFormatError,
+    RecordingWriter,
+)
+
+# 复现时序报告：读取复现时记录的时序文件（见 player.PlaybackTrace），
+# 按步骤类型统计延迟分布，按轮次统计累计漂移，并列出延迟最大的类型。
+#
+#   python timing_report.py 时序文件.ropt
+#   python timing_report.py --replay 录制文件.rop --loops 3
+#
+# --replay 使用 FakeBackend 复现录制（不注入任何输入，可在没有图形界面的 Linux 上运行），
+# 记录时序后输出报告，用于客观比较复现调度的改动。
+
+SLOWEST = 3
+
+
+class FakeBackend:
+    # 不注入任何输入的复现后端；cost 为每次注入的模拟耗时（秒，忙等），
+    # batch 为 True 时提供批量注入接口，与 SendInputBackend / XTestBackend 一样合并同一毫秒内的操作
+    def __init__(self, cost=0.0, batch=False):
+        self.cost = cost
+        self.injected = 0
+        self.encoders = None
+        if batch:
+            self.encoders = {
+                self.press_key: self._encode,
+                self.release_key: self._encode,
+                self.press_button: self._encode,
+                self.release_button: self._encode,
+                self.move_to: self._encode,
+                self.scroll: self._encode,
+            }
+
+    def _inject(self, count=1):
+        self.injected += count
+        if self.cost:
+            deadline = time.perf_counter() + self.cost
+            while time.perf_counter() < deadline:
+                pass
+
+    def _encode(self, *args):
+        return [args]
+
+    def key(self, kind, value):
+        return kind, value
+
+    def button(self, name):
+        return name
+
+    def press_key(self, key):
+        self._inject()
+
+    def release_key(self, key):
+        self._inject()
+
+    def move_to(self, position):
+        self._inject()
+
+    def move_by(self, dx, dy):
+        self._inject()
+
+    def press_button(self, button):
+        self._inject()
+
+    def release_button(self, button):
+        self._inject()
+
+    def scroll(self, dx, dy):
+        self._inject()
+
+    def pack(self, encoded):
+        return sum(len(items) for items in encoded)
+
+    def send_batch(self, count):
+        # 一次批量注入只计一次耗时
+        self._inject(count)
+
+
+def _kind_name(op):
+    if op == TRACE_BATCH:
+        return "batch"
+    return EVENT_TYPES[op] if op < len(EVENT_TYPES) else str(op)
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(trace):
+    # 返回 (按类型的延迟（微秒，已排序）, 按轮次的 (步骤数, 结束时漂移, 最大漂移)（微秒）)
+    lateness = {}
+    loops = {}
+    for _, op, loop, _, late, drift in trace.iter_rows():
+        lateness.setdefault(op, []).append(late)
+        count, _, peak = loops.get(loop, (0, 0, 0))
+        loops[loop] = (count + 1, drift, max(peak, abs(drift)))
+    for samples in lateness.values():
+        samples.sort()
+    return lateness, loops
+
+
+def format_report(trace):
+    lateness, loops = summarize(trace)
+    if not lateness:
+        return "时序文件中没有记录"
+    lines = [f"共 {len(trace)} 个步骤，{len(loops)} 轮，用时 {trace.duration:.3f} s", ""]
+    lines.append(f"{'类型':<14}{'次数':>8}{'p50':>10}{'p95':>10}{'p99':>10}{'最大':>10}   （延迟，ms）")
+    rows = []
+    for op, samples in lateness.items():
+        p95 = _percentile(samples, 0.95)
+        rows.append((p95, op, samples))
+        lines.append(
+            f"{_kind_name(op):<14}{len(samples):>8}"
+            f"{_percentile(samples, 0.5) / 1000:>10.3f}{p95 / 1000:>10.3f}"
+            f"{_percentile(samples, 0.99) / 1000:>10.3f}{samples[-1] / 1000:>10.3f}"
+        )
+    lines.append("")
+    lines.append(f"{'轮次':<6}{'步骤数':>8}{'结束漂移':>12}{'最大漂移':>12}   （ms）")
+    for loop in sorted(loops):
+        count, drift, peak = loops[loop]
+        lines.append(f"{loop + 1:<6}{count:>8}{drift / 1000:>12.3f}{peak / 1000:>12.3f}")
+    lines.append("")
+    rows.sort(key=lambda row: row[0], reverse=True)
+    slowest = "，".join(f"{_kind_name(op)}（p95 {p95 / 1000:.3f} ms）" for p95, op, _ in rows[:SLOWEST])
+    lines.append(f"延迟最大的类型：{slowest}")
+    return "\n".join(lines)
+
+
+def replay(path, trace_path, loops, speed, max_gap, cost, batch):
+    recording = MappedRecording(path)
+    try:
+        backend = FakeBackend(cost, batch)
+        program = compile_program(recording, backend, speed=speed, max_gap=max_gap)
+        writer = RecordingWriter(trace_path, recording.screen_size, magic=TRACE_MAGIC)
+        try:
+            play(program, loops, lambda: False, trace=PlaybackTrace(writer, program, backend))
+        finally:
+            writer.close()
+    finally:
+        recording.close()
+    return program
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="复现时序报告")
+    parser.add_argument("path", help="时序文件；使用 --replay 时为录制文件")
+    parser.add_argument("--replay", action="store_true", help="用不注入输入的后端复现录制并记录时序")
+    parser.add_argument("--trace", help="--replay 时的时序文件路径，默认与录制文件同名")
+    parser.add_argument("--loops", type=int, default=1, help="复现轮数")
+    parser.add_argument("--speed", type=float, default=1.0, help="复现速度倍率")
+    parser.add_argument("--max-gap", type=float, default=None, help="最长间隔（秒）")
+    parser.add_argument("--cost-us", type=float, default=0.0, help="每次注入的模拟耗时（微秒）")
+    parser.add_argument("--batch", action="store_true", help="模拟批量注入")
+    args = parser.parse_args(argv)
+
+    path = args.path
+    try:
+        if args.replay:
+            trace_path = args.trace or os.path.splitext(path)[0] + TRACE_SUFFIX
+            if os.path.abspath(trace_path) == os.path.abspath(path):
+                parser.error("时序文件不能与录制文件相同")
+            program = replay(
+                path, trace_path, args.loops, args.speed, args.max_gap, args.cost_us / 1e6, args.batch
+            )
+            print(f"已复现 {len(program)} 个步骤 × {args.loops} 轮，时序记录保存到 {trace_path}\n")
+            path = trace_path
+        trace = MappedRecording(path, magic=TRACE_MAGIC)
+    except (OSError, RecordingFormatError) as exc:
+        print(f"无法读取 {path}：{exc}", file=sys.stderr)
+        return 1
+    try:
+        print(format_report(trace))
+    finally:
+        trace.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+import ctypes
+
+# 窗口锚定（仅 Windows）：录制时查询鼠标下的顶层窗口，复现时按类名和标题重新找到窗口，
+# 以窗口当前位置换算鼠标坐标。其他平台上 available() 为 False，复现时使用录制时的窗口位置。
+
+if hasattr(ctypes, "windll"):
+    from ctypes import wintypes
+
+    _user32 = ctypes.WinDLL("user32", use_last_error=True)
+    _user32.WindowFromPoint.argtypes = (wintypes.POINT,)
+    _user32.WindowFromPoint.restype = wintypes.HWND
+    _user32.GetAncestor.argtypes = (wintypes.HWND, wintypes.UINT)
+    _user32.GetAncestor.restype = wintypes.HWND
+    _user32.GetWindowRect.argtypes = (wintypes.HWND, ctypes.POINTER(wintypes.RECT))
+    _user32.IsWindow.argtypes = (wintypes.HWND,)
+    _user32.IsWindowVisible.argtypes = (wintypes.HWND,)
+    _user32.GetClassNameW.argtypes = (wintypes.HWND, wintypes.LPWSTR, ctypes.c_int)
+    _user32.GetWindowTextW.argtypes = (wintypes.HWND, wintypes.LPWSTR, ctypes.c_int)
+    _ENUM_PROC = ctypes.WINFUNCTYPE(wintypes.BOOL, wintypes.HWND, wintypes.LPARAM)
+    _user32.EnumWindows.argtypes = (_ENUM_PROC, wintypes.LPARAM)
+    GA_ROOT = 2
+else:
+    _user32 = None
+
+
+def available():
+    return _user32 is not None
+
+
+def root_window_at(x, y):
+    hwnd = _user32.WindowFromPoint(wintypes.POINT(x, y))
+    if not hwnd:
+        return None
+    return _user32.GetAncestor(hwnd, GA_ROOT) or hwnd
+
+
+def window_rect(hwnd):
+    rect = wintypes.RECT()
+    if not _user32.GetWindowRect(hwnd, ctypes.byref(rect)):
+        return None
+    return rect.left, rect.top, rect.right, rect.bottom
+
+
+def window_origin(hwnd):
+    rect = window_rect(hwnd)
+    return rect[:2] if rect else None
+
+
+def describe(hwnd):
+    buffer = ctypes.create_unicode_buffer(256)
+    _user32.GetClassNameW(hwnd, buffer, 256)
+    class_name = buffer.value
+    _user32.GetWindowTextW(hwnd, buffer, 256)
+    return class_name, buffer.value
+
+
+def find_window(class_name, title):
+    # 优先找类名和标题都相同的可见窗口，标题变化时退回只按类名匹配
+    exact = []
+    similar = []
+
+    def visit(hwnd, _):
+        if _user32.IsWindowVisible(hwnd):
+            name, text = describe(hwnd)
+            if name == class_name:
+                (exact if text == title else similar).append(hwnd)
+        return True
+
+    _user32.EnumWindows(_ENUM_PROC(visit), 0)
+    if exact:
+        return exact[0]
+    return similar[0] if similar else None
+
+
+class WindowAnchors:
+    # 复现时的窗口原点缓存：每个窗口只查找一次句柄，之后在锚点处和每次按下鼠标前用一次
+    # GetWindowRect 检查位置，每个鼠标事件只需在相对坐标上加一次原点
+    def __init__(self, windows, move_to):
+        self.windows = windows
+        self._move_to = move_to
+        self.handles = {}
+        self.origins = {}
+        self.missing = set()
+
+    def refresh(self, window, recorded_x, recorded_y):
+        hwnd = self.handles.get(window)
+        if hwnd is None or not _user32.IsWindow(hwnd):
+            hwnd = find_window(*self.windows[window])
+            self.handles[window] = hwnd
+        origin = window_origin(hwnd) if hwnd else None
+        if origin is None:
+            # 找不到窗口时按录制时的位置复现
+            self.missing.add(window)
+            origin = (recorded_x, recorded_y)
+        self.origins[window] = origin
+
+    def move_to(self, window, x, y):
+        ox, oy = self.origins[window]
+        self._move_to((x + ox, y + oy))
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+点击抖动计划
+功能：
+- 按块预先生成点击间隔和位置偏移，点击循环中只需按序取值
+- 间隔分布：均匀、正态（截断）、对数正态（截断），取值始终在最小/最大间隔之间
+- 位置偏移均匀分布在以目标点为中心的圆形或椭圆区域内
+- 指定种子时同样的参数生成同样的序列
+安装 NumPy 时按块向量化生成，否则使用 random 模块逐个生成（两者的随机序列不同）
+"""
+
+import math
+import random
+from typing import List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # 未安装 NumPy 时使用 random 模块
+    np = None
+
+BLOCK_SIZE = 4096
+
+DISTRIBUTIONS = {
+    "uniform": "均匀",
+    "normal": "正态",
+    "lognormal": "对数正态",
+}
+
+
+class JitterPlan:
+    """按块生成的点击间隔（秒）与位置偏移（像素）序列"""
+
+    def __init__(
+        self,
+        min_ms: float,
+        max_ms: float,
+        distribution: str = "uniform",
+        radius_x: float = 0.0,
+        radius_y: float = 0.0,
+        seed: Optional[int] = None,
+        block_size: int = BLOCK_SIZE,
+    ) -> None:
+        if distribution not in DISTRIBUTIONS:
+            raise ValueError(f"未知的间隔分布: {distribution}")
+        if min_ms <= 0 or min_ms > max_ms:
+            raise ValueError("间隔需要满足 0 < 最小 <= 最大")
+        if radius_x < 0 or radius_y < 0:
+            raise ValueError("偏移半径不能为负数")
+        self.min_ms = min_ms
+        self.max_ms = max_ms
+        self.distribution = distribution
+        self.radius_x = radius_x
+        self.radius_y = radius_y
+        self.seed = seed
+        self.block_size = block_size
+        if np is not None:
+            self._rng = np.random.default_rng(seed)
+        else:
+            self._rng = random.Random(seed)
+        self._intervals: List[float] = []
+        self._dx: List[int] = []
+        self._dy: List[int] = []
+        self._index = 0
+
+    def next(self) -> Tuple[float, int, int]:
+        """
+        取下一次点击的抖动
+
+        Returns:
+            (距下一次点击的间隔（秒）, x 偏移, y 偏移)
+        """
+        index = self._index
+        if index >= len(self._intervals):
+            self._refill()
+            index = 0
+        self._index = index + 1
+        return self._intervals[index], self._dx[index], self._dy[index]
+
+    def take(self, count: int) -> List[Tuple[float, int, int]]:
+        """连续取 count 次抖动，便于检查计划的分布"""
+        return [self.next() for _ in range(count)]
+
+    def _refill(self) -> None:
+        if np is not None:
+            intervals, dx, dy = self._generate_numpy(self.block_size)
+        else:
+            intervals, dx, dy = self._generate_python(self.block_size)
+        self._intervals = intervals
+        self._dx = dx
+        self._dy = dy
+
+    def _normal_params(self) -> Tuple[float, float]:
+        # 正态分布：均值在区间中点，区间两端为 ±3σ
+        return (self.min_ms + self.max_ms) / 2, (self.max_ms - self.min_ms) / 6
+
+    def _lognormal_params(self) -> Tuple[float, float]:
+        # 对数正态分布：中位数为两端的几何平均，区间两端为对数尺度上的 ±2σ，偏向较短的间隔
+        low, high = math.log(self.min_ms), math.log(self.max_ms)
+        return (low + high) / 2, (high - low) / 4
+
+    def _generate_numpy(self, count: int) -> Tuple[List[float], List[int], List[int]]:
+        rng = self._rng
+        if self.min_ms == self.max_ms:
+            intervals = np.full(count, self.min_ms)
+        elif self.distribution == "uniform":
+            intervals = rng.uniform(self.min_ms, self.max_ms, count)
+        elif self.distribution == "normal":
+            intervals = rng.normal(*self._normal_params(), count)
+        else:
+            intervals = rng.lognormal(*self._lognormal_params(), count)
+        intervals = np.clip(intervals, self.min_ms, self.max_ms) / 1000.0
+
+        # 半径取均匀分布的平方根，偏移在区域内均匀分布
+        radius = np.sqrt(rng.random(count))
+        angle = rng.uniform(0.0, 2 * math.pi, count)
+        dx = np.rint(self.radius_x * radius * np.cos(angle)).astype(int)
+        dy = np.rint(self.radius_y * radius * np.sin(angle)).astype(int)
+        # 转为列表后逐个取值比索引 NumPy 数组快
+        return intervals.tolist(), dx.tolist(), dy.tolist()
+
+    def _generate_python(self, count: int) -> Tuple[List[float], List[int], List[int]]:
+        rng = self._rng
+        low, high = self.min_ms, self.max_ms
+        if low == high:
+            intervals = [low / 1000.0] * count
+        else:
+            if self.distribution == "uniform":
+                samples = [rng.uniform(low, high) for _ in range(count)]
+            elif self.distribution == "normal":
+                mean, sigma = self._normal_params()
+                samples = [rng.gauss(mean, sigma) for _ in range(count)]
+            else:
+                mu, sigma = self._lognormal_params()
+                samples = [rng.lognormvariate(mu, sigma) for _ in range(count)]
+            intervals = [min(max(value, low), high) / 1000.0 for value in samples]
+
+        dx = []
+        dy = []
+        for _ in range(count):
+            radius = math.sqrt(rng.random())
+            angle = rng.uniform(0.0, 2 * math.pi)
+            dx.append(round(self.radius_x * radius * math.cos(angle)))
+            dy.append(round(self.radius_y * radius * math.sin(angle)))
+        return intervals, dx, dy
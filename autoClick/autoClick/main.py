@@ -4,31 +4,71 @@
 简单桌面自动点击工具
 功能：
 - 选择点击位置（鼠标移动到目标点后捕获）
-- 设置点击间隔范围（毫秒）
+- 设置点击间隔范围（毫秒，支持小数）
 - 支持点击次数与点击类型
+- 按截止时间调度点击，状态栏以固定频率显示点击次数和实际点击速率
+- 间隔分布、以目标点为中心的偏移区域和随机种子可配置（见 jitter.py）
+- 多个点击位置按顺序、加权随机或最短路径轮换（见 targets.py）
 """
 
+import ctypes
 import threading
 import time
-import random
 import tkinter as tk
+from array import array
+from collections import deque
 from tkinter import ttk, messagebox
 
 import pyautogui
 from pynput import keyboard
 
+from jitter import DISTRIBUTIONS, JitterPlan
+from targets import MODES, TargetPlan
+
+# 距离截止时间不足该值（秒）时改为忙等，避免 sleep 的唤醒误差
+SPIN_THRESHOLD = 0.002
+# 单次等待的上限（秒），保证停止请求能及时响应
+MAX_WAIT = 0.05
+# 落后日程超过该值（秒）时从当前时间重新开始，避免卡顿后集中补发点击
+MAX_LAG = 0.05
+# 状态栏的刷新周期（毫秒），与点击速率无关
+STATUS_REFRESH_MS = 50
+# 实际点击速率按最近这段时间（秒）内的点击数计算
+RATE_WINDOW = 1.0
+# 状态栏最多显示的各点点击次数
+MAX_POINT_COUNTS = 12
+
+
+class ClickCounter:
+    """
+    点击计数器：点击线程是唯一的写入方，界面线程按固定频率读取
+    计数保存在定长数组中，单个元素的读写在 GIL 下是原子的，双方都不需要加锁，
+    点击线程也不需要通过 Tk 事件队列通知界面
+    """
+
+    def __init__(self, points: int = 0) -> None:
+        self.total = 0
+        self.per_point = array("Q", bytes(8 * points))
+
+    def add(self, point: int) -> None:
+        self.per_point[point] += 1
+        self.total += 1
+
 
 class AutoClickApp:
     def __init__(self, root: tk.Tk) -> None:
         self.root = root
         self.root.title("自动点击工具")
-        self.root.geometry("420x360")
+        self.root.geometry("420x660")
         self.root.resizable(False, False)
 
         self.stop_event = threading.Event()
         self.worker = None
 
-        self.position = None
+        self.points = []
+        self.counter = ClickCounter()
+        self._status_job = None
+        self._rate_samples = deque()
 
         self._build_ui()
         self.root.bind("<Control-t>", lambda _e: self.stop_clicking())
@@ -61,29 +101,70 @@ class AutoClickApp:
             width=8,
         ).grid(row=4, column=1, sticky="w")
 
-        ttk.Separator(frame).grid(row=5, column=0, columnspan=2, sticky="ew", pady=10)
+        ttk.Label(frame, text="间隔分布").grid(row=5, column=0, sticky="e")
+        self.distribution = tk.StringVar(value=DISTRIBUTIONS["uniform"])
+        ttk.Combobox(
+            frame,
+            textvariable=self.distribution,
+            values=list(DISTRIBUTIONS.values()),
+            state="readonly",
+            width=8,
+        ).grid(row=5, column=1, sticky="w")
+
+        ttk.Label(frame, text="偏移半径 X/Y (像素)").grid(row=6, column=0, sticky="e")
+        radius_frame = ttk.Frame(frame)
+        radius_frame.grid(row=6, column=1, sticky="w")
+        self.radius_x = tk.StringVar(value="25")
+        self.radius_y = tk.StringVar(value="25")
+        ttk.Entry(radius_frame, textvariable=self.radius_x, width=6).pack(side=tk.LEFT)
+        ttk.Label(radius_frame, text=" / ").pack(side=tk.LEFT)
+        ttk.Entry(radius_frame, textvariable=self.radius_y, width=6).pack(side=tk.LEFT)
 
-        ttk.Label(frame, text="点击位置").grid(row=6, column=0, sticky="e")
-        self.position_var = tk.StringVar(value="未选择")
-        ttk.Label(frame, textvariable=self.position_var).grid(row=6, column=1, sticky="w")
+        ttk.Label(frame, text="随机种子 (留空=随机)").grid(row=7, column=0, sticky="e")
+        self.seed = tk.StringVar(value="")
+        ttk.Entry(frame, textvariable=self.seed, width=10).grid(row=7, column=1, sticky="w")
+
+        ttk.Separator(frame).grid(row=8, column=0, columnspan=2, sticky="ew", pady=10)
+
+        ttk.Label(frame, text="点击位置").grid(row=9, column=0, columnspan=2, sticky="w")
+        self.points_list = tk.Listbox(frame, height=6, activestyle="none")
+        self.points_list.grid(row=10, column=0, columnspan=2, sticky="ew")
+
+        ttk.Label(frame, text="新位置权重").grid(row=11, column=0, sticky="e")
+        self.point_weight = tk.StringVar(value="1")
+        ttk.Entry(frame, textvariable=self.point_weight, width=10).grid(row=11, column=1, sticky="w")
 
         ttk.Button(frame, text="选择位置(3秒)", command=self.capture_position).grid(
-            row=7, column=0, columnspan=2, sticky="ew", pady=(6, 2)
+            row=12, column=0, sticky="ew", pady=(6, 2)
         )
         ttk.Button(frame, text="使用当前鼠标位置", command=self.use_current_position).grid(
-            row=8, column=0, columnspan=2, sticky="ew"
+            row=12, column=1, sticky="ew", pady=(6, 2)
         )
+        ttk.Button(frame, text="删除选中", command=self.remove_selected_point).grid(
+            row=13, column=0, sticky="ew"
+        )
+        ttk.Button(frame, text="清空", command=self.clear_points).grid(row=13, column=1, sticky="ew")
+
+        ttk.Label(frame, text="轮换方式").grid(row=14, column=0, sticky="e", pady=(6, 0))
+        self.rotation_mode = tk.StringVar(value=MODES["sequential"])
+        ttk.Combobox(
+            frame,
+            textvariable=self.rotation_mode,
+            values=list(MODES.values()),
+            state="readonly",
+            width=8,
+        ).grid(row=14, column=1, sticky="w", pady=(6, 0))
 
-        ttk.Separator(frame).grid(row=9, column=0, columnspan=2, sticky="ew", pady=10)
+        ttk.Separator(frame).grid(row=15, column=0, columnspan=2, sticky="ew", pady=10)
 
         self.start_btn = ttk.Button(frame, text="开始", command=self.start_clicking)
         self.stop_btn = ttk.Button(frame, text="停止", command=self.stop_clicking, state=tk.DISABLED)
-        self.start_btn.grid(row=10, column=0, sticky="ew")
-        self.stop_btn.grid(row=10, column=1, sticky="ew")
+        self.start_btn.grid(row=16, column=0, sticky="ew")
+        self.stop_btn.grid(row=16, column=1, sticky="ew")
 
         self.status_var = tk.StringVar(value="就绪")
-        ttk.Label(frame, textvariable=self.status_var, foreground="#444").grid(
-            row=11, column=0, columnspan=2, sticky="w", pady=(10, 0)
+        ttk.Label(frame, textvariable=self.status_var, foreground="#444", wraplength=380).grid(
+            row=17, column=0, columnspan=2, sticky="w", pady=(10, 0)
         )
 
         for i in range(2):
@@ -91,10 +172,15 @@ class AutoClickApp:
 
     def _start_hotkeys(self) -> None:
         self.hotkey_listener = keyboard.GlobalHotKeys(
-            {"<ctrl>+t": lambda: self.root.after(0, self.stop_clicking)}
+            {"<ctrl>+t": self._on_stop_hotkey}
         )
         self.hotkey_listener.start()
 
+    def _on_stop_hotkey(self) -> None:
+        # 在监听线程中直接通知点击线程停止，不必等 Tk 事件队列处理到停止请求
+        self.stop_event.set()
+        self.root.after(0, self.stop_clicking)
+
     def _on_close(self) -> None:
         try:
             if hasattr(self, "hotkey_listener"):
@@ -108,32 +194,61 @@ class AutoClickApp:
             self._set_status("请在3秒内将鼠标移到目标位置...")
             time.sleep(3)
             pos = pyautogui.position()
-            self.root.after(0, lambda: self._set_position(pos))
+            self.root.after(0, lambda: self._add_point(pos))
 
         threading.Thread(target=worker, daemon=True).start()
 
     def use_current_position(self) -> None:
         pos = pyautogui.position()
-        self._set_position(pos)
+        self._add_point(pos)
+
+    def _add_point(self, pos) -> None:
+        try:
+            weight = float(self.point_weight.get())
+        except ValueError:
+            weight = -1.0
+        if weight < 0:
+            messagebox.showerror("错误", "权重必须是非负数")
+            return
+        self.points.append((pos.x, pos.y, weight))
+        self._refresh_points_list()
+        self._set_status(f"已添加第 {len(self.points)} 个点击位置")
+
+    def _refresh_points_list(self) -> None:
+        self.points_list.delete(0, tk.END)
+        for number, (x, y, weight) in enumerate(self.points, 1):
+            self.points_list.insert(tk.END, f"{number}. ({x}, {y})  权重 {weight:g}")
+
+    def remove_selected_point(self) -> None:
+        if self.worker and self.worker.is_alive():
+            return
+        for index in reversed(self.points_list.curselection()):
+            del self.points[index]
+        self._refresh_points_list()
 
-    def _set_position(self, pos) -> None:
-        self.position = (pos.x, pos.y)
-        self.position_var.set(f"({pos.x}, {pos.y})")
-        self._set_status("已选择点击位置")
+    def clear_points(self) -> None:
+        if self.worker and self.worker.is_alive():
+            return
+        self.points = []
+        self._refresh_points_list()
 
     def start_clicking(self) -> None:
         if self.worker and self.worker.is_alive():
             return
-        if not self.position:
+        if not self.points:
             messagebox.showwarning("提示", "请先选择点击位置")
             return
 
         try:
-            min_ms = int(self.min_ms.get())
-            max_ms = int(self.max_ms.get())
+            min_ms = float(self.min_ms.get())
+            max_ms = float(self.max_ms.get())
             total = int(self.total_clicks.get())
+            radius_x = float(self.radius_x.get())
+            radius_y = float(self.radius_y.get())
+            seed_text = self.seed.get().strip()
+            seed = int(seed_text) if seed_text else None
         except ValueError:
-            messagebox.showerror("错误", "间隔和次数必须是整数")
+            messagebox.showerror("错误", "间隔和偏移半径必须是数字，次数和种子必须是整数")
             return
 
         if min_ms <= 0 or max_ms <= 0:
@@ -145,42 +260,116 @@ class AutoClickApp:
         if total < 0:
             messagebox.showerror("错误", "点击次数不能为负数")
             return
+        if radius_x < 0 or radius_y < 0:
+            messagebox.showerror("错误", "偏移半径不能为负数")
+            return
+        if seed is not None and seed < 0:
+            messagebox.showerror("错误", "随机种子不能为负数")
+            return
+
+        distribution = next(
+            key for key, label in DISTRIBUTIONS.items() if label == self.distribution.get()
+        )
+        plan = JitterPlan(min_ms, max_ms, distribution, radius_x, radius_y, seed)
+        mode = next(key for key, label in MODES.items() if label == self.rotation_mode.get())
+        try:
+            targets = TargetPlan(
+                [(x, y) for x, y, _ in self.points],
+                mode,
+                [weight for _, _, weight in self.points],
+                seed,
+            )
+        except ValueError as e:
+            messagebox.showerror("错误", str(e))
+            return
 
         self.stop_event.clear()
         self.start_btn.config(state=tk.DISABLED)
         self.stop_btn.config(state=tk.NORMAL)
         self._set_status("正在点击...")
 
+        self.counter = ClickCounter(len(self.points))
+        self._rate_samples = deque([(time.perf_counter(), 0)])
         self.worker = threading.Thread(
-            target=self._click_loop, args=(min_ms, max_ms, total), daemon=True
+            target=self._click_loop, args=(plan, targets, total), daemon=True
         )
         self.worker.start()
+        self._status_job = self.root.after(STATUS_REFRESH_MS, self._refresh_status)
 
     def stop_clicking(self) -> None:
         self.stop_event.set()
-        self._set_status("已停止")
+        if self._status_job is not None:
+            self.root.after_cancel(self._status_job)
+            self._status_job = None
+        if self.counter.total:
+            self._set_status(f"已停止，共点击 {self.counter.total} 次{self._point_counts_text()}")
+        else:
+            self._set_status("已停止")
         self.start_btn.config(state=tk.NORMAL)
         self.stop_btn.config(state=tk.DISABLED)
 
-    def _click_loop(self, min_ms: int, max_ms: int, total: int) -> None:
-        count = 0
+    def _refresh_status(self) -> None:
+        count = self.counter.total
+        now = time.perf_counter()
+        samples = self._rate_samples
+        samples.append((now, count))
+        while len(samples) > 2 and now - samples[1][0] >= RATE_WINDOW:
+            samples.popleft()
+        first_time, first_count = samples[0]
+        rate = (count - first_count) / (now - first_time) if now > first_time else 0.0
+        text = f"已点击 {count} 次，实际 {rate:.1f} 次/秒{self._point_counts_text()}"
+        if text != self.status_var.get():
+            self._set_status(text)
+        self._status_job = self.root.after(STATUS_REFRESH_MS, self._refresh_status)
+
+    def _point_counts_text(self) -> str:
+        counts = self.counter.per_point
+        if len(counts) <= 1:
+            return ""
+        shown = "  ".join(f"#{i}: {c}" for i, c in enumerate(counts[:MAX_POINT_COUNTS], 1))
+        more = " ..." if len(counts) > MAX_POINT_COUNTS else ""
+        return f"\n各点次数  {shown}{more}"
+
+    def _wait_until(self, deadline: float) -> bool:
+        """等待到截止时间，返回 False 表示等待期间被停止"""
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return True
+            if self.stop_event.is_set():
+                return False
+            if remaining > SPIN_THRESHOLD:
+                self.stop_event.wait(min(MAX_WAIT, remaining - SPIN_THRESHOLD))
+
+    def _click_loop(self, plan: JitterPlan, targets: TargetPlan, total: int) -> None:
         button = self.click_type.get()
-        while not self.stop_event.is_set() and (total == 0 or count < total):
-            if min_ms == max_ms:
-                lower = max(1, int(max_ms / 3))
-                interval = random.uniform(lower, max_ms) / 1000.0
-            else:
-                interval = random.uniform(min_ms, max_ms) / 1000.0
-
-            offset_x = random.randint(0, 50)
-            offset_y = random.randint(0, 50)
-            target_x = self.position[0] + offset_x
-            target_y = self.position[1] + offset_y
-            pyautogui.click(target_x, target_y, button=button)
-            count += 1
-            self.root.after(0, lambda c=count: self._set_status(f"已点击 {c} 次"))
-            if self.stop_event.wait(interval):
-                break
+        next_jitter = plan.next
+        next_target = targets.next
+        counter = self.counter
+        record_click = counter.add
+        winmm = getattr(ctypes, "windll", None) and ctypes.windll.winmm
+        if winmm:
+            # Windows 默认定时器精度约 15.6 ms，点击期间临时提高到 1 ms
+            winmm.timeBeginPeriod(1)
+        try:
+            deadline = time.perf_counter()
+            while total == 0 or counter.total < total:
+                if not self._wait_until(deadline):
+                    break
+                interval, offset_x, offset_y = next_jitter()
+                point, base_x, base_y = next_target()
+                # 跳过 pyautogui 每次调用后默认 0.1 秒的 PAUSE
+                pyautogui.click(base_x + offset_x, base_y + offset_y, button=button, _pause=False)
+                record_click(point)
+
+                # 下一次点击按上一次的截止时间累加，点击本身的耗时不会拉长间隔
+                deadline += interval
+                now = time.perf_counter()
+                if now - deadline > MAX_LAG:
+                    deadline = now
+        finally:
+            if winmm:
+                winmm.timeEndPeriod(1)
 
         self.root.after(0, self.stop_clicking)
 
@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+无界面任务运行器
+功能：
+- 从 JSON 或 INI 任务文件加载点击任务或录制复现任务，不创建窗口、不导入 tkinter
+- 定期输出点击次数和吞吐量，结束时以退出码报告结果
+用法：
+    python -m runner run 任务文件.json
+    python -m runner run 任务文件.ini --report-interval 10
+鼠标操作使用 pynput（pyautogui 会通过 pymsgbox 导入 tkinter）
+"""
+
+import argparse
+import configparser
+import ctypes
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# 首次点击/复现耗时从运行器启动时算起，包括加载 NumPy、pynput 和录制复现模块的时间
+STARTED = time.perf_counter()
+
+from jitter import DISTRIBUTIONS, JitterPlan
+from targets import MODES, TargetPlan
+
+# 退出码
+EXIT_OK = 0
+EXIT_JOB_ERROR = 1
+EXIT_RUNTIME_ERROR = 2
+EXIT_INTERRUPTED = 130
+
+# 与 main.py 相同的截止时间等待参数（秒）
+SPIN_THRESHOLD = 0.002
+MAX_WAIT = 0.05
+MAX_LAG = 0.05
+
+BUTTONS = ("left", "right", "middle")
+
+# 与 RecordOperation 界面相同的点击前、松开后稳定等待（秒）
+CLICK_SETTLE = 0.01
+RELEASE_SETTLE = 0.02
+
+# 录制复现任务默认从同一仓库的 RecordOperation 目录加载复现模块
+DEFAULT_RECORD_OPERATION_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "RecordOperation"
+)
+
+
+class JobError(Exception):
+    """任务文件无效"""
+
+
+def _parse_points(text: str) -> List[List[int]]:
+    # INI 中的点写作 "x,y; x,y"
+    points = []
+    for item in text.split(";"):
+        if item.strip():
+            x, y = item.split(",")
+            points.append([int(x), int(y)])
+    return points
+
+
+def load_job(path: str) -> Dict[str, Any]:
+    """
+    加载任务文件
+
+    JSON 文件为一个对象；INI 文件使用 [job] 节，可选 [window] 节描述目标窗口
+
+    Args:
+        path: 任务文件路径
+
+    Returns:
+        任务字典
+    """
+    try:
+        if path.lower().endswith(".ini"):
+            parser = configparser.ConfigParser()
+            if not parser.read(path, encoding="utf-8"):
+                raise JobError(f"无法读取任务文件: {path}")
+            if not parser.has_section("job"):
+                raise JobError("INI 任务文件缺少 [job] 节")
+            job: Dict[str, Any] = dict(parser["job"])
+            if "points" in job:
+                job["points"] = _parse_points(job["points"])
+            if parser.has_section("window"):
+                job["window"] = dict(parser["window"])
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                job = json.load(f)
+    except (OSError, ValueError, configparser.Error) as e:
+        raise JobError(f"加载任务文件失败: {e}")
+    if not isinstance(job, dict):
+        raise JobError("任务文件需要是一个对象")
+    # 相对路径按任务文件所在目录解析
+    if "path" in job and not os.path.isabs(job["path"]):
+        job["path"] = os.path.join(os.path.dirname(os.path.abspath(path)), job["path"])
+    return job
+
+
+def _number(job: Dict[str, Any], key: str, default: Any, kind=float) -> Any:
+    # INI 任务中的数值是字符串；整数参数也接受 "3.0" 这样的写法，但不接受小数和布尔值
+    value = job.get(key, default)
+    if value is None or value == "":
+        return default
+    try:
+        if isinstance(value, bool):
+            raise ValueError(value)
+        if kind is int and not isinstance(value, int):
+            if isinstance(value, str) and value.strip().lstrip("+-").isdigit():
+                return int(value)
+            number = float(value)
+            if not number.is_integer():
+                raise ValueError(value)
+            return int(number)
+        return kind(value)
+    except (TypeError, ValueError, OverflowError):
+        raise JobError(f"参数 {key} 无效: {value!r}")
+
+
+def _bool(job: Dict[str, Any], key: str, default: bool) -> bool:
+    # 与 configparser.getboolean 相同：接受 1/0、yes/no、true/false、on/off
+    value = job.get(key, default)
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str):
+        state = configparser.ConfigParser.BOOLEAN_STATES.get(value.strip().lower())
+        if state is not None:
+            return state
+    raise JobError(f"参数 {key} 无效: {value!r}")
+
+
+def _job_points(job: Dict[str, Any]) -> Tuple[List[Tuple[int, int]], List[float]]:
+    # 支持 points: [[x, y] 或 {"x", "y", "weight"}]、position: [x, y]，
+    # 以及快速点击助手的 coordinates: {"x", "y"}
+    raw = job.get("points")
+    if raw is None and "position" in job:
+        raw = [job["position"]]
+    if raw is None and "coordinates" in job:
+        raw = [job["coordinates"]]
+    if not raw:
+        raise JobError("点击任务需要 points、position 或 coordinates")
+    points = []
+    weights = []
+    try:
+        for item in raw:
+            if isinstance(item, dict):
+                points.append((int(item["x"]), int(item["y"])))
+                weights.append(float(item.get("weight", 1)))
+            else:
+                points.append((int(item[0]), int(item[1])))
+                weights.append(float(item[2]) if len(item) > 2 else 1.0)
+    except (KeyError, IndexError, TypeError, ValueError):
+        raise JobError(f"点击位置无效: {raw!r}")
+    return points, weights
+
+
+def find_window_origin(title: str, class_name: str = "") -> Optional[Tuple[int, int]]:
+    """
+    按标题（包含匹配）和类名查找可见的顶层窗口，返回其左上角屏幕坐标
+
+    仅支持 Windows，其他平台或找不到窗口时返回 None
+    """
+    if not hasattr(ctypes, "windll"):
+        return None
+    from ctypes import wintypes
+
+    user32 = ctypes.windll.user32
+    found = []
+    buffer = ctypes.create_unicode_buffer(512)
+
+    def visit(hwnd, _):
+        if not user32.IsWindowVisible(hwnd):
+            return True
+        user32.GetWindowTextW(hwnd, buffer, 512)
+        if title and title not in buffer.value:
+            return True
+        if class_name:
+            user32.GetClassNameW(hwnd, buffer, 512)
+            if buffer.value != class_name:
+                return True
+        found.append(hwnd)
+        return False
+
+    enum_proc = ctypes.WINFUNCTYPE(wintypes.BOOL, wintypes.HWND, wintypes.LPARAM)
+    user32.EnumWindows(enum_proc(visit), 0)
+    if not found:
+        return None
+    rect = wintypes.RECT()
+    if not user32.GetWindowRect(found[0], ctypes.byref(rect)):
+        return None
+    return rect.left, rect.top
+
+
+class ThroughputReporter:
+    """按固定间隔输出累计次数和最近一段时间的吞吐量"""
+
+    def __init__(self, unit: str, interval: float, started: float = STARTED) -> None:
+        self.unit = unit
+        self.interval = interval
+        self.started = started
+        self.start = time.perf_counter()
+        self.first = None
+        self._last = (self.start, 0)
+        self._next = self.start + interval
+
+    def mark_first(self) -> None:
+        if self.first is None:
+            self.first = time.perf_counter()
+            print(f"首次{self.unit}: 运行器启动后 {(self.first - self.started) * 1000:.1f} ms", flush=True)
+
+    def poll(self, count: int) -> None:
+        now = time.perf_counter()
+        if self.interval <= 0 or now < self._next:
+            return
+        last_time, last_count = self._last
+        rate = (count - last_count) / (now - last_time)
+        print(
+            f"[{now - self.start:8.1f}s] 已{self.unit} {count} 次，最近 {rate:.1f} 次/秒",
+            flush=True,
+        )
+        self._last = (now, count)
+        self._next = now + self.interval
+
+    def finish(self, count: int) -> None:
+        elapsed = time.perf_counter() - self.start
+        rate = count / elapsed if elapsed > 0 else 0.0
+        print(f"完成: 共{self.unit} {count} 次，用时 {elapsed:.2f} s，平均 {rate:.1f} 次/秒", flush=True)
+
+
+def _wait_until(deadline: float, stop_event: threading.Event) -> bool:
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            return True
+        if stop_event.is_set():
+            return False
+        if remaining > SPIN_THRESHOLD:
+            stop_event.wait(min(MAX_WAIT, remaining - SPIN_THRESHOLD))
+
+
+def run_click_job(job: Dict[str, Any], stop_event: threading.Event, report_interval: float) -> int:
+    """执行点击任务，返回退出码"""
+    points, weights = _job_points(job)
+    button_name = job.get("button", job.get("click_type", "left"))
+    if button_name not in BUTTONS:
+        raise JobError(f"无效的点击类型: {button_name}")
+    distribution = job.get("distribution", "uniform")
+    if distribution not in DISTRIBUTIONS:
+        raise JobError(f"未知的间隔分布: {distribution}")
+    rotation = job.get("rotation", "sequential")
+    if rotation not in MODES:
+        raise JobError(f"未知的轮换方式: {rotation}")
+    # 兼容快速点击助手的 interval（毫秒）与 max_clicks
+    interval = _number(job, "interval", None)
+    min_ms = _number(job, "min_ms", interval if interval is not None else 500.0)
+    max_ms = _number(job, "max_ms", interval if interval is not None else min_ms)
+    total = _number(job, "count", _number(job, "max_clicks", 0, int), int)
+    duration = _number(job, "duration", 0.0)
+    seed = _number(job, "seed", None, int)
+    if total < 0 or duration < 0:
+        raise JobError("点击次数和时长不能为负数")
+
+    window = job.get("window")
+    if window is not None and not isinstance(window, dict):
+        raise JobError(f"参数 window 无效: {window!r}")
+    if window:
+        origin = find_window_origin(window.get("title", ""), window.get("class_name", ""))
+        if origin is None:
+            print(f"未找到目标窗口: {window}", file=sys.stderr)
+            return EXIT_RUNTIME_ERROR
+        points = [(x + origin[0], y + origin[1]) for x, y in points]
+
+    try:
+        plan = JitterPlan(
+            min_ms,
+            max_ms,
+            distribution,
+            _number(job, "radius_x", 0.0),
+            _number(job, "radius_y", 0.0),
+            seed,
+        )
+        targets = TargetPlan(points, rotation, weights, seed)
+    except ValueError as e:
+        raise JobError(str(e))
+
+    from pynput import mouse
+
+    controller = mouse.Controller()
+    button = mouse.Button[button_name]
+    set_position = type(controller).position.fset
+    click = controller.click
+    next_jitter = plan.next
+    next_target = targets.next
+
+    reporter = ThroughputReporter("点击", report_interval)
+    count = 0
+    start = time.perf_counter()
+    end = start + duration if duration else None
+    deadline = start
+    while total == 0 or count < total:
+        if end is not None and deadline >= end:
+            break
+        if not _wait_until(deadline, stop_event):
+            break
+        delay, offset_x, offset_y = next_jitter()
+        _, x, y = next_target()
+        set_position(controller, (x + offset_x, y + offset_y))
+        click(button)
+        count += 1
+        if count == 1:
+            reporter.mark_first()
+        reporter.poll(count)
+
+        deadline += delay
+        now = time.perf_counter()
+        if now - deadline > MAX_LAG:
+            deadline = now
+
+    reporter.finish(count)
+    return EXIT_INTERRUPTED if stop_event.is_set() else EXIT_OK
+
+
+def _mark_first_step(program: Any, reporter: ThroughputReporter) -> None:
+    # 第一个注入步骤执行后记录首次复现时间（与点击任务一样在注入完成后记录），画面检查点不算注入
+    for position, (offset, func, args) in enumerate(program.steps):
+        if func is not program.sync:
+            break
+    else:
+        return
+
+    def first_step(*step_args: Any) -> None:
+        func(*step_args)
+        reporter.mark_first()
+
+    program.steps[position] = (offset, first_step, args)
+
+
+def run_recording_job(job: Dict[str, Any], stop_event: threading.Event, report_interval: float) -> int:
+    """复现 RecordOperation 保存的录制文件，返回退出码"""
+    path = job.get("path")
+    if not path:
+        raise JobError("录制任务需要 path")
+    loops = _number(job, "loops", 1, int)
+    speed = _number(job, "speed", 1.0)
+    max_gap = _number(job, "max_gap", None)
+    keep_click_gaps = _bool(job, "keep_click_gaps", False)
+    click_settle = _number(job, "click_settle", CLICK_SETTLE)
+    release_settle = _number(job, "release_settle", RELEASE_SETTLE)
+    if loops <= 0 or speed <= 0:
+        raise JobError("循环次数和速度倍率需要大于 0")
+    if click_settle < 0 or release_settle < 0:
+        raise JobError("稳定等待不能为负数")
+
+    module_dir = os.path.abspath(job.get("record_operation_dir", DEFAULT_RECORD_OPERATION_DIR))
+    if module_dir not in sys.path:
+        sys.path.insert(0, module_dir)
+    try:
+        import windows
+        from backends import create_backend
+        from player import compile_program, play, release_held
+        from recfile import MappedRecording, RecordingFormatError
+    except ImportError as e:
+        raise JobError(f"无法加载录制复现模块（{module_dir}）: {e}")
+
+    try:
+        recording = MappedRecording(path)
+    except (OSError, RecordingFormatError) as e:
+        raise JobError(f"无法打开录制文件: {e}")
+    try:
+        backend = create_backend()
+        anchors = windows.WindowAnchors(recording.windows, backend.move_to) if windows.available() else None
+        program = compile_program(
+            recording,
+            backend,
+            click_settle=click_settle,
+            release_settle=release_settle,
+            speed=speed,
+            max_gap=max_gap,
+            keep_click_gaps=keep_click_gaps,
+            anchors=anchors,
+        )
+        print(f"录制 {path}: {len(recording)} 个事件，{len(program)} 个步骤，每轮 {program.length:.2f} s", flush=True)
+        reporter = ThroughputReporter("复现", report_interval)
+        _mark_first_step(program, reporter)
+
+        def on_loop(loop: int, loops: int, stats) -> None:
+            print(f"第 {loop}/{loops} 轮完成: {len(stats)} 个操作，{stats.summary()}", flush=True)
+
+        finished = play(program, loops, stop_event.is_set, on_loop)
+        if not finished:
+            release_held(recording, program, backend)
+    finally:
+        recording.close()
+    return EXIT_OK if finished else EXIT_INTERRUPTED
+
+
+JOB_TYPES = {
+    "click": run_click_job,
+    "recording": run_recording_job,
+}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="runner", description="无界面运行点击或录制复现任务")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="运行任务文件")
+    run.add_argument("job", help="JSON 或 INI 任务文件")
+    run.add_argument("--report-interval", type=float, default=5.0, help="吞吐量输出间隔（秒），0 表示不输出")
+    args = parser.parse_args(argv)
+
+    stop_event = threading.Event()
+    # Ctrl+C 只设置停止标志，当前点击或复现步骤完成后退出；复现中途停止时松开仍按住的按键和鼠标按钮
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+
+    try:
+        job = load_job(args.job)
+        job_type = job.get("type", "click")
+        handler = JOB_TYPES.get(job_type)
+        if handler is None:
+            raise JobError(f"未知的任务类型: {job_type}")
+        return handler(job, stop_event, args.report_interval)
+    except JobError as e:
+        print(f"任务无效: {e}", file=sys.stderr)
+        return EXIT_JOB_ERROR
+    except Exception as e:
+        print(f"任务执行失败: {e}", file=sys.stderr)
+        return EXIT_RUNTIME_ERROR
+
+
+if __name__ == "__main__":
+    sys.exit(main())
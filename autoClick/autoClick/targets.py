@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多点轮换点击
+功能：
+- 顺序：按添加顺序循环点击各点
+- 加权随机：按权重随机选择下一个点，按块预先生成
+- 最短路径：按最近邻构造回路并用 2-opt 改进，沿回路循环点击，鼠标移动总距离最短
+点击顺序在开始前算好，点击循环中只需按序取值，目标点数量不增加每次点击的开销
+"""
+
+import math
+import random
+from typing import List, Optional, Sequence, Tuple
+
+BLOCK_SIZE = 4096
+
+MODES = {
+    "sequential": "顺序",
+    "weighted": "加权随机",
+    "shortest": "最短路径",
+}
+
+Point = Tuple[int, int]
+
+
+def _tour_length(points: Sequence[Point], order: Sequence[int]) -> float:
+    return sum(
+        math.dist(points[order[i - 1]], points[order[i]]) for i in range(len(order))
+    )
+
+
+def shortest_tour(points: Sequence[Point]) -> List[int]:
+    """
+    计算经过所有点的较短闭合回路
+
+    Args:
+        points: 点坐标列表
+
+    Returns:
+        点的访问顺序（从第一个点出发）
+    """
+    count = len(points)
+    if count <= 3:
+        return list(range(count))
+
+    # 最近邻构造初始回路
+    order = [0]
+    remaining = set(range(1, count))
+    while remaining:
+        last = points[order[-1]]
+        nearest = min(remaining, key=lambda i: math.dist(last, points[i]))
+        order.append(nearest)
+        remaining.remove(nearest)
+
+    # 2-opt：反转一段路径能缩短回路时就反转，直到没有改进
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, count - 1):
+            for j in range(i + 1, count):
+                a, b = points[order[i - 1]], points[order[i]]
+                c, d = points[order[j]], points[order[(j + 1) % count]]
+                if math.dist(a, c) + math.dist(b, d) < math.dist(a, b) + math.dist(c, d) - 1e-9:
+                    order[i:j + 1] = reversed(order[i:j + 1])
+                    improved = True
+    return order
+
+
+class TargetPlan:
+    """预先算好的点击目标序列"""
+
+    def __init__(
+        self,
+        points: Sequence[Point],
+        mode: str = "sequential",
+        weights: Optional[Sequence[float]] = None,
+        seed: Optional[int] = None,
+        block_size: int = BLOCK_SIZE,
+    ) -> None:
+        if not points:
+            raise ValueError("至少需要一个点击位置")
+        if mode not in MODES:
+            raise ValueError(f"未知的轮换方式: {mode}")
+        weights = list(weights) if weights is not None else [1.0] * len(points)
+        if len(weights) != len(points) or any(w < 0 for w in weights) or not any(weights):
+            raise ValueError("权重需要与点一一对应、不能为负数且不能全为 0")
+        self.points = list(points)
+        self.mode = mode
+        self.weights = weights
+        self.block_size = block_size
+        self._rng = random.Random(seed)
+        self._order: List[int] = []
+        self._xs: List[int] = []
+        self._ys: List[int] = []
+        self._index = 0
+
+        if mode == "sequential":
+            self._set_order(list(range(len(points))))
+        elif mode == "shortest":
+            self._set_order(shortest_tour(self.points))
+        else:
+            self._refill()
+
+    @property
+    def tour_length(self) -> float:
+        """顺序和最短路径方式下一轮的鼠标移动距离（像素）"""
+        if self.mode == "weighted":
+            return 0.0
+        return _tour_length(self.points, self._order)
+
+    def _set_order(self, order: List[int]) -> None:
+        self._order = order
+        self._xs = [self.points[i][0] for i in order]
+        self._ys = [self.points[i][1] for i in order]
+
+    def _refill(self) -> None:
+        order = self._rng.choices(range(len(self.points)), weights=self.weights, k=self.block_size)
+        self._set_order(order)
+
+    def next(self) -> Tuple[int, int, int]:
+        """
+        取下一个点击目标
+
+        Returns:
+            (点的序号, x, y)
+        """
+        index = self._index
+        if index >= len(self._order):
+            if self.mode == "weighted":
+                self._refill()
+            index = 0
+        self._index = index + 1
+        return self._order[index], self._xs[index], self._ys[index]
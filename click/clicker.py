@@ -10,7 +10,7 @@ import threading
 import random
 import logging
 from datetime import datetime
-from typing import Dict, Callable, Optional, Any
+from typing import Dict, Callable, List, Optional, Tuple, Any
 
 try:
     import pyautogui
@@ -21,6 +21,8 @@ except ImportError as e:
     logging.error(f"导入点击引擎依赖库失败: {e}")
     raise ImportError(f"请安装必需的依赖库: {e}")
 
+from window_info import WindowInfo
+
 class AutoClicker:
     """自动点击引擎"""
     
@@ -66,23 +68,29 @@ class AutoClicker:
         # 设置回调
         self.callback = callback
         
-        # 重置状态
-        self.stop_event.clear()
+        # 重置状态（每次会话使用独立的停止事件，未退出的旧线程不受影响）
+        self.stop_event = threading.Event()
         self.is_clicking = True
         self.stats['start_time'] = datetime.now()
         
         # 启动点击线程
+        worker = self._multi_click_worker if 'targets' in params else self._click_worker
         self.click_thread = threading.Thread(
-            target=self._click_worker,
-            args=(params,),
+            target=worker,
+            args=(params, self.stop_event),
             daemon=True
         )
         self.click_thread.start()
         
         logging.info(f"开始自动点击: {params}")
     
-    def stop_clicking(self):
-        """停止自动点击"""
+    def stop_clicking(self, wait: bool = True):
+        """
+        停止自动点击
+        
+        Args:
+            wait: 是否等待点击线程结束
+        """
         if not self.is_clicking:
             return
         
@@ -90,12 +98,12 @@ class AutoClicker:
         self.is_clicking = False
         
         # 等待线程结束
-        if self.click_thread and self.click_thread.is_alive():
+        if wait and self.click_thread and self.click_thread.is_alive():
             self.click_thread.join(timeout=2)
         
         logging.info("自动点击已停止")
     
-    def test_click(self, window: Dict[str, Any], coordinates: Dict[str, int]) -> bool:
+    def test_click(self, window: WindowInfo, coordinates: Dict[str, int]) -> bool:
         """
         测试点击
         
@@ -125,6 +133,10 @@ class AutoClicker:
     
     def _validate_params(self, params: Dict[str, Any]):
         """验证点击参数"""
+        if 'targets' in params:
+            self._validate_multi_params(params)
+            return
+        
         required_keys = ['window', 'coordinates', 'interval', 'max_clicks', 'click_type']
         
         for key in required_keys:
@@ -141,7 +153,27 @@ class AutoClicker:
         if params['click_type'] not in ['left', 'right', 'middle']:
             raise ValueError("无效的点击类型")
     
-    def _click_worker(self, params: Dict[str, Any]):
+    def _validate_multi_params(self, params: Dict[str, Any]):
+        """验证多目标点击参数"""
+        if not params['targets']:
+            raise ValueError("多点点击至少需要一个目标")
+        
+        if params.get('max_clicks', 0) < 0:
+            raise ValueError("点击次数不能为负数")
+        
+        if params.get('group_tolerance', 0) < 0:
+            raise ValueError("合并容差不能为负数")
+        
+        for target in params['targets']:
+            for key in ('window', 'coordinates', 'interval'):
+                if key not in target:
+                    raise ValueError(f"点击目标缺少参数: {key}")
+            if target['interval'] < 100:
+                raise ValueError("点击间隔不能小于100毫秒")
+            if target.get('click_type', 'left') not in ['left', 'right', 'middle']:
+                raise ValueError("无效的点击类型")
+    
+    def _click_worker(self, params: Dict[str, Any], stop_event: threading.Event):
         """点击工作线程"""
         try:
             window = params['window']
@@ -154,14 +186,15 @@ class AutoClicker:
             
             click_count = 0
             
-            while not self.stop_event.is_set():
+            while not stop_event.is_set():
                 try:
                     # 检查是否达到最大点击次数
                     if max_clicks > 0 and click_count >= max_clicks:
                         break
                     
-                    # 执行点击
-                    success = self._perform_click(window, coordinates, click_type)
+                    # 执行点击（目标窗口已在前台时无需再次激活）
+                    activate = window.hwnd != self._get_foreground_hwnd()
+                    success = self._perform_click(window, coordinates, click_type, activate)
                     
                     if success:
                         click_count += 1
@@ -194,7 +227,7 @@ class AutoClicker:
                         # 添加10%-50%的随机延迟
                         delay = interval * (1 + random.uniform(0.1, 0.5))
                     
-                    if self.stop_event.wait(delay):
+                    if stop_event.wait(delay):
                         break
                         
                 except Exception as e:
@@ -220,10 +253,105 @@ class AutoClicker:
             if self.callback:
                 self.callback('error', {'message': str(e)})
         finally:
-            self.is_clicking = False
+            if self.stop_event is stop_event:
+                self.is_clicking = False
+    
+    def _multi_click_worker(self, params: Dict[str, Any], stop_event: threading.Event):
+        """多目标点击工作线程"""
+        try:
+            targets = params['targets']
+            max_clicks = params.get('max_clicks', 0)
+            random_delay = params.get('random_delay', False)
+            retry_on_fail = params.get('retry_on_fail', False)
+            default_click_type = params.get('click_type', 'left')
+            
+            planner = ClickDispatchPlanner(
+                targets,
+                tolerance_ms=params.get('group_tolerance', 50),
+                random_delay=random_delay,
+                get_foreground=self._get_foreground_hwnd
+            )
+            click_count = 0
+            stopped = False
+            
+            while not stop_event.is_set() and not stopped:
+                if max_clicks > 0 and click_count >= max_clicks:
+                    break
+                
+                # 等待下一批到期的点击，分批时前台窗口的分组排在最前
+                wait, batch = planner.next_batch(time.monotonic())
+                if wait > 0:
+                    if stop_event.wait(wait):
+                        break
+                    continue
+                
+                for index in batch:
+                    if stop_event.is_set() or (max_clicks > 0 and click_count >= max_clicks):
+                        break
+                    
+                    target = targets[index]
+                    window = target['window']
+                    coordinates = target['coordinates']
+                    click_type = target.get('click_type', default_click_type)
+                    
+                    try:
+                        activate = planner.needs_activation(window)
+                        success = self._perform_click(window, coordinates, click_type, activate)
+                    except Exception as e:
+                        logging.error(f"点击过程中发生错误: {e}")
+                        success = False
+                        activate = False
+                    
+                    planner.complete(index, time.monotonic(), activated=activate, success=success)
+                    
+                    if success:
+                        click_count += 1
+                        self.stats['successful_clicks'] += 1
+                        self.stats['total_clicks'] += 1
+                        self.stats['last_click_time'] = datetime.now()
+                        
+                        if self.callback:
+                            self.callback('click', {
+                                'count': click_count,
+                                'target': index,
+                                'hwnd': window.hwnd,
+                                'coordinates': coordinates,
+                                'timestamp': self.stats['last_click_time']
+                            })
+                    else:
+                        self.stats['failed_clicks'] += 1
+                        
+                        if retry_on_fail:
+                            logging.warning(f"目标 #{index} 点击失败，将重试")
+                        else:
+                            logging.error(f"目标 #{index} 点击失败，停止执行")
+                            stopped = True
+                            break
+            
+            # 完成回调
+            if self.callback:
+                self.callback('complete', {
+                    'total': click_count,
+                    'successful': self.stats['successful_clicks'],
+                    'failed': self.stats['failed_clicks'],
+                    'duration': (datetime.now() - self.stats['start_time']).total_seconds(),
+                    'activations': planner.activations,
+                    'activations_saved': planner.activations_saved
+                })
+            
+            logging.info(f"多点点击完成: 总计{click_count}次, "
+                         f"窗口激活{planner.activations}次, 节省{planner.activations_saved}次")
+            
+        except Exception as e:
+            logging.error(f"点击线程异常: {e}")
+            if self.callback:
+                self.callback('error', {'message': str(e)})
+        finally:
+            if self.stop_event is stop_event:
+                self.is_clicking = False
     
-    def _perform_click(self, window: Dict[str, Any], coordinates: Dict[str, int], 
-                      click_type: str = 'left') -> bool:
+    def _perform_click(self, window: WindowInfo, coordinates: Dict[str, int], 
+                      click_type: str = 'left', activate: bool = True) -> bool:
         """
         执行单次点击
         
@@ -231,6 +359,7 @@ class AutoClicker:
             window: 窗口信息
             coordinates: 坐标信息
             click_type: 点击类型
+            activate: 是否先激活窗口（窗口已在前台时可跳过）
             
         Returns:
             bool: 点击是否成功
@@ -241,11 +370,12 @@ class AutoClicker:
                 logging.warning("目标窗口不存在或不可见")
                 return False
             
-            # 激活窗口
-            self._activate_window(window)
-            
-            # 稍作等待确保窗口激活
-            time.sleep(0.1)
+            if activate:
+                # 激活窗口
+                self._activate_window(window)
+                
+                # 稍作等待确保窗口激活
+                time.sleep(0.1)
             
             # 计算绝对坐标
             abs_x, abs_y = self._calculate_absolute_coordinates(window, coordinates)
@@ -273,17 +403,17 @@ class AutoClicker:
             logging.error(f"执行点击失败: {e}")
             return False
     
-    def _activate_window(self, window: Dict[str, Any]):
+    def _activate_window(self, window: WindowInfo):
         """激活指定窗口"""
         try:
-            hwnd = window.get('hwnd')
+            hwnd = window.hwnd
             if hwnd:
                 # 使用Windows API激活窗口
                 win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
                 win32gui.SetForegroundWindow(hwnd)
             else:
                 # 尝试通过标题查找窗口
-                title = window.get('title', '')
+                title = window.title
                 hwnd = win32gui.FindWindow(None, title)
                 if hwnd:
                     win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
@@ -294,7 +424,15 @@ class AutoClicker:
         except Exception as e:
             logging.error(f"激活窗口失败: {e}")
     
-    def _calculate_absolute_coordinates(self, window: Dict[str, Any], 
+    def _get_foreground_hwnd(self) -> int:
+        """获取当前前台窗口句柄"""
+        try:
+            return win32gui.GetForegroundWindow()
+        except Exception as e:
+            logging.debug(f"获取前台窗口失败: {e}")
+            return 0
+    
+    def _calculate_absolute_coordinates(self, window: WindowInfo, 
                                       coordinates: Dict[str, int]) -> tuple:
         """
         计算绝对屏幕坐标
@@ -307,7 +445,7 @@ class AutoClicker:
             tuple: (绝对x坐标, 绝对y坐标)
         """
         try:
-            hwnd = window.get('hwnd')
+            hwnd = window.hwnd
             if hwnd:
                 # 获取窗口位置
                 rect = win32gui.GetWindowRect(hwnd)
@@ -326,16 +464,16 @@ class AutoClicker:
             logging.error(f"计算坐标失败: {e}")
             return coordinates['x'], coordinates['y']
     
-    def _is_window_valid(self, window: Dict[str, Any]) -> bool:
+    def _is_window_valid(self, window: WindowInfo) -> bool:
         """检查窗口是否仍然有效"""
         try:
-            hwnd = window.get('hwnd')
+            hwnd = window.hwnd
             if hwnd:
                 # 检查窗口是否存在且可见
                 return win32gui.IsWindow(hwnd) and win32gui.IsWindowVisible(hwnd)
             else:
                 # 尝试通过标题查找窗口
-                title = window.get('title', '')
+                title = window.title
                 found_hwnd = win32gui.FindWindow(None, title)
                 return found_hwnd != 0
         except Exception as e:
@@ -387,7 +525,7 @@ class ClickPattern:
             'click_type': click_type
         })
     
-    def execute(self, window: Dict[str, Any], clicker: AutoClicker) -> bool:
+    def execute(self, window: WindowInfo, clicker: AutoClicker) -> bool:
         """执行点击模式"""
         try:
             for pattern in self.patterns:
@@ -409,6 +547,95 @@ class ClickPattern:
             return False
 
 
+class ClickDispatchPlanner:
+    """多目标点击调度器 - 合并同一窗口的点击，减少窗口切换
+    
+    每个目标按自己的间隔到期。每次取出在容差范围内到期的所有点击，
+    按窗口分组执行，当前前台窗口的分组排在最前，已在前台的窗口不再激活。
+    """
+    
+    def __init__(self, targets: List[Dict[str, Any]], tolerance_ms: float = 50,
+                 random_delay: bool = False,
+                 get_foreground: Optional[Callable[[], int]] = None):
+        """
+        初始化调度器
+        
+        Args:
+            targets: 点击目标列表，每项包含window、coordinates、interval(毫秒)
+            tolerance_ms: 合并容差，在此时间内到期的点击会被合并为一批
+            random_delay: 是否为每个间隔添加10%-50%的随机延迟
+            get_foreground: 获取前台窗口句柄的函数，只在有一批点击到期时调用
+        """
+        self.targets = targets
+        self.get_foreground = get_foreground
+        self.tolerance = tolerance_ms / 1000.0
+        self.random_delay = random_delay
+        self.intervals = [target['interval'] / 1000.0 for target in targets]
+        
+        now = time.monotonic()
+        self.next_due = [now] * len(targets)
+        
+        # 缓存的前台窗口句柄（每批开始时刷新，激活窗口后更新）
+        self.foreground_hwnd = 0
+        
+        # 统计数据（只计成功的点击）
+        self.dispatched = 0
+        self.activations = 0
+    
+    @property
+    def activations_saved(self) -> int:
+        """与每次点击都激活窗口相比节省的激活次数"""
+        return self.dispatched - self.activations
+    
+    def next_batch(self, now: float) -> Tuple[float, List[int]]:
+        """
+        获取下一批要执行的点击
+        
+        Returns:
+            tuple: (需要等待的秒数, 目标索引列表)，等待时间大于0时列表为空
+        """
+        earliest = min(self.next_due)
+        if earliest > now:
+            return earliest - now, []
+        
+        # 有点击到期时才刷新前台窗口，等待期间不查询
+        if self.get_foreground is not None:
+            self.foreground_hwnd = self.get_foreground()
+        
+        horizon = now + self.tolerance
+        due = [i for i, due_time in enumerate(self.next_due) if due_time <= horizon]
+        
+        # 按窗口分组，分组顺序按最早到期时间，前台窗口优先
+        groups: Dict[int, List[int]] = {}
+        for index in sorted(due, key=lambda i: self.next_due[i]):
+            groups.setdefault(self.targets[index]['window'].hwnd, []).append(index)
+        
+        batch = groups.pop(self.foreground_hwnd, [])
+        for indices in groups.values():
+            batch.extend(indices)
+        
+        return 0.0, batch
+    
+    def needs_activation(self, window: WindowInfo) -> bool:
+        """目标窗口不在前台时需要激活"""
+        return window.hwnd != self.foreground_hwnd
+    
+    def complete(self, index: int, now: float, activated: bool, success: bool = True):
+        """记录一次点击完成并安排该目标的下一次到期时间，失败的点击不计入统计"""
+        if success:
+            self.dispatched += 1
+            if activated:
+                self.activations += 1
+                self.foreground_hwnd = self.targets[index]['window'].hwnd
+        
+        interval = self.intervals[index]
+        if self.random_delay:
+            interval *= 1 + random.uniform(0.1, 0.5)
+        
+        # 以计划时间为基准推进，避免合并执行带来的累积漂移
+        self.next_due[index] = max(self.next_due[index] + interval, now)
+
+
 class MouseProtection:
     """鼠标保护类 - 检测鼠标移动并提供保护机制"""
     
@@ -7,11 +7,14 @@
 
 import os
 import json
+import math
 import logging
+import sqlite3
+import threading
 import configparser
 from pathlib import Path
-from typing import Any, Dict, Optional
-from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+from datetime import datetime, timedelta
 
 
 class Config:
@@ -372,134 +375,473 @@ class SettingsManager:
 
 
 class StatisticsManager:
-    """统计数据管理器"""
+    """
+    统计数据管理器
+    
+    统计数据保存在 SQLite 数据库（WAL 模式）中：
+        sessions  每个会话一行，按时间建索引
+        daily     每日汇总，以日期为主键
+        totals    总体汇总，只有一行
+        hourly    按小时、窗口和配置方案汇总，用于小时/每日趋势和按窗口、方案的分类统计
+        histograms  每日的点击速率（次/分钟）和会话时长（秒）对数分桶直方图，用于百分位数
+    记录会话时在一个事务中插入一行并增量更新汇总，耗时与历史长度无关；
+    查询直接读取汇总表或按索引查询，不再整体读写 statistics.json
+    """
+    
+    # 返回给界面的最近会话数
+    HISTORY_LIMIT = 100
+    # 直方图每倍频程的桶数，桶代表值的相对误差约 ±9%
+    HISTOGRAM_STEPS = 4
+    # 数值为 0 的样本所在的桶
+    ZERO_BUCKET = -(1 << 20)
+    METRICS = ('click_rate', 'duration')
+    BREAKDOWNS = {'window': 'window_title', 'profile': 'profile'}
     
     def __init__(self, config: Config):
         """初始化统计管理器"""
         self.config = config
         self.stats_file = config.config_dir / 'statistics.json'
-        self.stats = self._load_statistics()
-    
-    def _load_statistics(self) -> Dict[str, Any]:
-        """加载统计数据"""
+        self.db_file = config.config_dir / 'statistics.db'
+        self._lock = threading.Lock()
+        self.conn = self._open_database()
+        self._backfill_buckets()
+        self._migrate_json()
+    
+    def _open_database(self) -> sqlite3.Connection:
+        """打开数据库并创建表"""
+        # 会话可能在点击线程中结束，连接由锁保护，允许跨线程使用
+        conn = sqlite3.connect(str(self.db_file), check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.executescript('''
+            CREATE TABLE IF NOT EXISTS sessions (
+                id INTEGER PRIMARY KEY,
+                timestamp TEXT NOT NULL,
+                day TEXT NOT NULL,
+                clicks INTEGER NOT NULL,
+                successful INTEGER NOT NULL,
+                failed INTEGER NOT NULL,
+                runtime REAL NOT NULL,
+                window_title TEXT NOT NULL DEFAULT ''
+            );
+            CREATE INDEX IF NOT EXISTS sessions_timestamp ON sessions (timestamp);
+            CREATE TABLE IF NOT EXISTS daily (
+                day TEXT PRIMARY KEY,
+                sessions INTEGER NOT NULL,
+                clicks INTEGER NOT NULL,
+                runtime REAL NOT NULL
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS hourly (
+                hour TEXT NOT NULL,
+                window_title TEXT NOT NULL,
+                profile TEXT NOT NULL,
+                sessions INTEGER NOT NULL,
+                clicks INTEGER NOT NULL,
+                successful INTEGER NOT NULL,
+                failed INTEGER NOT NULL,
+                runtime REAL NOT NULL,
+                PRIMARY KEY (hour, window_title, profile)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS histograms (
+                metric TEXT NOT NULL,
+                day TEXT NOT NULL,
+                bucket INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (metric, day, bucket)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS totals (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                total_sessions INTEGER NOT NULL,
+                total_clicks INTEGER NOT NULL,
+                successful_clicks INTEGER NOT NULL,
+                failed_clicks INTEGER NOT NULL,
+                total_runtime REAL NOT NULL,
+                first_use_date TEXT NOT NULL,
+                last_use_date TEXT NOT NULL
+            );
+        ''')
+        columns = {row['name'] for row in conn.execute('PRAGMA table_info(sessions)')}
+        with conn:
+            if 'profile' not in columns:
+                # 旧版数据库的会话没有配置方案
+                conn.execute("ALTER TABLE sessions ADD COLUMN profile TEXT NOT NULL DEFAULT ''")
+            conn.execute(
+                'INSERT OR IGNORE INTO totals VALUES (1, 0, 0, 0, 0, 0, ?, ?)',
+                (datetime.now().isoformat(), '')
+            )
+        return conn
+    
+    def _bucket(self, value: float) -> int:
+        """数值所在的直方图桶"""
+        if value <= 0:
+            return self.ZERO_BUCKET
+        return math.floor(math.log2(value) * self.HISTOGRAM_STEPS)
+    
+    def _bucket_value(self, bucket: int) -> float:
+        """直方图桶的代表值（桶两端的几何平均）"""
+        if bucket == self.ZERO_BUCKET:
+            return 0.0
+        return 2 ** ((bucket + 0.5) / self.HISTOGRAM_STEPS)
+    
+    def _add_to_buckets(self, timestamp: str, window_title: str, profile: str,
+                        clicks: int, successful: int, failed: int, runtime: float):
+        """把一个会话累加到小时汇总和直方图（调用方负责事务）"""
+        self.conn.execute('''
+            INSERT INTO hourly VALUES (?, ?, ?, 1, ?, ?, ?, ?)
+            ON CONFLICT (hour, window_title, profile) DO UPDATE SET sessions = sessions + 1,
+                clicks = clicks + excluded.clicks, successful = successful + excluded.successful,
+                failed = failed + excluded.failed, runtime = runtime + excluded.runtime
+        ''', (timestamp[:13], window_title, profile, clicks, successful, failed, runtime))
+        
+        samples = [('duration', runtime)]
+        if runtime > 0:
+            samples.append(('click_rate', clicks * 60 / runtime))
+        self.conn.executemany('''
+            INSERT INTO histograms VALUES (?, ?, ?, 1)
+            ON CONFLICT (metric, day, bucket) DO UPDATE SET count = count + 1
+        ''', [(metric, timestamp[:10], self._bucket(value)) for metric, value in samples])
+    
+    def _fill_daily_gaps(self, days: Iterable[str]):
+        """
+        把每日统计中没有对应会话的部分计入当天 0 点、窗口未知的小时汇总（调用方负责事务）
+        
+        旧版 statistics.json 只保留最近的会话历史，更早的会话只有每日统计；
+        补齐后由小时汇总得到的每日趋势与每日统计一致。这部分没有单个会话的数据，不计入直方图
+        """
+        for day in days:
+            daily = self.conn.execute('SELECT sessions, clicks, runtime FROM daily WHERE day = ?', (day,)).fetchone()
+            if daily is None:
+                continue
+            counted = self.conn.execute(
+                'SELECT COALESCE(SUM(sessions), 0), COALESCE(SUM(clicks), 0), COALESCE(SUM(runtime), 0) '
+                'FROM hourly WHERE hour BETWEEN ? AND ?',
+                (f"{day}T00", f"{day}T23")
+            ).fetchone()
+            sessions = max(0, daily['sessions'] - counted[0])
+            clicks = max(0, daily['clicks'] - counted[1])
+            runtime = max(0, daily['runtime'] - counted[2])
+            if not (sessions or clicks or runtime):
+                continue
+            self.conn.execute('''
+                INSERT INTO hourly VALUES (?, '', '', ?, ?, ?, 0, ?)
+                ON CONFLICT (hour, window_title, profile) DO UPDATE SET sessions = sessions + excluded.sessions,
+                    clicks = clicks + excluded.clicks, successful = successful + excluded.successful,
+                    runtime = runtime + excluded.runtime
+            ''', (f"{day}T00", sessions, clicks, clicks, runtime))
+    
+    def _backfill_buckets(self):
+        """从已有会话生成小时汇总和直方图（升级旧版数据库后执行一次）"""
         try:
-            if self.stats_file.exists():
-                with open(self.stats_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            else:
-                return self._create_default_statistics()
+            with self._lock, self.conn:
+                if self.conn.execute('SELECT EXISTS (SELECT 1 FROM hourly)').fetchone()[0]:
+                    return
+                rows = self.conn.execute(
+                    'SELECT timestamp, window_title, profile, clicks, successful, failed, runtime FROM sessions'
+                ).fetchall()
+                for row in rows:
+                    self._add_to_buckets(*row)
+                self._fill_daily_gaps([row['day'] for row in self.conn.execute('SELECT day FROM daily')])
+            if rows:
+                logging.info(f"已从 {len(rows)} 个会话生成统计汇总")
         except Exception as e:
-            logging.error(f"加载统计数据失败: {e}")
-            return self._create_default_statistics()
+            logging.error(f"生成统计汇总失败: {e}")
     
-    def _create_default_statistics(self) -> Dict[str, Any]:
-        """创建默认统计数据"""
-        return {
-            'total_sessions': 0,
-            'total_clicks': 0,
-            'successful_clicks': 0,
-            'failed_clicks': 0,
-            'total_runtime': 0,  # 秒
-            'first_use_date': datetime.now().isoformat(),
-            'last_use_date': '',
-            'daily_stats': {},
-            'session_history': []
-        }
-    
-    def save_statistics(self):
-        """保存统计数据"""
+    def _migrate_json(self):
+        """把旧版 statistics.json 导入数据库，导入后重命名为 statistics.json.migrated"""
+        if not self.stats_file.exists():
+            return
         try:
-            with open(self.stats_file, 'w', encoding='utf-8') as f:
-                json.dump(self.stats, f, ensure_ascii=False, indent=2)
+            with open(self.stats_file, 'r', encoding='utf-8') as f:
+                stats = json.load(f)
+            
+            with self._lock, self.conn:
+                self.conn.execute('''
+                    UPDATE totals SET total_sessions = total_sessions + ?,
+                        total_clicks = total_clicks + ?,
+                        successful_clicks = successful_clicks + ?,
+                        failed_clicks = failed_clicks + ?,
+                        total_runtime = total_runtime + ?,
+                        first_use_date = min(first_use_date, ?),
+                        last_use_date = max(last_use_date, ?)
+                    WHERE id = 1
+                ''', (
+                    stats.get('total_sessions', 0),
+                    stats.get('total_clicks', 0),
+                    stats.get('successful_clicks', 0),
+                    stats.get('failed_clicks', 0),
+                    stats.get('total_runtime', 0),
+                    stats.get('first_use_date') or datetime.now().isoformat(),
+                    stats.get('last_use_date', '')
+                ))
+                daily_stats = stats.get('daily_stats', {})
+                self.conn.executemany('''
+                    INSERT INTO daily VALUES (?, ?, ?, ?)
+                    ON CONFLICT (day) DO UPDATE SET sessions = sessions + excluded.sessions,
+                        clicks = clicks + excluded.clicks, runtime = runtime + excluded.runtime
+                ''', [
+                    (day, item.get('sessions', 0), item.get('clicks', 0), item.get('runtime', 0))
+                    for day, item in daily_stats.items()
+                ])
+                # 旧版会话历史没有成功/失败次数，按全部成功导入
+                sessions = [
+                    (item['timestamp'], item.get('window_title', ''), item.get('clicks', 0), item.get('runtime', 0))
+                    for item in stats.get('session_history', []) if item.get('timestamp')
+                ]
+                self.conn.executemany(
+                    'INSERT INTO sessions (timestamp, day, clicks, successful, failed, runtime, window_title) '
+                    'VALUES (?, ?, ?, ?, 0, ?, ?)',
+                    [(timestamp, timestamp[:10], clicks, clicks, runtime, title)
+                     for timestamp, title, clicks, runtime in sessions]
+                )
+                
+                # 导入的会话计入小时汇总和直方图，每日统计中其余的部分按天补齐
+                for timestamp, title, clicks, runtime in sessions:
+                    self._add_to_buckets(timestamp, title, '', clicks, clicks, 0, runtime)
+                self._fill_daily_gaps(daily_stats.keys())
+            
+            self.stats_file.rename(self.stats_file.with_name('statistics.json.migrated'))
+            logging.info("旧版统计数据已导入数据库")
         except Exception as e:
-            logging.error(f"保存统计数据失败: {e}")
+            logging.error(f"导入旧版统计数据失败: {e}")
     
     def record_session(self, session_data: Dict[str, Any]):
         """记录会话数据"""
         try:
-            today = datetime.now().date().isoformat()
-            
-            # 更新总体统计
-            self.stats['total_sessions'] += 1
-            self.stats['total_clicks'] += session_data.get('total_clicks', 0)
-            self.stats['successful_clicks'] += session_data.get('successful_clicks', 0)
-            self.stats['failed_clicks'] += session_data.get('failed_clicks', 0)
-            self.stats['total_runtime'] += session_data.get('runtime', 0)
-            self.stats['last_use_date'] = datetime.now().isoformat()
-            
-            # 更新每日统计
-            if today not in self.stats['daily_stats']:
-                self.stats['daily_stats'][today] = {
-                    'sessions': 0,
-                    'clicks': 0,
-                    'runtime': 0
-                }
+            now = datetime.now()
+            timestamp = now.isoformat()
+            today = now.date().isoformat()
+            clicks = session_data.get('total_clicks', 0)
+            successful = session_data.get('successful_clicks', 0)
+            failed = session_data.get('failed_clicks', 0)
+            runtime = session_data.get('runtime', 0)
+            window_title = session_data.get('window_title', '')
+            profile = session_data.get('profile', '')
             
-            daily = self.stats['daily_stats'][today]
-            daily['sessions'] += 1
-            daily['clicks'] += session_data.get('total_clicks', 0)
-            daily['runtime'] += session_data.get('runtime', 0)
+            with self._lock, self.conn:
+                self.conn.execute(
+                    'INSERT INTO sessions (timestamp, day, clicks, successful, failed, runtime, window_title, profile) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    (timestamp, today, clicks, successful, failed, runtime, window_title, profile)
+                )
+                self._add_to_buckets(timestamp, window_title, profile, clicks, successful, failed, runtime)
+                self.conn.execute('''
+                    INSERT INTO daily VALUES (?, 1, ?, ?)
+                    ON CONFLICT (day) DO UPDATE SET sessions = sessions + 1,
+                        clicks = clicks + excluded.clicks, runtime = runtime + excluded.runtime
+                ''', (today, clicks, runtime))
+                self.conn.execute('''
+                    UPDATE totals SET total_sessions = total_sessions + 1,
+                        total_clicks = total_clicks + ?,
+                        successful_clicks = successful_clicks + ?,
+                        failed_clicks = failed_clicks + ?,
+                        total_runtime = total_runtime + ?,
+                        last_use_date = ?
+                    WHERE id = 1
+                ''', (clicks, successful, failed, runtime, timestamp))
             
-            # 记录会话历史（保留最近100次）
-            session_record = {
-                'timestamp': datetime.now().isoformat(),
-                'clicks': session_data.get('total_clicks', 0),
-                'runtime': session_data.get('runtime', 0),
-                'window_title': session_data.get('window_title', '')
-            }
-            
-            self.stats['session_history'].append(session_record)
-            if len(self.stats['session_history']) > 100:
-                self.stats['session_history'] = self.stats['session_history'][-100:]
-            
-            self.save_statistics()
             logging.info("会话统计记录成功")
         except Exception as e:
             logging.error(f"记录会话统计失败: {e}")
     
     def get_statistics(self) -> Dict[str, Any]:
-        """获取统计数据"""
-        return self.stats.copy()
+        """获取统计数据（总体汇总、每日统计和最近的会话历史）"""
+        try:
+            with self._lock:
+                stats = dict(self.conn.execute('SELECT * FROM totals WHERE id = 1').fetchone())
+                stats.pop('id')
+                stats['daily_stats'] = {
+                    row['day']: {'sessions': row['sessions'], 'clicks': row['clicks'], 'runtime': row['runtime']}
+                    for row in self.conn.execute('SELECT * FROM daily ORDER BY day')
+                }
+                history = self.conn.execute(
+                    'SELECT timestamp, clicks, runtime, window_title FROM sessions '
+                    'ORDER BY timestamp DESC LIMIT ?',
+                    (self.HISTORY_LIMIT,)
+                ).fetchall()
+            stats['session_history'] = [dict(row) for row in reversed(history)]
+            return stats
+        except Exception as e:
+            logging.error(f"获取统计数据失败: {e}")
+            return {}
     
     def get_daily_statistics(self, days: int = 30) -> Dict[str, Any]:
         """获取指定天数的每日统计"""
         try:
-            from datetime import datetime, timedelta
-            
             end_date = datetime.now().date()
             start_date = end_date - timedelta(days=days-1)
             
+            with self._lock:
+                rows = self.conn.execute(
+                    'SELECT * FROM daily WHERE day BETWEEN ? AND ?',
+                    (start_date.isoformat(), end_date.isoformat())
+                ).fetchall()
+            found = {row['day']: row for row in rows}
+            
             daily_data = {}
             for i in range(days):
-                date = start_date + timedelta(days=i)
-                date_str = date.isoformat()
-                daily_data[date_str] = self.stats['daily_stats'].get(date_str, {
-                    'sessions': 0,
-                    'clicks': 0,
-                    'runtime': 0
-                })
+                date_str = (start_date + timedelta(days=i)).isoformat()
+                row = found.get(date_str)
+                daily_data[date_str] = {
+                    'sessions': row['sessions'] if row else 0,
+                    'clicks': row['clicks'] if row else 0,
+                    'runtime': row['runtime'] if row else 0
+                }
             
             return daily_data
         except Exception as e:
             logging.error(f"获取每日统计失败: {e}")
             return {}
     
+    def _range_start(self, days: int) -> str:
+        """最近 days 天（含今天）的起始日期"""
+        return (datetime.now().date() - timedelta(days=days-1)).isoformat()
+    
+    def get_rollup(self, granularity: str = 'day', days: int = 90,
+                   window_title: Optional[str] = None, profile: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        获取按小时或按天汇总的趋势
+        
+        Args:
+            granularity: 'hour' 或 'day'
+            days: 最近的天数（含今天）
+            window_title: 只统计该窗口，None 表示全部
+            profile: 只统计该配置方案，None 表示全部
+        
+        Returns:
+            按时间排序的汇总列表，没有会话的时段也包含在内（数值为 0）
+        """
+        try:
+            if granularity not in ('hour', 'day'):
+                raise ValueError(f"无效的汇总粒度: {granularity}")
+            length = 13 if granularity == 'hour' else 10
+            start = self._range_start(days)
+            sql = (f'SELECT substr(hour, 1, {length}) AS period, SUM(sessions) AS sessions, '
+                   'SUM(clicks) AS clicks, SUM(successful) AS successful, SUM(failed) AS failed, '
+                   'SUM(runtime) AS runtime FROM hourly WHERE hour >= ?')
+            params: List[Any] = [start]
+            if window_title is not None:
+                sql += ' AND window_title = ?'
+                params.append(window_title)
+            if profile is not None:
+                sql += ' AND profile = ?'
+                params.append(profile)
+            sql += ' GROUP BY period'
+            with self._lock:
+                found = {row['period']: dict(row) for row in self.conn.execute(sql, params)}
+            
+            first = datetime.fromisoformat(start)
+            if granularity == 'hour':
+                periods = [(first + timedelta(hours=i)).strftime('%Y-%m-%dT%H') for i in range(days * 24)]
+            else:
+                periods = [(first + timedelta(days=i)).date().isoformat() for i in range(days)]
+            empty = {'sessions': 0, 'clicks': 0, 'successful': 0, 'failed': 0, 'runtime': 0}
+            return [found.get(period, dict(empty, period=period)) for period in periods]
+        except Exception as e:
+            logging.error(f"获取汇总统计失败: {e}")
+            return []
+    
+    def get_breakdown(self, by: str = 'window', days: int = 90, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        按窗口或配置方案分类统计
+        
+        Args:
+            by: 'window' 或 'profile'
+            days: 最近的天数（含今天）
+            limit: 最多返回的分类数（按点击数从多到少）
+        
+        Returns:
+            分类统计列表，每项包含 name、sessions、clicks、successful、failed、runtime
+        """
+        try:
+            column = self.BREAKDOWNS.get(by)
+            if column is None:
+                raise ValueError(f"无效的分类方式: {by}")
+            with self._lock:
+                rows = self.conn.execute(
+                    f'SELECT {column} AS name, SUM(sessions) AS sessions, SUM(clicks) AS clicks, '
+                    'SUM(successful) AS successful, SUM(failed) AS failed, SUM(runtime) AS runtime '
+                    f'FROM hourly WHERE hour >= ? GROUP BY {column} ORDER BY clicks DESC LIMIT ?',
+                    (self._range_start(days), limit)
+                ).fetchall()
+            return [dict(row) for row in rows]
+        except Exception as e:
+            logging.error(f"获取分类统计失败: {e}")
+            return []
+    
+    def get_percentiles(self, metric: str = 'click_rate', days: int = 90,
+                        percentiles: Iterable[float] = (50, 90, 99)) -> Dict[float, float]:
+        """
+        根据直方图估算百分位数
+        
+        Args:
+            metric: 'click_rate'（次/分钟）或 'duration'（秒）
+            days: 最近的天数（含今天）
+            percentiles: 需要的百分位（0-100）
+        
+        Returns:
+            {百分位: 估算值}，没有数据时为空字典
+        """
+        try:
+            if metric not in self.METRICS:
+                raise ValueError(f"无效的统计指标: {metric}")
+            with self._lock:
+                rows = self.conn.execute(
+                    'SELECT bucket, SUM(count) FROM histograms WHERE metric = ? AND day >= ? '
+                    'GROUP BY bucket ORDER BY bucket',
+                    (metric, self._range_start(days))
+                ).fetchall()
+            total = sum(count for _, count in rows)
+            if not total:
+                return {}
+            
+            result = {}
+            for p in sorted(percentiles):
+                # 第一个累计数达到 p% 的桶
+                target = p / 100 * total
+                cumulative = 0
+                for bucket, count in rows:
+                    cumulative += count
+                    if cumulative >= target:
+                        break
+                result[p] = self._bucket_value(bucket)
+            return result
+        except Exception as e:
+            logging.error(f"获取百分位统计失败: {e}")
+            return {}
+    
     def reset_statistics(self):
         """重置统计数据"""
         try:
-            # 备份当前统计
-            backup_file = self.config.config_dir / f'stats_backup_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
-            if self.stats_file.exists():
-                import shutil
-                shutil.copy2(self.stats_file, backup_file)
+            # 备份当前统计（使用 SQLite 在线备份，包含尚未写回主文件的 WAL 内容）
+            backup_file = self.config.config_dir / f'stats_backup_{datetime.now().strftime("%Y%m%d_%H%M%S")}.db'
+            with self._lock:
+                backup = sqlite3.connect(str(backup_file))
+                try:
+                    self.conn.backup(backup)
+                finally:
+                    backup.close()
                 logging.info(f"统计数据已备份到: {backup_file}")
-            
-            # 重置统计数据
-            self.stats = self._create_default_statistics()
-            self.save_statistics()
+                
+                # 重置统计数据
+                with self.conn:
+                    self.conn.execute('DELETE FROM sessions')
+                    self.conn.execute('DELETE FROM daily')
+                    self.conn.execute('DELETE FROM hourly')
+                    self.conn.execute('DELETE FROM histograms')
+                    self.conn.execute(
+                        'UPDATE totals SET total_sessions = 0, total_clicks = 0, successful_clicks = 0, '
+                        'failed_clicks = 0, total_runtime = 0, first_use_date = ?, last_use_date = ? WHERE id = 1',
+                        (datetime.now().isoformat(), '')
+                    )
             
             logging.info("统计数据已重置")
             return True
         except Exception as e:
             logging.error(f"重置统计数据失败: {e}")
             return False
+    
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self.conn.close()
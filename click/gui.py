@@ -6,7 +6,7 @@
 """
 
 import tkinter as tk
-from tkinter import ttk, messagebox, filedialog
+from tkinter import ttk, messagebox, filedialog, simpledialog
 import threading
 import logging
 from datetime import datetime
@@ -15,10 +15,16 @@ import os
 try:
     from clicker import AutoClicker
     from window_manager import WindowManager
+    from task_executor import TaskExecutor
+    from config import ProfileManager, StatisticsManager
+    from window_info import WindowInfo, find_window
     from utils import format_time, validate_number
 except ImportError as e:
     logging.error(f"导入GUI依赖模块失败: {e}")
 
+# 统计选项卡显示的历史天数
+TREND_DAYS = 90
+
 class ClickerGUI:
     """点击器图形用户界面"""
     
@@ -28,14 +34,22 @@ class ClickerGUI:
         self.config = config
         
         # 初始化组件
+        self.executor = TaskExecutor(root)
         self.clicker = AutoClicker()
-        self.window_manager = WindowManager()
+        self.window_manager = WindowManager(self.executor)
+        self.stats_manager = StatisticsManager(config)
+        self.profile_manager = ProfileManager(config)
         
         # 状态变量
         self.is_clicking = False
         self.click_count = 0
         self.selected_window = None
         self.selected_coordinates = None
+        self.click_targets = []
+        self.current_task = None
+        self.active_profile = None
+        self.session_info = None
+        self.trend_data = []
         
         # GUI变量
         self.setup_variables()
@@ -57,6 +71,8 @@ class ClickerGUI:
         self.var_coordinates = tk.StringVar(value="未选择坐标")
         self.var_status = tk.StringVar(value="就绪")
         self.var_total_clicks = tk.StringVar(value="总点击数: 0")
+        self.var_targets = tk.StringVar(value="目标数: 0")
+        self.var_group_tolerance = tk.StringVar(value="50")
     
     def create_widgets(self):
         """创建GUI组件"""
@@ -235,6 +251,20 @@ class ClickerGUI:
         ttk.Checkbutton(click_frame, text="启用多点点击", 
                        variable=self.var_multi_point).pack(anchor=tk.W)
         
+        multi_frame = ttk.Frame(click_frame)
+        multi_frame.pack(fill=tk.X, padx=(20,0), pady=(2,0))
+        ttk.Button(multi_frame, text="添加当前目标", 
+                  command=self.add_click_target).pack(side=tk.LEFT)
+        ttk.Button(multi_frame, text="清空目标", 
+                  command=self.clear_click_targets).pack(side=tk.LEFT, padx=(5,0))
+        ttk.Label(multi_frame, textvariable=self.var_targets).pack(side=tk.LEFT, padx=(10,0))
+        
+        tolerance_frame = ttk.Frame(click_frame)
+        tolerance_frame.pack(fill=tk.X, padx=(20,0), pady=(2,0))
+        ttk.Label(tolerance_frame, text="同窗口合并容差(毫秒):").pack(side=tk.LEFT)
+        ttk.Spinbox(tolerance_frame, from_=0, to=1000, increment=10,
+                   textvariable=self.var_group_tolerance, width=8).pack(side=tk.LEFT, padx=(5,0))
+        
         # 随机延迟
         self.var_random_delay = tk.BooleanVar()
         ttk.Checkbutton(click_frame, text="启用随机延迟", 
@@ -245,6 +275,11 @@ class ClickerGUI:
         ttk.Checkbutton(click_frame, text="点击失败时重试", 
                        variable=self.var_retry_on_fail).pack(anchor=tk.W, pady=(5,0))
         
+        # 实时显示点击位置
+        self.var_show_click_points = tk.BooleanVar()
+        ttk.Checkbutton(click_frame, text="运行时在目标窗口上显示点击位置", 
+                       variable=self.var_show_click_points).pack(anchor=tk.W, pady=(5,0))
+        
         # 安全设置
         safety_frame = ttk.LabelFrame(advanced_frame, text="安全设置", padding=10)
         safety_frame.pack(fill=tk.X, padx=10, pady=5)
@@ -314,6 +349,31 @@ class ClickerGUI:
         
         # 初始化统计数据
         self.init_stats_tree()
+        
+        # 历史趋势（来自统计数据库的预汇总数据）
+        trend_frame = ttk.LabelFrame(stats_frame, text=f"历史趋势（最近{TREND_DAYS}天）", padding=10)
+        trend_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        
+        self.var_trend_summary = tk.StringVar(value="暂无历史数据")
+        ttk.Label(trend_frame, textvariable=self.var_trend_summary, justify=tk.LEFT).pack(anchor=tk.W)
+        
+        self.trend_canvas = tk.Canvas(trend_frame, height=120, bg='white', highlightthickness=0)
+        self.trend_canvas.pack(fill=tk.X, pady=5)
+        self.trend_canvas.bind('<Configure>', lambda e: self.draw_trend())
+        
+        self.breakdown_tree = ttk.Treeview(trend_frame, columns=('sessions', 'clicks', 'runtime'),
+                                           show='tree headings', height=5)
+        self.breakdown_tree.heading('#0', text='窗口', anchor=tk.W)
+        self.breakdown_tree.heading('sessions', text='会话数', anchor=tk.W)
+        self.breakdown_tree.heading('clicks', text='点击数', anchor=tk.W)
+        self.breakdown_tree.heading('runtime', text='运行时间', anchor=tk.W)
+        for column in ('sessions', 'clicks', 'runtime'):
+            self.breakdown_tree.column(column, width=80)
+        self.breakdown_tree.pack(fill=tk.BOTH, expand=True)
+        
+        ttk.Button(trend_frame, text="刷新", command=self.refresh_history_stats).pack(anchor=tk.E, pady=(5, 0))
+        
+        self.refresh_history_stats()
     
     def create_status_bar(self):
         """创建状态栏"""
@@ -341,25 +401,87 @@ class ClickerGUI:
             ("  最后使用", "从未")
         ]
         
+        self.stats_items = {}
         for item, value in items:
-            self.stats_tree.insert('', 'end', text=item, values=(value,))
+            self.stats_items[item.strip()] = self.stats_tree.insert('', 'end', text=item, values=(value,))
+    
+    def refresh_history_stats(self):
+        """从统计数据库刷新历史统计、趋势图、分类统计和百分位数"""
+        stats = self.stats_manager.get_statistics()
+        if stats:
+            last_use = stats.get('last_use_date') or '从未'
+            self.stats_tree.item(self.stats_items['总使用次数'], values=(stats['total_sessions'],))
+            self.stats_tree.item(self.stats_items['总点击次数'], values=(stats['total_clicks'],))
+            self.stats_tree.item(self.stats_items['最后使用'], values=(last_use[:19].replace('T', ' '),))
+        
+        self.trend_data = self.stats_manager.get_rollup('day', TREND_DAYS)
+        self.draw_trend()
+        
+        rate = self.stats_manager.get_percentiles('click_rate', TREND_DAYS)
+        duration = self.stats_manager.get_percentiles('duration', TREND_DAYS)
+        if rate or duration:
+            lines = []
+            if rate:
+                values = ' / '.join(f"{value:.1f}" for value in rate.values())
+                lines.append(f"点击速率 p50/p90/p99: {values} 次/分钟")
+            if duration:
+                values = ' / '.join(format_time(value) for value in duration.values())
+                lines.append(f"会话时长 p50/p90/p99: {values}")
+            self.var_trend_summary.set('\n'.join(lines))
+        else:
+            self.var_trend_summary.set("暂无历史数据")
+        
+        self.breakdown_tree.delete(*self.breakdown_tree.get_children())
+        for row in self.stats_manager.get_breakdown('window', TREND_DAYS, limit=10):
+            self.breakdown_tree.insert('', 'end', text=row['name'] or '(未知窗口)', values=(
+                row['sessions'], row['clicks'], format_time(row['runtime'])
+            ))
+    
+    def draw_trend(self):
+        """绘制每日点击数柱状图"""
+        canvas = self.trend_canvas
+        canvas.delete('all')
+        if not self.trend_data:
+            return
+        width = max(canvas.winfo_width(), 1)
+        height = max(canvas.winfo_height(), 1)
+        peak = max(day['clicks'] for day in self.trend_data)
+        bar_width = width / len(self.trend_data)
+        bottom = height - 16
+        
+        for i, day in enumerate(self.trend_data):
+            if not day['clicks']:
+                continue
+            bar_height = (bottom - 14) * day['clicks'] / peak
+            x = i * bar_width
+            canvas.create_rectangle(x + 1, bottom - bar_height, x + max(bar_width - 1, 2), bottom,
+                                    fill='#4a7bd0', outline='')
+        
+        canvas.create_line(0, bottom, width, bottom, fill='#999999')
+        canvas.create_text(2, height - 2, text=self.trend_data[0]['period'], anchor=tk.SW, fill='#666666')
+        canvas.create_text(width - 2, height - 2, text=self.trend_data[-1]['period'], anchor=tk.SE, fill='#666666')
+        canvas.create_text(2, 2, text=f"每日点击数，最高 {peak}" if peak else "最近没有点击记录",
+                           anchor=tk.NW, fill='#666666')
     
     # ========== 功能方法 ==========
     
     def select_window(self):
         """选择目标窗口"""
-        try:
-            window = self.window_manager.select_window()
-            if window:
-                self.selected_window = window
-                self.var_window_title.set(f"{window['title'][:50]}...")
-                logging.info(f"选择窗口: {window['title']}")
-                self.update_status("窗口选择成功")
-            else:
-                self.update_status("窗口选择取消")
-        except Exception as e:
-            logging.error(f"选择窗口失败: {e}")
-            messagebox.showerror("错误", f"选择窗口失败:\n{e}")
+        self._cancel_current_task()
+        self.current_task = self.window_manager.select_window(
+            self._on_window_selected, on_progress=self.on_task_progress
+        )
+    
+    def _on_window_selected(self, window):
+        """窗口选择完成回调"""
+        self.current_task = None
+        if window:
+            self.selected_window = window
+            self.var_window_title.set(f"{window.title[:50]}...")
+            logging.info(f"选择窗口: {window.title}")
+            self.update_status("窗口选择成功")
+        else:
+            self.update_status("窗口选择取消")
     
     def select_coordinates(self):
         """选择点击坐标"""
@@ -367,18 +489,33 @@ class ClickerGUI:
             messagebox.showwarning("警告", "请先选择目标窗口")
             return
         
-        try:
-            coords = self.window_manager.select_coordinates(self.selected_window)
-            if coords:
-                self.selected_coordinates = coords
-                self.var_coordinates.set(f"({coords['x']}, {coords['y']})")
-                logging.info(f"选择坐标: {coords}")
-                self.update_status("坐标选择成功")
-            else:
-                self.update_status("坐标选择取消")
-        except Exception as e:
-            logging.error(f"选择坐标失败: {e}")
-            messagebox.showerror("错误", f"选择坐标失败:\n{e}")
+        self._cancel_current_task()
+        self.current_task = self.window_manager.select_coordinates(
+            self.selected_window, self._on_coordinates_selected, on_progress=self.on_task_progress
+        )
+    
+    def _on_coordinates_selected(self, coords):
+        """坐标选择完成回调"""
+        self.current_task = None
+        if coords:
+            self.selected_coordinates = coords
+            self.var_coordinates.set(f"({coords['x']}, {coords['y']})")
+            logging.info(f"选择坐标: {coords}")
+            self.update_status("坐标选择成功")
+        else:
+            self.update_status("坐标选择取消")
+    
+    def on_task_progress(self, message, fraction=None):
+        """后台任务进度回调"""
+        if fraction is not None:
+            message = f"{message} {fraction:.0%}"
+        self.update_status(message)
+    
+    def _cancel_current_task(self):
+        """取消当前正在执行的界面任务"""
+        if self.current_task:
+            self.current_task.cancel()
+            self.current_task = None
     
     def start_clicking(self):
         """开始自动点击"""
@@ -397,14 +534,36 @@ class ClickerGUI:
                 'retry_on_fail': self.var_retry_on_fail.get()
             }
             
-            # 开始点击
-            self.clicker.start_clicking(params, callback=self.on_click_event)
+            if self.is_multi_point_mode():
+                params['targets'] = list(self.click_targets)
+                params['group_tolerance'] = int(self.var_group_tolerance.get())
+            
+            # 记录会话开始时的信息，会话结束时写入统计数据库
+            if 'targets' in params:
+                window_title = f"多目标 ({len(params['targets'])})"
+            else:
+                window_title = self.selected_window.title
+            stats = self.clicker.stats
+            self.session_info = (window_title, self.active_profile or '', datetime.now(),
+                                 stats['total_clicks'], stats['successful_clicks'], stats['failed_clicks'])
+            
+            # 开始点击（回调来自点击线程，转交主线程处理）
+            self.clicker.start_clicking(
+                params,
+                callback=lambda event_type, data: self.executor.call_soon(
+                    self.on_click_event, event_type, data
+                )
+            )
             
             self.is_clicking = True
             self.start_btn.config(state='disabled')
             self.stop_btn.config(state='normal')
             self.progress.start()
             
+            if self.var_show_click_points.get():
+                window = params['targets'][0]['window'] if 'targets' in params else self.selected_window
+                self.window_manager.overlay.track(window.hwnd)
+            
             self.update_status("正在点击...")
             logging.info("开始自动点击")
             
@@ -415,7 +574,11 @@ class ClickerGUI:
     def stop_clicking(self):
         """停止自动点击"""
         try:
-            self.clicker.stop_clicking()
+            # 只发出停止信号，不在主线程等待点击线程结束
+            self.clicker.stop_clicking(wait=False)
+            # 完成、出错和手动停止都经过这里，会话在此写入统计
+            self.record_session()
+            self.window_manager.overlay.stop_tracking()
             self.is_clicking = False
             self.start_btn.config(state='normal')
             self.stop_btn.config(state='disabled')
@@ -432,18 +595,62 @@ class ClickerGUI:
         if not self.validate_inputs():
             return
         
-        try:
-            success = self.clicker.test_click(self.selected_window, self.selected_coordinates)
+        def on_done(success):
             if success:
                 messagebox.showinfo("成功", "测试点击成功！")
             else:
                 messagebox.showwarning("失败", "测试点击失败，请检查设置")
-        except Exception as e:
-            logging.error(f"测试点击失败: {e}")
+        
+        def on_error(e):
             messagebox.showerror("错误", f"测试点击失败:\n{e}")
+        
+        self.update_status("正在测试点击...")
+        self.executor.submit(
+            self.clicker.test_click, self.selected_window, self.selected_coordinates,
+            name='test_click', on_done=on_done, on_error=on_error
+        )
+    
+    def add_click_target(self):
+        """把当前窗口、坐标和点击参数添加为多点点击目标"""
+        if not self.selected_window or not self.selected_coordinates:
+            messagebox.showwarning("警告", "请先选择目标窗口和点击坐标")
+            return
+        
+        try:
+            interval = int(self.var_interval.get())
+        except ValueError:
+            messagebox.showwarning("警告", "请输入有效的间隔时间")
+            return
+        
+        self.click_targets.append({
+            'window': self.selected_window,
+            'coordinates': self.selected_coordinates,
+            'interval': interval,
+            'click_type': self.var_click_type.get()
+        })
+        self.var_targets.set(f"目标数: {len(self.click_targets)}")
+        self.update_status(f"已添加点击目标 #{len(self.click_targets)}")
+    
+    def clear_click_targets(self):
+        """清空多点点击目标"""
+        self.click_targets = []
+        self.var_targets.set("目标数: 0")
+    
+    def is_multi_point_mode(self):
+        """是否使用多点点击"""
+        return self.var_multi_point.get() and bool(self.click_targets)
     
     def validate_inputs(self):
         """验证输入参数"""
+        if self.is_multi_point_mode():
+            try:
+                if int(self.var_group_tolerance.get()) < 0:
+                    raise ValueError
+            except ValueError:
+                messagebox.showwarning("警告", "请输入有效的合并容差")
+                return False
+            return True
+        
         if not self.selected_window:
             messagebox.showwarning("警告", "请先选择目标窗口")
             return False
@@ -477,17 +684,40 @@ class ClickerGUI:
         if event_type == 'click':
             self.click_count += 1
             self.var_total_clicks.set(f"总点击数: {self.click_count}")
+            overlay = self.window_manager.overlay
+            if overlay.tracking and data.get('hwnd', overlay.hwnd) == overlay.hwnd:
+                coords = data['coordinates']
+                overlay.add_click_point(coords['x'], coords['y'])
         elif event_type == 'complete':
             self.stop_clicking()
-            messagebox.showinfo("完成", f"点击完成！共点击 {data.get('total', 0)} 次")
+            message = f"点击完成！共点击 {data.get('total', 0)} 次"
+            if 'activations_saved' in data:
+                message += f"\n窗口激活 {data['activations']} 次，节省 {data['activations_saved']} 次"
+            messagebox.showinfo("完成", message)
         elif event_type == 'error':
             self.stop_clicking()
             messagebox.showerror("错误", f"点击过程中发生错误:\n{data.get('message', '未知错误')}")
     
+    def record_session(self):
+        """把结束的点击会话写入统计数据库并刷新统计选项卡（每个会话只记录一次）"""
+        if self.session_info is None:
+            return
+        window_title, profile, start_time, total, successful, failed = self.session_info
+        self.session_info = None
+        stats = self.clicker.stats
+        self.stats_manager.record_session({
+            'total_clicks': stats['total_clicks'] - total,
+            'successful_clicks': stats['successful_clicks'] - successful,
+            'failed_clicks': stats['failed_clicks'] - failed,
+            'runtime': (datetime.now() - start_time).total_seconds(),
+            'window_title': window_title,
+            'profile': profile
+        })
+        self.refresh_history_stats()
+    
     def update_status(self, message):
         """更新状态"""
         self.var_status.set(f"[{datetime.now().strftime('%H:%M:%S')}] {message}")
-        self.root.update_idletasks()
     
     def toggle_clicking(self, event=None):
         """切换点击状态（快捷键）"""
@@ -498,26 +728,165 @@ class ClickerGUI:
     
     def stop_all(self):
         """停止所有操作"""
+        self._cancel_current_task()
+        self.executor.cancel_all()
         self.stop_clicking()
     
+    def shutdown(self):
+        """关闭界面使用的后台资源"""
+        self.window_manager.overlay.destroy()
+        self.executor.shutdown()
+        self.stats_manager.close()
+    
     def save_config(self):
-        """保存配置"""
+        """把当前窗口、坐标和点击参数保存为配置方案"""
         try:
-            # TODO: 实现配置保存
-            messagebox.showinfo("提示", "配置保存功能正在开发中")
+            name = simpledialog.askstring("保存配置", "配置方案名称:", parent=self.root,
+                                          initialvalue=self.active_profile or '')
+            name = name.strip() if name else ''
+            if not name:
+                return
+            if (name != self.active_profile and name in self.profile_manager.profiles
+                    and not messagebox.askyesno("确认", f"配置方案“{name}”已存在，是否覆盖？")):
+                return
+            
+            if not self.profile_manager.save_profile(name, self._collect_profile()):
+                messagebox.showerror("错误", "保存配置失败")
+                return
+            self.active_profile = name
+            self.update_status(f"配置方案已保存: {name}")
         except Exception as e:
             logging.error(f"保存配置失败: {e}")
             messagebox.showerror("错误", f"保存配置失败:\n{e}")
     
     def load_config(self):
-        """加载配置"""
+        """选择并加载配置方案"""
         try:
-            # TODO: 实现配置加载
-            messagebox.showinfo("提示", "配置加载功能正在开发中")
+            names = [item['name'] for item in self.profile_manager.get_profile_list()]
+            if not names:
+                messagebox.showinfo("提示", "还没有保存的配置方案")
+                return
+            self._choose_profile(names)
         except Exception as e:
             logging.error(f"加载配置失败: {e}")
             messagebox.showerror("错误", f"加载配置失败:\n{e}")
     
+    def _collect_profile(self):
+        """当前设置转换为配置方案字典（窗口使用WindowInfo.to_dict保存）"""
+        return {
+            'window': self.selected_window.to_dict() if self.selected_window else None,
+            'coordinates': self.selected_coordinates,
+            'interval': self.var_interval.get(),
+            'click_count': self.var_click_count.get(),
+            'click_type': self.var_click_type.get(),
+            'random_delay': self.var_random_delay.get(),
+            'retry_on_fail': self.var_retry_on_fail.get(),
+            'multi_point': self.var_multi_point.get(),
+            'group_tolerance': self.var_group_tolerance.get(),
+            'targets': [
+                {
+                    'window': target['window'].to_dict(),
+                    'coordinates': target['coordinates'],
+                    'interval': target['interval'],
+                    'click_type': target.get('click_type', 'left')
+                }
+                for target in self.click_targets
+            ]
+        }
+    
+    def _choose_profile(self, names):
+        """显示配置方案列表，选择后加载"""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("加载配置")
+        dialog.geometry("300x320")
+        dialog.transient(self.root)
+        dialog.grab_set()
+        
+        listbox = tk.Listbox(dialog, activestyle='dotbox')
+        listbox.pack(fill=tk.BOTH, expand=True, padx=10, pady=(10, 5))
+        for name in names:
+            listbox.insert(tk.END, name)
+        listbox.selection_set(0)
+        
+        def on_load():
+            selection = listbox.curselection()
+            if not selection:
+                return
+            name = names[selection[0]]
+            dialog.destroy()
+            self._load_profile(name)
+        
+        listbox.bind('<Double-1>', lambda e: on_load())
+        
+        button_frame = ttk.Frame(dialog)
+        button_frame.pack(fill=tk.X, padx=10, pady=(0, 10))
+        ttk.Button(button_frame, text="加载", command=on_load).pack(side=tk.RIGHT, padx=(5, 0))
+        ttk.Button(button_frame, text="取消", command=dialog.destroy).pack(side=tk.RIGHT)
+    
+    def _load_profile(self, name):
+        """加载配置方案，保存的窗口在后台枚举后重新匹配"""
+        profile = self.profile_manager.load_profile(name)
+        if not profile:
+            messagebox.showerror("错误", f"加载配置失败: {name}")
+            return
+        
+        def on_done(windows):
+            self._apply_profile(name, profile, windows)
+        
+        def on_error(e):
+            messagebox.showerror("错误", f"加载配置失败:\n{e}")
+        
+        self._cancel_current_task()
+        self.update_status(f"正在加载配置方案: {name}")
+        self.current_task = self.executor.submit(
+            self.window_manager.get_all_windows,
+            name='load_profile',
+            on_done=on_done,
+            on_error=on_error
+        )
+    
+    def _apply_profile(self, name, profile, windows):
+        """把配置方案应用到界面（窗口句柄按当前窗口重新匹配）"""
+        self.current_task = None
+        missing = []
+        
+        def resolve(data):
+            saved = WindowInfo.from_dict(data)
+            window = find_window(saved, windows)
+            if window is None:
+                missing.append(saved.title or str(saved.hwnd))
+            return window
+        
+        self.var_interval.set(str(profile.get('interval', '1000')))
+        self.var_click_count.set(str(profile.get('click_count', '0')))
+        self.var_click_type.set(profile.get('click_type', 'left'))
+        self.var_random_delay.set(bool(profile.get('random_delay', False)))
+        self.var_retry_on_fail.set(bool(profile.get('retry_on_fail', False)))
+        self.var_multi_point.set(bool(profile.get('multi_point', False)))
+        self.var_group_tolerance.set(str(profile.get('group_tolerance', '50')))
+        
+        window = resolve(profile['window']) if profile.get('window') else None
+        coordinates = profile.get('coordinates')
+        self.selected_window = window
+        self.selected_coordinates = coordinates if window else None
+        self.var_window_title.set(f"{window.title[:50]}..." if window else "未选择窗口")
+        self.var_coordinates.set(
+            f"({coordinates['x']}, {coordinates['y']})" if window and coordinates else "未选择坐标"
+        )
+        
+        self.click_targets = []
+        for target in profile.get('targets', []):
+            target_window = resolve(target['window'])
+            if target_window:
+                self.click_targets.append(dict(target, window=target_window))
+        self.var_targets.set(f"目标数: {len(self.click_targets)}")
+        
+        self.active_profile = name
+        logging.info(f"加载配置方案: {name}")
+        self.update_status(f"配置方案已加载: {name}")
+        if missing:
+            messagebox.showwarning("警告", "以下窗口未找到，请重新选择:\n" + "\n".join(missing))
+    
     def load_settings(self):
         """加载设置"""
         try:
@@ -135,6 +135,7 @@ class ClickerApp:
             # 停止所有点击操作
             if hasattr(self.gui, 'stop_all'):
                 self.gui.stop_all()
+                self.gui.shutdown()
             
             # 保存配置
             self.config.save()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+快速点击助手 - 后台任务执行器
+在线程池中执行阻塞操作，并通过after轮询把结果交回Tk主线程
+"""
+
+import time
+import queue
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+
+class TaskCancelled(Exception):
+    """任务已被取消"""
+
+
+class Task:
+    """后台任务句柄，支持进度报告和取消"""
+    
+    def __init__(self, executor: 'TaskExecutor', name: str,
+                 on_progress: Optional[Callable] = None):
+        """初始化任务句柄"""
+        self.executor = executor
+        self.name = name
+        self.future = None
+        self._on_progress = on_progress
+        self._cancel_event = threading.Event()
+    
+    @property
+    def cancelled(self) -> bool:
+        """任务是否已被取消"""
+        return self._cancel_event.is_set()
+    
+    def cancel(self):
+        """请求取消任务（已开始执行的任务需要自行检查取消状态）"""
+        self._cancel_event.set()
+        if self.future:
+            self.future.cancel()
+    
+    def check_cancelled(self):
+        """在工作线程中检查取消状态，已取消则抛出TaskCancelled"""
+        if self._cancel_event.is_set():
+            raise TaskCancelled(self.name)
+    
+    def sleep(self, seconds: float):
+        """可被取消打断的等待"""
+        if self._cancel_event.wait(seconds):
+            raise TaskCancelled(self.name)
+    
+    def report_progress(self, message: str, fraction: Optional[float] = None):
+        """从工作线程报告进度，回调在主线程执行"""
+        if self._on_progress and not self.cancelled:
+            self.executor.call_soon(self._on_progress, message, fraction)
+
+
+class TaskExecutor:
+    """后台任务执行器
+    
+    阻塞操作在线程池中运行，完成回调、错误回调和进度回调都通过
+    完成队列在Tk主线程中执行。主线程每次只处理有限的时间片，
+    保证主循环不会被阻塞超过一帧。
+    """
+    
+    POLL_MS = 15          # 完成队列轮询间隔
+    FRAME_BUDGET = 0.008  # 每次轮询最多处理的时间（秒）
+    
+    def __init__(self, root, max_workers: int = 4):
+        """初始化任务执行器"""
+        self.root = root
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='gui-task')
+        self.completions = queue.SimpleQueue()
+        self.tasks = set()
+        self._lock = threading.Lock()
+        self._after_id = None
+        self._closed = False
+        
+        self._poll()
+        logging.info("后台任务执行器初始化完成")
+    
+    def submit(self, func: Callable, *args,
+               name: str = '',
+               on_done: Optional[Callable] = None,
+               on_error: Optional[Callable] = None,
+               on_progress: Optional[Callable] = None,
+               with_task: bool = False,
+               **kwargs) -> Task:
+        """
+        提交后台任务
+        
+        Args:
+            func: 在工作线程中执行的函数
+            name: 任务名称（用于日志）
+            on_done: 成功回调，参数为func的返回值，在主线程执行
+            on_error: 错误回调，参数为异常对象，在主线程执行
+            on_progress: 进度回调，参数为(message, fraction)，在主线程执行
+            with_task: 为True时把Task句柄作为第一个参数传给func
+        
+        Returns:
+            Task: 任务句柄
+        """
+        if self._closed:
+            raise RuntimeError("任务执行器已关闭")
+        
+        task = Task(self, name or getattr(func, '__name__', 'task'), on_progress)
+        call_args = (task,) + args if with_task else args
+        
+        def run():
+            if task.cancelled:
+                return
+            try:
+                result = func(*call_args, **kwargs)
+            except TaskCancelled:
+                logging.info(f"后台任务已取消: {task.name}")
+            except Exception as e:
+                logging.error(f"后台任务失败 {task.name}: {e}")
+                if on_error and not task.cancelled:
+                    self.call_soon(on_error, e)
+            else:
+                if on_done and not task.cancelled:
+                    self.call_soon(on_done, result)
+            finally:
+                with self._lock:
+                    self.tasks.discard(task)
+        
+        with self._lock:
+            self.tasks.add(task)
+        task.future = self.pool.submit(run)
+        return task
+    
+    def call_soon(self, callback: Callable, *args):
+        """从任意线程安排回调在Tk主线程中执行"""
+        if not self._closed:
+            self.completions.put((callback, args))
+    
+    def cancel_all(self):
+        """取消所有未完成的任务"""
+        with self._lock:
+            tasks = list(self.tasks)
+        for task in tasks:
+            task.cancel()
+    
+    @property
+    def busy(self) -> bool:
+        """是否有未完成的任务"""
+        with self._lock:
+            return bool(self.tasks)
+    
+    def shutdown(self):
+        """关闭执行器，取消未开始的任务，不等待正在执行的任务"""
+        if self._closed:
+            return
+        self._closed = True
+        self.cancel_all()
+        
+        if self._after_id:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+        
+        self.pool.shutdown(wait=False)
+        logging.info("后台任务执行器已关闭")
+    
+    def _poll(self):
+        """在主线程中处理完成队列"""
+        if self._closed:
+            return
+        # 先安排下一次轮询：回调可能打开模态对话框（wait_window），
+        # 对话框的嵌套事件循环中仍需继续处理完成队列
+        self._after_id = self.root.after(self.POLL_MS, self._poll)
+        
+        deadline = time.perf_counter() + self.FRAME_BUDGET
+        while time.perf_counter() < deadline:
+            try:
+                callback, args = self.completions.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                callback(*args)
+            except Exception as e:
+                logging.error(f"执行任务回调失败: {e}")
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+快速点击助手 - 窗口缩略图缓存
+在后台线程按需截取窗口缩略图，并以(句柄, 窗口位置)为键缓存
+"""
+
+import logging
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from PIL import Image
+
+from task_executor import Task, TaskExecutor
+from window_info import WindowInfo
+
+
+# 截图失败的窗口在缓存中的占位，避免每次滚动都重新截取
+_FAILED = object()
+
+
+class ThumbnailCache:
+    """窗口缩略图缓存（容量受限的LRU）
+    
+    缩略图只在主线程读写；截图在执行器的线程池中进行，完成后回到主线程写入缓存。
+    键包含窗口位置，窗口移动或改变大小后自然失效；其他变化通过invalidate通知。
+    截图失败也按同一个键缓存，窗口移动或invalidate之后才会重新截取。
+    """
+    
+    def __init__(self, capture_func: Callable[[WindowInfo], Optional[Image.Image]],
+                 executor: TaskExecutor, max_items: int = 128,
+                 size: Tuple[int, int] = (96, 54)):
+        """
+        初始化缩略图缓存
+        
+        Args:
+            capture_func: 截取窗口完整截图的函数（在工作线程中调用）
+            executor: 后台任务执行器
+            max_items: 最多缓存的缩略图数量
+            size: 缩略图最大尺寸
+        """
+        self.capture_func = capture_func
+        self.executor = executor
+        self.max_items = max_items
+        self.size = size
+        
+        self._items = OrderedDict()
+        self._pending: Dict[tuple, Tuple[Task, List[Callable]]] = {}
+        
+        # 统计数据
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def key_for(window: WindowInfo) -> tuple:
+        """缓存键：窗口句柄和窗口位置"""
+        return (window.hwnd, window.rect)
+    
+    def get(self, window: WindowInfo) -> Optional[Image.Image]:
+        """获取已缓存的缩略图"""
+        key = self.key_for(window)
+        image = self._items.get(key)
+        if image is None:
+            return None
+        self._items.move_to_end(key)
+        return None if image is _FAILED else image
+    
+    def request(self, window: WindowInfo, callback: Callable[[WindowInfo, Image.Image], None]):
+        """
+        请求窗口缩略图，已缓存时立即回调，否则在后台截取后回调；截图失败时不回调
+        
+        Args:
+            window: 窗口信息
+            callback: 回调函数，参数为(窗口信息, 缩略图)，在主线程执行
+        """
+        key = self.key_for(window)
+        if key in self._items:
+            self.hits += 1
+            image = self.get(window)
+            if image is not None:
+                callback(window, image)
+            return
+        
+        if key in self._pending:
+            self._pending[key][1].append(callback)
+            return
+        
+        self.misses += 1
+        
+        def on_done(thumbnail):
+            _, callbacks = self._pending.pop(key, (None, []))
+            if thumbnail is None:
+                self._store(key, _FAILED)
+                return
+            self._store(key, thumbnail)
+            for cb in callbacks:
+                cb(window, thumbnail)
+        
+        def on_error(e):
+            self._pending.pop(key, None)
+        
+        task = self.executor.submit(
+            self._capture, window,
+            name=f'thumbnail_{window.hwnd}',
+            on_done=on_done,
+            on_error=on_error
+        )
+        self._pending[key] = (task, [callback])
+    
+    def cancel_except(self, windows: Iterable[WindowInfo]):
+        """取消不在给定窗口集合中的截图请求（例如已滚出可见区域的行）"""
+        keep = {self.key_for(window) for window in windows}
+        for key in list(self._pending):
+            if key not in keep:
+                task, _ = self._pending.pop(key)
+                task.cancel()
+    
+    def invalidate(self, hwnd: int):
+        """窗口内容发生变化时丢弃其缩略图"""
+        for key in [key for key in self._items if key[0] == hwnd]:
+            del self._items[key]
+    
+    def clear(self):
+        """清空缓存并取消所有未完成的截图"""
+        for task, _ in self._pending.values():
+            task.cancel()
+        self._pending.clear()
+        self._items.clear()
+    
+    def _store(self, key: tuple, image: Image.Image):
+        """写入缓存并淘汰最久未使用的缩略图（image可以是截图失败的占位）"""
+        # 同一窗口的旧位置缩略图已经过期
+        self.invalidate(key[0])
+        self._items[key] = image
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+    
+    def _capture(self, window: WindowInfo) -> Optional[Image.Image]:
+        """截取窗口并缩小为缩略图（工作线程）"""
+        image = self.capture_func(window)
+        if image is None:
+            logging.debug(f"截取窗口缩略图失败: {window.hwnd}")
+            return None
+        image.thumbnail(self.size, Image.Resampling.BILINEAR)
+        return image
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+快速点击助手 - 窗口信息记录
+紧凑、不可变的窗口信息类型，以及与配置文件字典之间的转换
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+class WindowInfo:
+    """窗口信息（不可变，使用__slots__减少内存和属性查找开销）"""
+    
+    __slots__ = ('hwnd', 'title', 'class_name', 'rect', 'process_name', 'process_path', 'pid')
+    
+    def __init__(self, hwnd: int, title: str, class_name: str = '',
+                 rect: Tuple[int, int, int, int] = (0, 0, 0, 0),
+                 process_name: str = 'Unknown', process_path: str = '', pid: int = 0):
+        """初始化窗口信息"""
+        set_field = object.__setattr__
+        set_field(self, 'hwnd', hwnd)
+        set_field(self, 'title', title)
+        set_field(self, 'class_name', class_name)
+        set_field(self, 'rect', tuple(rect))
+        set_field(self, 'process_name', process_name)
+        set_field(self, 'process_path', process_path)
+        set_field(self, 'pid', pid)
+    
+    def __setattr__(self, name, value):
+        raise AttributeError("WindowInfo是不可变对象")
+    
+    def __delattr__(self, name):
+        raise AttributeError("WindowInfo是不可变对象")
+    
+    @property
+    def width(self) -> int:
+        """窗口宽度"""
+        return self.rect[2] - self.rect[0]
+    
+    @property
+    def height(self) -> int:
+        """窗口高度"""
+        return self.rect[3] - self.rect[1]
+    
+    def _key(self) -> tuple:
+        return (self.hwnd, self.title, self.class_name, self.rect,
+                self.process_name, self.process_path, self.pid)
+    
+    def __eq__(self, other):
+        if not isinstance(other, WindowInfo):
+            return NotImplemented
+        return self._key() == other._key()
+    
+    def __hash__(self):
+        return hash(self._key())
+    
+    def __repr__(self):
+        return (f"WindowInfo(hwnd={self.hwnd}, title={self.title!r}, "
+                f"process_name={self.process_name!r}, rect={self.rect})")
+    
+    def replace(self, **changes) -> 'WindowInfo':
+        """返回替换了部分字段的新窗口信息"""
+        fields = {name: getattr(self, name) for name in self.__slots__}
+        fields.update(changes)
+        return WindowInfo(**fields)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典（用于保存到配置文件）"""
+        return {
+            'hwnd': self.hwnd,
+            'title': self.title,
+            'class_name': self.class_name,
+            'rect': list(self.rect),
+            'width': self.width,
+            'height': self.height,
+            'process_name': self.process_name,
+            'process_path': self.process_path,
+            'pid': self.pid
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'WindowInfo':
+        """从字典创建窗口信息（兼容旧版配置文件中的窗口字典）"""
+        return cls(
+            hwnd=int(data.get('hwnd') or 0),
+            title=data.get('title', ''),
+            class_name=data.get('class_name', ''),
+            rect=tuple(data.get('rect') or (0, 0, 0, 0)),
+            process_name=data.get('process_name', 'Unknown'),
+            process_path=data.get('process_path', ''),
+            pid=int(data.get('pid') or 0)
+        )
+
+
+def diff_windows(old: Iterable[WindowInfo], new: Iterable[WindowInfo]
+                 ) -> Tuple[List[WindowInfo], List[WindowInfo], List[WindowInfo]]:
+    """
+    按窗口句柄比较两次枚举的结果
+    
+    Returns:
+        tuple: (新增窗口, 消失窗口, 信息变化的窗口)
+    """
+    old_by_hwnd = {window.hwnd: window for window in old}
+    new_by_hwnd = {window.hwnd: window for window in new}
+    
+    added = [w for hwnd, w in new_by_hwnd.items() if hwnd not in old_by_hwnd]
+    removed = [w for hwnd, w in old_by_hwnd.items() if hwnd not in new_by_hwnd]
+    changed = [w for hwnd, w in new_by_hwnd.items()
+               if hwnd in old_by_hwnd and old_by_hwnd[hwnd] != w]
+    
+    return added, removed, changed
+
+
+def find_window(saved: WindowInfo, windows: Iterable[WindowInfo]) -> Optional[WindowInfo]:
+    """
+    在当前窗口中查找配置文件保存的窗口（程序重启后窗口句柄通常已经改变）
+    
+    依次按句柄（标题和类名也相同）、标题和类名、进程名和类名匹配
+    
+    Returns:
+        WindowInfo: 当前的窗口信息，找不到时为None
+    """
+    windows = list(windows)
+    matchers = (
+        lambda w: w.hwnd == saved.hwnd and w.title == saved.title and w.class_name == saved.class_name,
+        lambda w: w.title == saved.title and w.class_name == saved.class_name,
+        lambda w: bool(saved.class_name) and w.process_name == saved.process_name
+                  and w.class_name == saved.class_name,
+    )
+    for matches in matchers:
+        for window in windows:
+            if matches(window):
+                return window
+    return None
@@ -10,10 +10,15 @@ import tkinter as tk
 from tkinter import messagebox, ttk
 import threading
 import logging
-from typing import List, Dict, Optional, Tuple, Any
+from collections import deque
+from typing import Callable, List, Dict, Optional, Tuple, Any
 import subprocess
 import psutil
 
+from task_executor import TaskExecutor
+from window_info import WindowInfo, diff_windows
+from thumbnails import ThumbnailCache
+
 try:
     import win32gui
     import win32process
@@ -27,18 +32,33 @@ except ImportError as e:
     raise ImportError(f"请安装必需的依赖库: {e}")
 
 
+def _row_values(window: WindowInfo) -> tuple:
+    """窗口选择列表中一行的显示内容"""
+    return (
+        window.hwnd,
+        window.title[:50] + ('...' if len(window.title) > 50 else ''),
+        window.process_name,
+        f"{window.width}x{window.height}"
+    )
+
+
 class WindowManager:
     """窗口管理器"""
     
-    def __init__(self):
+    THUMBNAIL_ROW_HEIGHT = 60  # 窗口选择列表的行高（容纳缩略图）
+    
+    def __init__(self, executor: TaskExecutor):
         """初始化窗口管理器"""
+        self.executor = executor
         self.windows = []
         self.selected_window = None
         self.coordinate_picker = None
+        self._overlay = None
+        self.thumbnails = ThumbnailCache(self._capture_thumbnail_source, executor)
         
         logging.info("窗口管理器初始化完成")
     
-    def get_all_windows(self) -> List[Dict[str, Any]]:
+    def get_all_windows(self) -> List[WindowInfo]:
         """获取所有可见窗口列表"""
         windows = []
         
@@ -68,17 +88,15 @@ class WindowManager:
                         process_name = "Unknown"
                         process_path = ""
                     
-                    window_info = {
-                        'hwnd': hwnd,
-                        'title': title,
-                        'class_name': class_name,
-                        'rect': rect,
-                        'width': width,
-                        'height': height,
-                        'process_name': process_name,
-                        'process_path': process_path,
-                        'pid': pid if 'pid' in locals() else 0
-                    }
+                    window_info = WindowInfo(
+                        hwnd=hwnd,
+                        title=title,
+                        class_name=class_name,
+                        rect=rect,
+                        process_name=process_name,
+                        process_path=process_path,
+                        pid=pid if 'pid' in locals() else 0
+                    )
                     
                     windows_list.append(window_info)
                     
@@ -93,33 +111,50 @@ class WindowManager:
             logging.error(f"枚举窗口失败: {e}")
         
         # 按标题排序
-        windows.sort(key=lambda w: w['title'].lower())
+        windows.sort(key=lambda w: w.title.lower())
         self.windows = windows
         
         logging.info(f"找到 {len(windows)} 个可见窗口")
         return windows
     
-    def select_window(self) -> Optional[Dict[str, Any]]:
-        """显示窗口选择对话框"""
-        try:
-            # 获取所有窗口
-            windows = self.get_all_windows()
-            
+    def select_window(self, on_selected: Callable[[Optional[WindowInfo]], None],
+                      on_progress: Optional[Callable] = None):
+        """
+        显示窗口选择对话框（窗口枚举在后台线程执行）
+        
+        Args:
+            on_selected: 选择完成回调，参数为窗口信息，取消时为None
+            on_progress: 进度回调
+        """
+        def on_done(windows):
             if not windows:
                 messagebox.showwarning("警告", "没有找到可选择的窗口")
-                return None
-            
-            # 创建选择对话框
-            return self._show_window_selector(windows)
+                on_selected(None)
+                return
             
-        except Exception as e:
-            logging.error(f"选择窗口失败: {e}")
+            # 对话框在主循环的下一轮打开，其模态循环不嵌套在执行器的轮询回调中，
+            # 缩略图和刷新结果在对话框打开期间照常送达
+            self.executor.root.after(0, lambda: on_selected(self._show_window_selector(windows)))
+        
+        def on_error(e):
             messagebox.showerror("错误", f"选择窗口失败:\n{e}")
-            return None
+            on_selected(None)
+        
+        if on_progress:
+            on_progress("正在枚举窗口...", None)
+        
+        return self.executor.submit(
+            self.get_all_windows,
+            name='enum_windows',
+            on_done=on_done,
+            on_error=on_error,
+            on_progress=on_progress
+        )
     
-    def _show_window_selector(self, windows: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    def _show_window_selector(self, windows: List[WindowInfo]) -> Optional[WindowInfo]:
         """显示窗口选择对话框"""
         selected_window = None
+        windows_by_hwnd = {window.hwnd: window for window in windows}
         
         def on_select():
             nonlocal selected_window
@@ -129,28 +164,84 @@ class WindowManager:
                 hwnd = item['values'][0] if item['values'] else None
                 if hwnd:
                     # 查找对应的窗口信息
-                    for window in windows:
-                        if window['hwnd'] == int(hwnd):
-                            selected_window = window
-                            break
-                dialog.destroy()
+                    selected_window = windows_by_hwnd.get(int(hwnd))
+                on_close()
             else:
                 messagebox.showwarning("警告", "请选择一个窗口")
         
         def on_cancel():
-            dialog.destroy()
+            on_close()
         
         def on_refresh():
-            # 刷新窗口列表
-            new_windows = self.get_all_windows()
-            tree.delete(*tree.get_children())
-            for window in new_windows:
-                tree.insert('', 'end', values=(
-                    window['hwnd'],
-                    window['title'][:50] + ('...' if len(window['title']) > 50 else ''),
-                    window['process_name'],
-                    f"{window['width']}x{window['height']}"
-                ))
+            # 刷新窗口列表（后台枚举，完成后在主线程更新）
+            def on_done(new_windows):
+                if not dialog.winfo_exists():
+                    return
+                # 只更新发生变化的行
+                added, removed, changed = diff_windows(windows_by_hwnd.values(), new_windows)
+                for window in removed:
+                    tree.delete(str(window.hwnd))
+                for window in changed:
+                    tree.item(str(window.hwnd), values=_row_values(window))
+                added_hwnds = {window.hwnd for window in added}
+                for index, window in enumerate(new_windows):
+                    if window.hwnd in added_hwnds:
+                        tree.insert('', index, iid=str(window.hwnd), values=_row_values(window))
+                
+                windows_by_hwnd.clear()
+                windows_by_hwnd.update((window.hwnd, window) for window in new_windows)
+                
+                # 信息变化的窗口重新截取缩略图
+                for window in changed:
+                    self.thumbnails.invalidate(window.hwnd)
+                    photos.pop(str(window.hwnd), None)
+                schedule_thumbnails()
+            
+            self.executor.submit(self.get_all_windows, name='refresh_windows', on_done=on_done)
+        
+        def visible_windows() -> List[WindowInfo]:
+            """当前在列表中可见的窗口"""
+            visible = []
+            height = tree.winfo_height()
+            for y in range(0, max(height, 1), self.THUMBNAIL_ROW_HEIGHT // 2):
+                iid = tree.identify_row(y)
+                window = windows_by_hwnd.get(int(iid)) if iid else None
+                if window and (not visible or visible[-1] is not window):
+                    visible.append(window)
+            return visible
+        
+        def on_thumbnail(window, image):
+            iid = str(window.hwnd)
+            if not dialog.winfo_exists() or not tree.exists(iid):
+                return
+            photo = ImageTk.PhotoImage(image)
+            photos[iid] = photo
+            tree.item(iid, image=photo)
+        
+        def load_visible_thumbnails():
+            nonlocal thumbnail_after_id
+            thumbnail_after_id = None
+            if not dialog.winfo_exists():
+                return
+            visible = visible_windows()
+            # 滚出可见区域的行不再截图
+            self.thumbnails.cancel_except(visible)
+            for window in visible:
+                if str(window.hwnd) not in photos:
+                    self.thumbnails.request(window, on_thumbnail)
+        
+        def schedule_thumbnails(*_):
+            nonlocal thumbnail_after_id
+            if thumbnail_after_id is None:
+                thumbnail_after_id = dialog.after(80, load_visible_thumbnails)
+        
+        def on_scroll(first, last):
+            scrollbar.set(first, last)
+            schedule_thumbnails()
+        
+        def on_close():
+            self.thumbnails.cancel_except(())
+            dialog.destroy()
         
         def on_highlight():
             """高亮选中的窗口"""
@@ -164,12 +255,17 @@ class WindowManager:
                     except Exception as e:
                         logging.error(f"高亮窗口失败: {e}")
         
+        # 缩略图只为可见行按需加载
+        photos = {}
+        thumbnail_after_id = None
+        
         # 创建对话框
         dialog = tk.Toplevel()
         dialog.title("选择目标窗口")
-        dialog.geometry("700x500")
+        dialog.geometry("800x560")
         dialog.resizable(True, True)
         dialog.grab_set()  # 模态对话框
+        dialog.protocol("WM_DELETE_WINDOW", on_close)
         
         # 工具栏
         toolbar = ttk.Frame(dialog)
@@ -182,16 +278,21 @@ class WindowManager:
         frame = ttk.Frame(dialog)
         frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
         
-        # 设置列
+        # 设置列（第一列显示缩略图）
+        style = ttk.Style(dialog)
+        style.configure('Thumbnail.Treeview', rowheight=self.THUMBNAIL_ROW_HEIGHT)
         columns = ('hwnd', 'title', 'process', 'size')
-        tree = ttk.Treeview(frame, columns=columns, show='headings', height=15)
+        tree = ttk.Treeview(frame, columns=columns, show='tree headings', height=7,
+                            style='Thumbnail.Treeview')
         
         # 设置列标题和宽度
+        tree.heading('#0', text='预览')
         tree.heading('hwnd', text='句柄')
         tree.heading('title', text='窗口标题')
         tree.heading('process', text='进程名')
         tree.heading('size', text='大小')
         
+        tree.column('#0', width=self.thumbnails.size[0] + 24, stretch=False)
         tree.column('hwnd', width=80, anchor=tk.CENTER)
         tree.column('title', width=350)
         tree.column('process', width=120)
@@ -199,16 +300,12 @@ class WindowManager:
         
         # 添加数据
         for window in windows:
-            tree.insert('', 'end', values=(
-                window['hwnd'],
-                window['title'][:50] + ('...' if len(window['title']) > 50 else ''),
-                window['process_name'],
-                f"{window['width']}x{window['height']}"
-            ))
+            tree.insert('', 'end', iid=str(window.hwnd), values=_row_values(window))
         
         # 滚动条
         scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=tree.yview)
-        tree.configure(yscrollcommand=scrollbar.set)
+        tree.configure(yscrollcommand=on_scroll)
+        tree.bind('<Configure>', schedule_thumbnails)
         
         tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
@@ -229,59 +326,87 @@ class WindowManager:
         return selected_window
     
     def _highlight_window(self, hwnd: int, duration: float = 2.0):
-        """高亮显示指定窗口"""
+        """高亮显示指定窗口（覆盖层边框闪烁，不阻塞主循环）"""
         try:
-            # 获取窗口位置
-            rect = win32gui.GetWindowRect(hwnd)
-            
-            # 创建高亮效果（闪烁窗口）
-            for _ in range(3):
-                win32gui.ShowWindow(hwnd, win32con.SW_SHOW)
-                win32gui.SetForegroundWindow(hwnd)
-                time.sleep(0.2)
-                win32gui.ShowWindow(hwnd, win32con.SW_MINIMIZE)
-                time.sleep(0.2)
-            
-            win32gui.ShowWindow(hwnd, win32con.SW_SHOW)
-            win32gui.SetForegroundWindow(hwnd)
-            
+            self.overlay.highlight(hwnd, duration)
         except Exception as e:
             logging.error(f"高亮窗口失败: {e}")
     
-    def select_coordinates(self, window: Dict[str, Any]) -> Optional[Dict[str, int]]:
-        """选择点击坐标"""
-        try:
-            if not window:
-                messagebox.showwarning("警告", "请先选择目标窗口")
-                return None
-            
+    @property
+    def overlay(self) -> 'WindowOverlay':
+        """获取窗口覆盖层（按需创建）"""
+        if self._overlay is None:
+            self._overlay = WindowOverlay()
+        return self._overlay
+    
+    def select_coordinates(self, window: WindowInfo,
+                           on_selected: Callable[[Optional[Dict[str, int]]], None],
+                           on_progress: Optional[Callable] = None):
+        """
+        选择点击坐标（窗口激活和截图在后台线程执行）
+        
+        Args:
+            window: 窗口信息
+            on_selected: 选择完成回调，参数为坐标，取消时为None
+            on_progress: 进度回调
+        """
+        if not window:
+            messagebox.showwarning("警告", "请先选择目标窗口")
+            on_selected(None)
+            return None
+        
+        def prepare(task):
             # 激活目标窗口
+            task.report_progress("正在激活目标窗口...")
             self._activate_window(window)
-            time.sleep(0.5)  # 等待窗口激活
+            task.sleep(0.5)  # 等待窗口激活
             
-            # 启动坐标选择器
-            picker = CoordinatePicker(window)
-            return picker.get_coordinates()
+            task.report_progress("正在截取窗口...")
+            return self.capture_window_screenshot(window)
+        
+        def on_done(screenshot):
+            if not screenshot:
+                messagebox.showerror("错误", "无法截取窗口截图")
+                on_selected(None)
+                return
             
-        except Exception as e:
-            logging.error(f"选择坐标失败: {e}")
+            # 启动坐标选择器
+            picker = CoordinatePicker(window, screenshot)
+            on_selected(picker.get_coordinates())
+        
+        def on_error(e):
             messagebox.showerror("错误", f"选择坐标失败:\n{e}")
-            return None
+            on_selected(None)
+        
+        return self.executor.submit(
+            prepare,
+            name='prepare_coordinates',
+            on_done=on_done,
+            on_error=on_error,
+            on_progress=on_progress,
+            with_task=True
+        )
     
-    def _activate_window(self, window: Dict[str, Any]):
+    def _activate_window(self, window: WindowInfo):
         """激活指定窗口"""
         try:
-            hwnd = window['hwnd']
+            hwnd = window.hwnd
             win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
             win32gui.SetForegroundWindow(hwnd)
             time.sleep(0.2)
         except Exception as e:
             logging.error(f"激活窗口失败: {e}")
     
-    def capture_window_screenshot(self, window: Dict[str, Any]) -> Optional[Image.Image]:
+    def _capture_thumbnail_source(self, window: WindowInfo) -> Optional[Image.Image]:
+        """截取用于生成缩略图的窗口截图（最小化的窗口无法截取）"""
+        if not win32gui.IsWindow(window.hwnd) or win32gui.IsIconic(window.hwnd):
+            return None
+        return self.capture_window_screenshot(window)
+    
+    def capture_window_screenshot(self, window: WindowInfo) -> Optional[Image.Image]:
         """截取指定窗口的屏幕截图"""
         try:
-            hwnd = window['hwnd']
+            hwnd = window.hwnd
             
             # 获取窗口位置和大小
             rect = win32gui.GetWindowRect(hwnd)
@@ -334,25 +459,17 @@ class WindowManager:
 class CoordinatePicker:
     """坐标选择器"""
     
-    def __init__(self, window: Dict[str, Any]):
+    def __init__(self, window: WindowInfo, screenshot: Image.Image):
         """初始化坐标选择器"""
         self.window = window
         self.selected_coordinates = None
         self.root = None
         self.canvas = None
-        self.screenshot = None
+        self.screenshot = screenshot
         
     def get_coordinates(self) -> Optional[Dict[str, int]]:
         """获取选择的坐标"""
         try:
-            # 截取窗口截图
-            window_manager = WindowManager()
-            self.screenshot = window_manager.capture_window_screenshot(self.window)
-            
-            if not self.screenshot:
-                messagebox.showerror("错误", "无法截取窗口截图")
-                return None
-            
             # 创建选择界面
             self._create_picker_window()
             
@@ -368,7 +485,7 @@ class CoordinatePicker:
     def _create_picker_window(self):
         """创建坐标选择窗口"""
         self.root = tk.Toplevel()
-        self.root.title(f"选择点击坐标 - {self.window['title'][:30]}...")
+        self.root.title(f"选择点击坐标 - {self.window.title[:30]}...")
         self.root.attributes('-topmost', True)
         
         # 设置窗口大小
@@ -494,7 +611,7 @@ class CoordinatePicker:
 class WindowMonitor:
     """窗口监视器 - 监控目标窗口状态"""
     
-    def __init__(self, window: Dict[str, Any], callback=None):
+    def __init__(self, window: WindowInfo, callback=None):
         """初始化窗口监视器"""
         self.window = window
         self.callback = callback
@@ -557,7 +674,7 @@ class WindowMonitor:
     def _get_window_state(self) -> Dict[str, Any]:
         """获取窗口当前状态"""
         try:
-            hwnd = self.window['hwnd']
+            hwnd = self.window.hwnd
             
             state = {
                 'exists': win32gui.IsWindow(hwnd),
@@ -578,3 +695,256 @@ class WindowMonitor:
                 'title': "",
                 'minimized': True
             }
+
+
+class WindowOverlay:
+    """窗口覆盖层 - 在目标窗口上方绘制透明置顶的边框和点击标记
+    
+    覆盖层是一个无边框、置顶、鼠标穿透的Toplevel，所有动画都由after回调驱动，
+    不会阻塞Tk主循环，也不会改变目标窗口的状态和Z序。
+    """
+    
+    TRANSPARENT_COLOR = '#ff00fe'  # 透明色键，画布上该颜色的像素完全透明
+    TICK_MS = 50                   # 覆盖层刷新间隔
+    FLASH_MS = 200                 # 闪烁半周期
+    
+    def __init__(self, master=None, color: str = 'red', border: int = 4):
+        """初始化窗口覆盖层"""
+        self.master = master
+        self.color = color
+        self.border = border
+        
+        self.top = None
+        self.canvas = None
+        self.hwnd = None
+        self.rect = None
+        self.tracking = False
+        
+        # 闪烁动画状态
+        self._flash_steps = 0
+        self._flash_elapsed = 0
+        self._flash_visible = True
+        self._hide_at = None
+        self._after_id = None
+        
+        # 点击标记：工作线程只向队列追加，主线程在tick中绘制
+        self._pending_points = deque()
+        self._point_items = deque()
+        self.max_points = 30
+        self.point_lifetime = 1.5  # 秒
+    
+    def highlight(self, hwnd: int, duration: float = 2.0, flashes: int = 3):
+        """闪烁高亮指定窗口的边框"""
+        if not self._attach(hwnd):
+            return
+        
+        self._flash_steps = flashes * 2
+        self._flash_elapsed = 0
+        self._flash_visible = True
+        self._hide_at = None if self.tracking else time.monotonic() + duration
+        self._draw_border()
+        self._schedule()
+    
+    def track(self, hwnd: int):
+        """持续跟随指定窗口显示边框，用于运行时显示点击位置"""
+        if not self._attach(hwnd):
+            return
+        
+        self.tracking = True
+        self._hide_at = None
+        self._pending_points.clear()
+        self._draw_border()
+        self._schedule()
+    
+    def stop_tracking(self):
+        """停止跟随并隐藏覆盖层"""
+        self.tracking = False
+        self.hide()
+    
+    def add_click_point(self, x: int, y: int):
+        """添加一个点击标记（窗口相对坐标），可从任意线程调用"""
+        self._pending_points.append((x, y, time.monotonic()))
+    
+    def hide(self):
+        """隐藏覆盖层"""
+        if self._after_id and self.top:
+            try:
+                self.top.after_cancel(self._after_id)
+            except tk.TclError:
+                pass
+        self._after_id = None
+        self._flash_steps = 0
+        self._hide_at = None
+        
+        if self.top:
+            try:
+                self.top.withdraw()
+                self.canvas.delete('all')
+            except tk.TclError:
+                self.top = None
+        self._point_items.clear()
+    
+    def destroy(self):
+        """销毁覆盖层"""
+        self.tracking = False
+        self.hide()
+        if self.top:
+            try:
+                self.top.destroy()
+            except tk.TclError:
+                pass
+        self.top = None
+        self.canvas = None
+    
+    def _attach(self, hwnd: int) -> bool:
+        """将覆盖层定位到目标窗口当前的位置"""
+        try:
+            if not win32gui.IsWindow(hwnd):
+                logging.warning(f"目标窗口不存在: {hwnd}")
+                return False
+            
+            self._ensure_window()
+            self.hwnd = hwnd
+            self.rect = None
+            self._follow_window()
+            return True
+        except Exception as e:
+            logging.error(f"显示窗口覆盖层失败: {e}")
+            return False
+    
+    def _ensure_window(self):
+        """按需创建覆盖层窗口"""
+        if self.top is not None:
+            try:
+                if self.top.winfo_exists():
+                    return
+            except tk.TclError:
+                pass
+        
+        self.top = tk.Toplevel(self.master)
+        self.top.withdraw()
+        self.top.overrideredirect(True)
+        self.top.attributes('-topmost', True)
+        try:
+            self.top.attributes('-transparentcolor', self.TRANSPARENT_COLOR)
+        except tk.TclError:
+            # 非Windows平台不支持透明色键，退化为半透明
+            self.top.attributes('-alpha', 0.3)
+        
+        self.canvas = tk.Canvas(
+            self.top,
+            bg=self.TRANSPARENT_COLOR,
+            highlightthickness=0,
+            bd=0
+        )
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+        
+        self.top.update_idletasks()
+        self._make_click_through()
+    
+    def _make_click_through(self):
+        """设置鼠标穿透和不激活样式，避免覆盖层拦截点击或抢占焦点"""
+        try:
+            overlay_hwnd = win32gui.GetParent(self.top.winfo_id()) or self.top.winfo_id()
+            ex_style = win32gui.GetWindowLong(overlay_hwnd, win32con.GWL_EXSTYLE)
+            ex_style |= (win32con.WS_EX_LAYERED | win32con.WS_EX_TRANSPARENT |
+                         win32con.WS_EX_TOOLWINDOW | win32con.WS_EX_NOACTIVATE)
+            win32gui.SetWindowLong(overlay_hwnd, win32con.GWL_EXSTYLE, ex_style)
+        except Exception as e:
+            logging.debug(f"设置覆盖层穿透样式失败: {e}")
+    
+    def _follow_window(self) -> bool:
+        """同步覆盖层与目标窗口的位置，窗口不可见时隐藏覆盖层"""
+        hwnd = self.hwnd
+        if not win32gui.IsWindow(hwnd) or win32gui.IsIconic(hwnd) \
+                or not win32gui.IsWindowVisible(hwnd):
+            if self.top.state() != 'withdrawn':
+                self.top.withdraw()
+            self.rect = None
+            return False
+        
+        rect = win32gui.GetWindowRect(hwnd)
+        if rect != self.rect:
+            self.rect = rect
+            width = max(1, rect[2] - rect[0])
+            height = max(1, rect[3] - rect[1])
+            self.top.geometry(f"{width}x{height}+{rect[0]}+{rect[1]}")
+            self.canvas.config(width=width, height=height)
+            self._draw_border()
+        
+        if self.top.state() == 'withdrawn':
+            self.top.deiconify()
+            self.top.attributes('-topmost', True)
+        return True
+    
+    def _draw_border(self):
+        """绘制窗口边框"""
+        if not self.canvas or not self.rect:
+            return
+        
+        self.canvas.delete('border')
+        if not self._flash_visible:
+            return
+        
+        width = self.rect[2] - self.rect[0]
+        height = self.rect[3] - self.rect[1]
+        half = self.border / 2
+        self.canvas.create_rectangle(
+            half, half, width - half, height - half,
+            outline=self.color, width=self.border, tags='border'
+        )
+    
+    def _draw_pending_points(self):
+        """绘制新的点击标记并清理过期的标记"""
+        now = time.monotonic()
+        
+        while self._pending_points:
+            x, y, created = self._pending_points.popleft()
+            item = self.canvas.create_oval(
+                x - 6, y - 6, x + 6, y + 6,
+                outline=self.color, width=2
+            )
+            self._point_items.append((item, created))
+        
+        while self._point_items and (
+                len(self._point_items) > self.max_points or
+                now - self._point_items[0][1] > self.point_lifetime):
+            item, _ = self._point_items.popleft()
+            self.canvas.delete(item)
+    
+    def _schedule(self):
+        """安排下一次刷新"""
+        if self._after_id is None and self.top:
+            self._after_id = self.top.after(self.TICK_MS, self._tick)
+    
+    def _tick(self):
+        """覆盖层刷新回调"""
+        self._after_id = None
+        try:
+            if not self._follow_window():
+                if not self.tracking:
+                    self.hide()
+                    return
+                self._schedule()
+                return
+            
+            if self._flash_steps > 0:
+                self._flash_elapsed += self.TICK_MS
+                if self._flash_elapsed >= self.FLASH_MS:
+                    self._flash_elapsed = 0
+                    self._flash_steps -= 1
+                    # 闪烁结束时保持边框可见
+                    self._flash_visible = not self._flash_visible if self._flash_steps else True
+                    self._draw_border()
+            
+            if self.tracking:
+                self._draw_pending_points()
+            elif self._hide_at is not None and time.monotonic() >= self._hide_at \
+                    and self._flash_steps == 0:
+                self.hide()
+                return
+            
+            self._schedule()
+        except Exception as e:
+            logging.error(f"刷新窗口覆盖层失败: {e}")
+            self.hide()